@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+# Standard Model background cache
+
+Points of a parameter scan share the history of the Standard Model plasma down to the temperature\
+at which the new species start to matter. `BackgroundCache` keeps complete snapshots of a\
+`Universe` with the Standard Model content only (cosmological parameters, distribution functions,\
+histories of the multistep methods and of the nucleosynthesis input) on a ladder of temperatures:
+
+    cache = BackgroundCache(folder)
+    cache.build(universe, temperature_ladder(T_initial, T_injection, 10))
+
+A new run sets up the same Standard Model particles and interactions, starts from the nearest\
+snapshot above its injection temperature and adds the extra species there:
+
+    T = cache.warm_start(universe, T_injection)
+    universe.add_particles([sterile])
+    universe.evolve(T_final, init_time=False)
+
+The run continues as the next `evolve` stage of the run that built the cache (`init_time=False`\
+keeps the time of the background). Snapshots record the names and grids of the particles and can\
+only be restored into the same particle content.
+"""
+import os
+import glob
+import pickle
+
+import numpy
+
+from common import UNITS
+
+
+def temperature_ladder(T_max, T_min, count):
+    """ Temperatures of the snapshots, equally spaced in $\\ln T$ from `T_max` down to `T_min` """
+    return list(numpy.geomspace(T_max, T_min, count))
+
+
+def signature(universe):
+    """ Particle content of the `Universe` that has to match between a snapshot and a run """
+    return [(particle.name, particle.grid.MOMENTUM_SAMPLES, particle.grid.MAX_MOMENTUM)
+            for particle in universe.particles]
+
+
+class BackgroundCache(object):
+
+    """ ## Snapshots of the Standard Model background on a temperature ladder """
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def path(self, T):
+        return os.path.join(self.folder, "background_{:.6e}MeV.pickle".format(T / UNITS.MeV))
+
+    def temperatures(self):
+        """ Temperatures of the stored snapshots in descending order """
+        paths = glob.glob(os.path.join(self.folder, "background_*MeV.pickle"))
+        return sorted((float(os.path.basename(path)[len("background_"):-len("MeV.pickle")])
+                       * UNITS.MeV for path in paths), reverse=True)
+
+    def save(self, universe):
+        """ Store the current state of the `universe` under its temperature """
+        os.makedirs(self.folder, exist_ok=True)
+        snapshot = {
+            'T': universe.params.T,
+            'signature': signature(universe),
+            'universe': universe.snapshot()
+        }
+
+        # Points of a scan can read the cache while it is written: files are replaced atomically
+        path = self.path(universe.params.T)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def build(self, universe, temperatures):
+        """ Evolve the `universe` down the `temperatures` and store a snapshot at each of them """
+        for i, T in enumerate(sorted(temperatures, reverse=True)):
+            universe.evolve(T, export=False, init_time=(i == 0 and universe.stage == 0))
+            self.save(universe)
+
+    def nearest(self, T):
+        """ Lowest temperature of the stored snapshots that is not below `T` """
+        candidates = [T_snapshot for T_snapshot in self.temperatures() if T_snapshot >= T]
+        return min(candidates) if candidates else None
+
+    def warm_start(self, universe, T):
+        """ Restore the `universe` from the nearest snapshot above the temperature `T`
+
+            The `universe` has to contain the Standard Model particles (and the kinetics helpers\
+            like `init_kawano`) set up the same way as in the run that built the cache, extra\
+            species are added after the warm start.
+
+            :return: Temperature of the snapshot or `None` if there is no snapshot above `T`
+        """
+        T_snapshot = self.nearest(T)
+        if T_snapshot is None:
+            return None
+
+        with open(self.path(T_snapshot), "rb") as f:
+            snapshot = pickle.load(f)
+
+        if snapshot['signature'] != signature(universe):
+            raise ValueError("Background at T = {:e} MeV was computed for other particles: {}"
+                             .format(T_snapshot / UNITS.MeV, snapshot['signature']))
+
+        # Kinematic cut-offs of the sterile neutrino are set up by the run, not by the background
+        relativistic_decoupling = universe.params.relativistic_decoupling
+        universe.restore(snapshot['universe'])
+        universe.params.relativistic_decoupling = relativistic_decoupling
+        # Unlike a checkpoint, the snapshot is taken between the `evolve` stages
+        universe.stage = 0
+        universe.resume_stage = 0
+
+        return snapshot['T']
@@ -94,6 +94,18 @@ class Params(object):
     dy = None
 
     h = None
+    # Bounds of the step size `h` when it is chosen adaptively. Unless given explicitly, they are
+    # a tenth and ten times the nominal step size `dy` (`dx`) and follow it when it is changed
+    h_min = None
+    h_max = None
+    step_bounds = (None, None)
+    # State of the kinematic cut-offs shared by the collision integrals of the run: the energy
+    # scale of the sterile neutrino (`kinematics.store_energy`) and whether its scatterings
+    # decouple while it is relativistic (`kinematics.relativistic_decoupling`)
+    HNL_energy = None
+    relativistic_decoupling = False
+    # Run configuration (`environment.Configuration`) shared by the particles and integrals
+    config = None
 
     def __init__(self, **kwargs):
         """ ## Parameters
@@ -115,6 +127,11 @@ class Params(object):
         self.dy = 0.05
         self.dx = 0.005 * UNITS.MeV
 
+        self.config = environment.Configuration()
+
+        # Step size bounds given explicitly to the constructor
+        self.step_bounds = (kwargs.get('h_min'), kwargs.get('h_max'))
+
         for key in kwargs:
             setattr(self, key, kwargs[key])
 
@@ -125,9 +142,12 @@ class Params(object):
 
         self.infer()
 
-        if environment.get('LOGARITHMIC_TIMESTEP') and not kwargs.get('dy'):
+        # Sizes of the previous steps, needed by the multistep methods when the step size varies
+        self.steps = []
+
+        if self.config.LOGARITHMIC_TIMESTEP and not kwargs.get('dy'):
             raise Exception("Using logarithmic timestep, but no Params.dy was specified")
-        if not environment.get('LOGARITHMIC_TIMESTEP') and not kwargs.get('dx'):
+        if not self.config.LOGARITHMIC_TIMESTEP and not kwargs.get('dx'):
             raise Exception("Using linear timestep, but no Params.dx was specified")
 
     def infer(self):
@@ -135,17 +155,36 @@ class Params(object):
 
         # Compute present-state parameters that can be inferred from the base ones
         self.x = self.a * self.m
-        if environment.get('LOGARITHMIC_TIMESTEP'):
+        if self.config.LOGARITHMIC_TIMESTEP:
             self.y = numpy.log(self.a)
         self.aT = self.a * self.T
 
         # Conformal scale factor step size during computations
-        if environment.get('LOGARITHMIC_TIMESTEP'):
+        if self.config.LOGARITHMIC_TIMESTEP:
             self.dx = self.x * self.dy
             self.h = self.dy
         else:
             self.dy = None
             self.h = self.dx
+        self.infer_step_bounds()
+
+    def infer_step_bounds(self):
+        """ Bounds of the adaptive step size around the nominal step size `h` """
+        h_min, h_max = self.step_bounds
+        self.h_min = self.h / 10. if h_min is None else h_min
+        self.h_max = self.h * 10. if h_max is None else h_max
+
+    def set_step(self, h, nominal=True):
+        """ Change the step size of the following steps. A `nominal` step size also moves the\
+            bounds of the adaptive step size, the adaptive steps themselves keep them """
+        self.h = h
+        if self.config.LOGARITHMIC_TIMESTEP:
+            self.dy = h
+            self.dx = self.x * self.dy
+        else:
+            self.dx = h
+        if nominal:
+            self.infer_step_bounds()
 
     def init_time(self, rho):
         self.t = numpy.sqrt(3. / (32. * numpy.pi * CONST.G * rho))
@@ -162,14 +201,24 @@ class Params(object):
                     dof += particle.dof
         return dof
 
-    def update(self, rho, S):
+    def set_state(self, x, aT, t):
+        """ Set the scale factor, temperature and time directly (used by the external solvers) """
+        self.x = x
+        self.aT = aT
+        self.t = t
+        self.a = self.x / self.m
+        self.T = self.aT / self.a
+
+    def update(self, rho, S, advance_time=True):
         """ Hubble expansion parameter defined by a Friedmann equation:
 
             \begin{equation}
                 H = \sqrt{\frac{8 \pi}{3} G \rho}
             \end{equation}
+
+            The time is advanced over the last step unless `advance_time` is `False`
         """
-        if environment.get('LOGARITHMIC_TIMESTEP'):
+        if self.config.LOGARITHMIC_TIMESTEP:
             self.dx = self.x * self.dy
         self.rho = rho
         self.S = S
@@ -200,7 +249,8 @@ class Params(object):
         # dt = (self.a / old_a - 1) / self.H
         dt = (1 - old_a / self.a) / self.H
         # dt = self.dx / self.x / self.H
-        self.t += dt
+        if advance_time:
+            self.t += dt
 
 
 """
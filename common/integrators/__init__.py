@@ -68,6 +68,57 @@ def implicit_euler(y, t, A, B, h):
     return (y + A * h) / (1 - B * h)
 
 
+def phi_functions(z):
+    """
+    Functions of the exponential time differencing methods
+
+    \begin{equation}
+        \varphi_1(z) = \frac{e^z - 1}{z}, \qquad \varphi_2(z) = \frac{e^z - 1 - z}{z^2}
+    \end{equation}
+
+    evaluated by their Taylor series close to $z = 0$ to avoid the cancellation.
+    """
+    z = numpy.asarray(z, dtype=float)
+    small = numpy.abs(z) < 1e-3
+    safe = numpy.where(small, 1., z)
+
+    phi_1 = numpy.where(small, 1. + z / 2. + z**2 / 6., numpy.expm1(safe) / safe)
+    phi_2 = numpy.where(small, 1. / 2. + z / 6. + z**2 / 24., (numpy.expm1(safe) - safe) / safe**2)
+    return phi_1, phi_2
+
+
+def exponential_solver(y, A, B, h, A_previous=None, h_previous=None):
+    """
+    Exponential time differencing solver for ODE with a linear function:
+
+    \begin{equation}
+        \frac{d y(t)}{dt} = A(t) + B(t) y(t)
+    \end{equation}
+
+    The linear part is integrated exactly over the step, so the method stays stable for any\
+    $B h \ll -1$. Without the previous source term `A_previous` it is the first order method
+
+    \begin{equation}
+        y(t+h) = y(t) + h \varphi_1(B h) (A(t) + B(t) y(t))
+    \end{equation}
+
+    and with it the source term is extrapolated linearly over the step (second order method):
+
+    \begin{equation}
+        y(t+h) = y(t) + h \varphi_1(B h) (A(t) + B(t) y(t))\
+            + h \varphi_2(B h) \frac{h}{h_{prev}} (A(t) - A(t - h_{prev}))
+    \end{equation}
+
+    Returns the effective derivative $(y(t+h) - y(t)) / h$.
+    """
+    phi_1, phi_2 = phi_functions(B * h)
+
+    derivative = phi_1 * (A + B * y)
+    if A_previous is not None:
+        derivative += phi_2 * (A - A_previous) * h / (h_previous or h)
+    return derivative
+
+
 ADAMS_BASHFORTH_COEFFICIENTS = {
     1: ([1.], 1.),
     2: ([-1., 3.], 2.),
@@ -78,15 +129,78 @@ ADAMS_BASHFORTH_COEFFICIENTS = {
 MAX_ADAMS_BASHFORTH_ORDER = max(ADAMS_BASHFORTH_COEFFICIENTS.keys())
 
 
-def adams_bashforth_correction(fs, h, order=None):
+def multistep_coefficients(nodes):
+    """
+    Weights of the values of $f$ at the `nodes` (in units of the step size $h$, relative to the\
+    beginning of the step) in the integral of their interpolating polynomial over the step:
+
+    \begin{equation}
+        \int_0^1 P(\tau) d\tau = \sum_j \beta_j f(\tau_j)
+    \end{equation}
+
+    For equidistant nodes these are the Adams-Bashforth (nodes $-k+1, \dots, 0$) and\
+    Adams-Moulton (nodes $-k+2, \dots, 1$) coefficients. For a variable step size the nodes are\
+    rescaled accordingly.
+    """
+    nodes = numpy.asarray(nodes, dtype=float)
+    powers = numpy.arange(len(nodes))
+    return numpy.linalg.solve(nodes[None, :]**powers[:, None], 1. / (powers + 1.))
+
+
+def history_nodes(hs, h):
+    """ Nodes of the previous points separated by the step sizes `hs` (the last point is $0$) """
+    return -numpy.cumsum([0.] + list(hs[::-1]))[::-1] / h
+
+
+def previous_steps(hs, h, count):
+    """ The last `count` step sizes `hs`, the missing ones are assumed to be equal to `h` """
+    hs = list(hs)[-count:] if count > 0 else []
+    return [h] * (count - len(hs)) + hs
+
+
+def uniform_steps(hs, h):
+    return hs is None or numpy.allclose(hs, h, rtol=1e-12, atol=0.)
+
+
+def adams_bashforth_correction(fs, h, order=None, hs=None):
+    """ Adams-Bashforth increment over the step `h` from the derivatives `fs` at the previous\
+        points. `hs` are the step sizes between the consecutive `fs` (equal to `h` if omitted) """
     if order is None:
         order = min(MAX_ADAMS_BASHFORTH_ORDER, len(fs))
 
-    bs, divider = ADAMS_BASHFORTH_COEFFICIENTS[order]
     fs = fs[-order:]
     assert len(fs) == order, (len(fs), order)
 
-    return h * sum(b * f for b, f in zip(bs, fs)) / divider
+    if hs is not None:
+        hs = previous_steps(hs, h, order - 1)
+    if uniform_steps(hs, h):
+        bs, divider = ADAMS_BASHFORTH_COEFFICIENTS[order]
+        return h * sum(b * f for b, f in zip(bs, fs)) / divider
+
+    bs = multistep_coefficients(history_nodes(hs, h))
+    return h * sum(b * f for b, f in zip(bs, fs))
+
+
+def adams_bashforth_error(fs, h, order=None, hs=None):
+    """ Local error estimate of the Adams-Bashforth increment: difference with the increment\
+        of the lower order method """
+    if order is None:
+        order = min(MAX_ADAMS_BASHFORTH_ORDER, len(fs))
+    if order < 2:
+        return 0.
+
+    return numpy.abs(adams_bashforth_correction(fs, h, order=order, hs=hs)
+                     - adams_bashforth_correction(fs, h, order=order - 1, hs=hs))
+
+
+def extrapolation(fs, h, hs=None):
+    """ Value at the next point (after the step `h`) of the polynomial interpolating the `fs` """
+    nodes = history_nodes(previous_steps([] if hs is None else hs, h, len(fs) - 1), h)
+    weights = numpy.array([
+        numpy.prod([(1. - other) / (node - other) for k, other in enumerate(nodes) if k != j])
+        for j, node in enumerate(nodes)
+    ])
+    return sum(w * f for w, f in zip(weights, fs))
 
 
 ADAMS_MOULTON_COEFFICIENTS = {
@@ -99,14 +213,22 @@ ADAMS_MOULTON_COEFFICIENTS = {
 MAX_ADAMS_MOULTON_ORDER = max(ADAMS_MOULTON_COEFFICIENTS.keys())
 
 
-def adams_moulton_solver(y, fs, A, B, h, order=None):
+def adams_moulton_solver(y, fs, A, B, h, order=None, hs=None):
+    """ Adams-Moulton step for $y' = A + B y$ with the derivatives `fs` at the previous points.\
+        `hs` are the step sizes between the consecutive `fs` (equal to `h` if omitted) """
     if order is None:
         order = min(MAX_ADAMS_MOULTON_ORDER, len(fs) + 1)
 
-    bs, divider = ADAMS_MOULTON_COEFFICIENTS[order]
-    fs = fs[-(order-1):] + [A]
+    fs = (fs[-(order-1):] if order > 1 else []) + [A]
     assert len(fs) == order, (len(fs), order)
 
+    if hs is not None:
+        hs = previous_steps(hs, h, order - 2)
+    if uniform_steps(hs, h):
+        bs, divider = ADAMS_MOULTON_COEFFICIENTS[order]
+    else:
+        bs, divider = multistep_coefficients(list(history_nodes(hs, h)) + [1.]), 1.
+
     return (
         y + h * sum(b * f for b, f in zip(bs, fs)) / divider
     ) / (1 - h * B * bs[-1] / divider)
@@ -9,4 +9,15 @@ def init_quadrature():
     grid = numpy.meshgrid(points, points)
 
 
+_quadratures = {}
+
+
+def quadrature(order):
+    """ Nodes and weights of the Gauss-Legendre rule of the given `order`, e.g. the\
+        `FOUR_PARTICLE_GAUSS_ORDER` of the run configuration """
+    if order not in _quadratures:
+        _quadratures[order] = numpy.polynomial.legendre.leggauss(order)
+    return _quadratures[order]
+
+
 init_quadrature()
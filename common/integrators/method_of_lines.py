@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+# Method of lines
+
+Alternative to the operator splitting of `Universe.make_step` (explicit Adams-Bashforth for $aT$\
+and a separate solver for every distribution function): the temperature, the time and the\
+distribution functions of all non-equilibrium species on their grids form one system of ODEs
+
+\begin{equation}
+    \frac{d}{dy} \left(aT, t, f_1(y_1), \dots, f_N(y_M)\right)
+        = \left(\frac{d (aT)}{dy}, \frac{1}{H}, I_1, \dots, I_N\right)
+\end{equation}
+
+which is handed to a variable-order stiff solver of `scipy.integrate` selected by the\
+`STIFF_SOLVER` setting (`BDF` or `Radau`). The right-hand side is evaluated by the same steps as\
+`Universe.integrand`, the collision integrals are the plain rates $I = A + B f$.
+
+Jacobian of the system is approximated by its diagonal made of the loss coefficients $B$ of the\
+split collision integrals (`STIFF_JACOBIAN = 'diagonal'`): it captures the stiff decay and\
+scattering terms at the price of a single right-hand side evaluation. `'numerical'` lets the solver\
+compute the full Jacobian by finite differences instead.
+
+Distribution functions are taken from the contiguous state buffer of the `Universe`. The solver\
+evaluates the right-hand side at trial points that may be rejected, so the state of the particles\
+changed by `Particle.update` (temperature, decoupling, thermodynamics) is restored after each trial\
+evaluation: species decouple only at the accepted points. When a species decouples or the set of\
+the non-equilibrium species changes otherwise, the solver is restarted with the new state vector.
+"""
+import numpy
+from contextlib import contextmanager
+from scipy import integrate, sparse
+
+
+class MethodOfLines(object):
+
+    """ ## Stiff ODE solver of the whole Boltzmann system """
+
+    # Interval of the independent variable given to the solver: the evolution is stopped by the
+    # temperature condition of `Universe.evolve` long before it is reached
+    span = 1e3
+
+    # Attributes of the particles that `Particle.update` changes at every evaluation
+    trial_attributes = ('aT', 'T', 'oldeq', 't_decoupling', 'free_streaming', 'free_streaming_moments',
+                        'density', 'energy_density', 'pressure', 'entropy', 'numerator', 'denominator')
+
+    def __init__(self, universe):
+        self.universe = universe
+        self.solver = None
+        self.particles = []
+        self.evaluations = 0
+
+    @property
+    def logarithmic(self):
+        return self.universe.config.LOGARITHMIC_TIMESTEP
+
+    def coordinate(self):
+        """ Independent variable: $\\ln a$ or $x = a m$ """
+        params = self.universe.params
+        return numpy.log(params.a) if self.logarithmic else params.x
+
+    def evolving(self):
+        """ Species whose distribution functions are integrated by the solver """
+        return [particle for particle in self.universe.particles
+                if not particle.in_equilibrium and not hasattr(particle, 'fast_decay')]
+
+    def pack(self):
+        params = self.universe.params
+        return numpy.concatenate([[params.aT, params.t], self.universe.state.distribution[self.mask]])
+
+    def unpack(self, coordinate, vector):
+        params = self.universe.params
+        x = params.m * numpy.exp(coordinate) if self.logarithmic else coordinate
+        params.set_state(x=x, aT=vector[0], t=vector[1])
+        self.universe.state.distribution[self.mask] = vector[2:]
+
+    @contextmanager
+    def trial(self):
+        """ Evaluation at a trial point: the state of the particles is restored afterwards """
+        state = self.universe.state
+        distribution = state.distribution.copy()
+        saved = [
+            (particle, {key: getattr(particle, key) for key in self.trial_attributes if hasattr(particle, key)})
+            for particle in self.universe.particles
+        ]
+        try:
+            yield
+        finally:
+            for particle, attributes in saved:
+                for key, value in attributes.items():
+                    setattr(particle, key, value)
+            state.distribution[:] = distribution
+
+    def derivatives(self, coordinate, vector, record=False):
+        """ Right-hand side of the system. With `record` the evaluation at an accepted point is\
+            saved to the histories of the particles, otherwise the state of the particles is\
+            restored afterwards """
+        if not record:
+            with self.trial():
+                return self.evaluate(coordinate, vector, record)
+        return self.evaluate(coordinate, vector, record)
+
+    def evaluate(self, coordinate, vector, record):
+        """ Right-hand side of the system from the same steps as `Universe.integrand` """
+        universe = self.universe
+        params = universe.params
+        self.evaluations += 1
+
+        self.unpack(coordinate, vector)
+
+        universe.update_particles(record=record)
+        params.update(universe.total_energy_density(), universe.total_entropy(), advance_time=False)
+
+        for particle in self.particles:
+            particle.collision_loss = None
+        universe.init_interactions()
+        universe.calculate_collisions()
+
+        universe.temperature_fraction()
+        dt = 1. / params.H if self.logarithmic else 1. / (params.x * params.H)
+
+        for particle in universe.particles:
+            if particle.in_equilibrium:
+                continue
+            if not record:
+                particle.collision_integrals = []
+            elif hasattr(particle, 'fast_decay'):
+                particle.update_distribution()
+            else:
+                particle.record_distribution()
+
+        rates = universe.state.collision_integral[self.mask]
+        return numpy.concatenate([[universe.fraction, dt], numpy.nan_to_num(rates)])
+
+    def jacobian(self, coordinate, vector):
+        """ Diagonal approximation of the Jacobian from the loss terms of the collision integrals """
+        self.derivatives(coordinate, vector)
+
+        losses = [numpy.zeros(2)]
+        for particle in self.particles:
+            loss = particle.collision_loss
+            losses.append(numpy.zeros(particle.grid.MOMENTUM_SAMPLES) if loss is None else loss)
+        return sparse.diags(numpy.concatenate(losses))
+
+    def start(self):
+        """ (Re)start the solver from the current state of the `Universe` """
+        self.particles = self.evolving()
+        self.mask = self.universe.state.mask(self.particles)
+
+        config = self.universe.config
+        solver = getattr(integrate, config.STIFF_SOLVER)
+        jacobian = self.jacobian if config.STIFF_JACOBIAN == 'diagonal' else None
+
+        start = self.coordinate()
+        self.solver = solver(
+            lambda coordinate, vector: self.derivatives(coordinate, vector),
+            start, self.pack(), start + self.span,
+            rtol=config.STIFF_SOLVER_RTOL, atol=config.STIFF_SOLVER_ATOL,
+            jac=jacobian, first_step=self.universe.params.h
+        )
+
+    def step(self):
+        """ Make a single step of the solver and record the system state at its end """
+        if self.solver is None or self.evolving() != self.particles:
+            self.start()
+
+        previous = self.solver.t
+        message = self.solver.step()
+        if self.solver.status == 'failed':
+            raise RuntimeError("Stiff solver failed: {}".format(message))
+
+        self.universe.params.h = self.solver.t - previous
+        self.derivatives(self.solver.t, self.solver.y, record=True)
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 
-import os
 import numpy as np
 import environment
 from common import CONST, UNITS, utils
@@ -73,7 +72,7 @@ def four_particle_bounds_creation(reaction=None):
                     )**2
                     - specie_1.conformal_mass**2)
 
-    return max(max_momentum, environment.get('MAX_MOMENTUM_MEV') * UNITS.MeV)
+    return max(max_momentum, specie_1.params.config.MAX_MOMENTUM_MEV * UNITS.MeV)
 
 def four_particle_grid_cutoff_creation(reaction=None):
     """ Returns grid elements (slice_1) for which four particle collision integral will be computed.
@@ -92,11 +91,11 @@ def four_particle_grid_cutoff_scattering(particle):
 
     if particle.name == 'Sterile neutrino (Dirac)':
         max_mom = particle.grid.MAX_MOMENTUM #3 * particle.params.T
-    elif particle.name != 'Sterile neutrino (Dirac)' and environment.get('HNL_ENERGY'):
-        HNL_energy = float(environment.get('HNL_ENERGY'))
-        max_mom = max(np.sqrt(HNL_energy**2 - particle.conformal_mass**2), environment.get('MAX_MOMENTUM_MEV') * UNITS.MeV)
+    elif particle.name != 'Sterile neutrino (Dirac)' and particle.params.HNL_energy:
+        HNL_energy = particle.params.HNL_energy
+        max_mom = max(np.sqrt(HNL_energy**2 - particle.conformal_mass**2), particle.params.config.MAX_MOMENTUM_MEV * UNITS.MeV)
     else:
-        max_mom = environment.get('MAX_MOMENTUM_MEV') * UNITS.MeV
+        max_mom = particle.params.config.MAX_MOMENTUM_MEV * UNITS.MeV
 
     upper_element_grid = min(len(grid) - 1, np.searchsorted(grid, max_mom))
 
@@ -111,9 +110,9 @@ def four_particle_grid_cutoff_decay(particle):
 
     if particle.name == 'Sterile neutrino (Dirac)':
         max_mom = particle.grid.MAX_MOMENTUM
-    elif particle.name != 'Sterile neutrino (Dirac)' and environment.get('HNL_ENERGY'):
-        HNL_energy = float(environment.get('HNL_ENERGY'))
-        max_mom = max(np.sqrt(HNL_energy**2 - particle.conformal_mass**2), environment.get('MAX_MOMENTUM_MEV') * UNITS.MeV)
+    elif particle.name != 'Sterile neutrino (Dirac)' and particle.params.HNL_energy:
+        HNL_energy = particle.params.HNL_energy
+        max_mom = max(np.sqrt(HNL_energy**2 - particle.conformal_mass**2), particle.params.config.MAX_MOMENTUM_MEV * UNITS.MeV)
     else:
         max_mom = particle.grid.MAX_MOMENTUM
 
@@ -168,10 +167,13 @@ def decoupling_temperature_relativistic(mass, mixing_angle):
 
     return (1.66 * np.sqrt(g_star) / (CONST.M_p * CONST.G_F**2 * theta_sq))**(1/3)
 
+def relativistic_decoupling(mass, mixing_angle):
+    " Whether the sterile neutrino decouples while it is relativistic (`Params.relativistic_decoupling`) "
+    return decoupling_temperature_relativistic(mass, mixing_angle) > mass
+
 def decoupling_temperature(mass, mixing_angle):
     T_dec_rel = decoupling_temperature_relativistic(mass, mixing_angle)
-    if 1.5 * T_dec_rel > 1.5 * mass:
-        os.environ['Relativistic_decoupling'] = 'True'
+    if relativistic_decoupling(mass, mixing_angle):
         return 1.5 * T_dec_rel
     elif mass <= 1.5 * T_dec_rel <= 1.5 * mass:
         return 1.5 * mass
@@ -313,7 +315,7 @@ def Neglect4pInteraction(interaction, ps):
 
     # Decoupling of scattering reactions involving HNL
     if utils.reaction_type(interaction).SCATTERING and any(item.specie.name == 'Sterile neutrino (Dirac)' for item in interaction.reaction)\
-    and (environment.get('Relativistic_decoupling') and interaction.particle.params.T < interaction.particle.params.m / interaction.particle.params.a_ini / 15. or interaction.particle.params.T < 1. * UNITS.MeV):
+    and (interaction.particle.params.relativistic_decoupling and interaction.particle.params.T < interaction.particle.params.m / interaction.particle.params.a_ini / 15. or interaction.particle.params.T < 1. * UNITS.MeV):
         return True
 
     # If temperature is higher than HNL mass, skip decay reaction to prevent incorrect computation of collision integral
@@ -346,13 +348,14 @@ def CollisionMultiplier3p(interaction):
 
 def store_energy(interaction):
     if interaction.particle.name == 'Sterile neutrino (Dirac)':
-        os.environ['HNL_ENERGY'] = str(np.sqrt((interaction.particle.grid.MAX_MOMENTUM/10)**2 + interaction.particle.conformal_mass**2))
+        interaction.particle.params.HNL_energy = np.sqrt((interaction.particle.grid.MAX_MOMENTUM/10)**2 + interaction.particle.conformal_mass**2)
 
 def interpolation_4p(interaction, ps, slice_1):
     interpolate = False
     grid = interaction.particle.grid
-    if grid.MAX_MOMENTUM / (grid.MOMENTUM_SAMPLES - 1) < environment.get('FOUR_PARTICLE_GRID_RESOLUTION') * UNITS.MeV:
-        steps = np.ceil(slice_1[-1] / (environment.get('FOUR_PARTICLE_GRID_RESOLUTION') * UNITS.MeV))
+    resolution = interaction.particle.params.config.FOUR_PARTICLE_GRID_RESOLUTION * UNITS.MeV
+    if grid.MAX_MOMENTUM / (grid.MOMENTUM_SAMPLES - 1) < resolution:
+        steps = np.ceil(slice_1[-1] / resolution)
         interp_pos = np.searchsorted(ps, np.linspace(ps[0], ps[-1], steps))
         ps = ps[interp_pos]
         interpolate = True
@@ -373,14 +376,15 @@ def scaling(interaction, fullstack, constant):
         fullstack *= scaling
     return fullstack
 
-def has_decayed(particle, ps):
+def decay_threshold_reached(particle):
     dec_thr = 1e-10 * (particle.params.a_ini / 10)**3
-    if len(particle.data['distribution']) > 1 and particle.mass != 0. and particle.data['params']['density'][0] != 0. \
-    and particle.density / particle.data['params']['density'][0] < dec_thr and not hasattr(particle, 'fast_decay'):
+    return len(particle.data['distribution']) > 1 and particle.mass != 0. and particle.data['params']['density'][0] != 0. \
+    and particle.density / particle.data['params']['density'][0] < dec_thr and not hasattr(particle, 'fast_decay')
+
+def has_decayed(particle, ps):
+    if decay_threshold_reached(particle):
         particle.decayed = True
         particle._distribution = np.zeros(len(ps))
-        if particle.name == 'Sterile neutrino (Dirac)':
-            os.environ['STERILE_DECAYED'] = 'True'
         return True
     return False
 
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+# Storage
+
+Append-only binary output for the `DynamicRecArray` histories.
+
+Rows are stored as raw records of the array's structured dtype in `<name>.bin`; the column\
+names, units and the dtype are kept in the `<name>.json` sidecar. Each `flush` writes only the\
+rows appended since the previous one, so the output cost stays linear in the number of steps.
+The stored data can be memory-mapped with `load` and converted to the legacy tab-separated\
+files with `to_txt`:
+
+    python -m common.storage output/evolution.bin output/evolution.txt
+"""
+
+import os
+import json
+import hashlib
+import argparse
+import numpy
+
+
+class RecArrayStore(object):
+
+    """ ## Append-only writer of the `DynamicRecArray` rows """
+
+    def __init__(self, path):
+        self.path = path
+        self.meta_path = meta_path(path)
+        self.written = 0
+        self.digest = None
+
+    def flush(self, array):
+        """ Write the rows of `array` that were added since the last call. The whole history is\
+            rewritten only if any of the already stored rows was modified (e.g. by `truncate` or\
+            by an in-place write into a column) """
+        data = array.data
+
+        if not self.written or not self.unchanged(data):
+            self.write_meta(array)
+            mode, start = "wb", 0
+        else:
+            mode, start = "ab", self.written
+
+        if start < len(data) or mode == "wb":
+            with open(self.path, mode) as f:
+                f.write(data[start:].tobytes())
+
+        self.written = len(data)
+        self.digest = digest(data)
+
+    def unchanged(self, data):
+        """ Whether the stored rows are still the first rows of `data`. Hashing them is far cheaper\
+            than writing them again """
+        return len(data) >= self.written and digest(data[:self.written]) == self.digest
+
+    def write_meta(self, array):
+        meta = {
+            'columns': array.columns,
+            'unit_names': array.unit_names,
+            'units': [float(unit) for unit in array.units],
+            'dtype': numpy.lib.format.dtype_to_descr(array.data.dtype)
+        }
+        with open(self.meta_path, "w") as f:
+            json.dump(meta, f)
+
+
+def digest(data):
+    return hashlib.sha1(data.tobytes()).digest()
+
+
+def meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def read_meta(path):
+    with open(meta_path(path)) as f:
+        meta = json.load(f)
+    meta['dtype'] = numpy.lib.format.descr_to_dtype(
+        [tuple(field) for field in meta['dtype']] if isinstance(meta['dtype'], list) else meta['dtype']
+    )
+    return meta
+
+
+def load(path):
+    """ Memory-map the stored rows as a structured array (in the internal units) """
+    meta = read_meta(path)
+    if not os.path.getsize(path):
+        return numpy.zeros(0, dtype=meta['dtype'])
+    return numpy.memmap(path, dtype=meta['dtype'], mode='r')
+
+
+def to_txt(path, txt_path=None):
+    """ Convert the stored rows to the tab-separated format of `DynamicRecArray.savetxt` """
+    if txt_path is None:
+        txt_path = os.path.splitext(path)[0] + ".txt"
+
+    meta = read_meta(path)
+    data = load(path)
+
+    heading = [
+        name + (', ' + unit if unit else '')
+        for name, unit in zip(meta['columns'], meta['unit_names'])
+    ]
+    table = numpy.column_stack([data[name] for name in meta['columns']]) if len(data) \
+        else numpy.zeros((0, len(meta['columns'])))
+
+    with open(txt_path, "wb") as f:
+        numpy.savetxt(f, table / numpy.array(meta['units'])[None, :],
+                      delimiter='\t', header='\t'.join(heading))
+
+    return txt_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert binary output to the tab-separated text')
+    parser.add_argument('path', help='Binary file written by `RecArrayStore`')
+    parser.add_argument('txt_path', nargs='?', default=None)
+    args = parser.parse_args()
+
+    print(to_txt(args.path, args.txt_path))
@@ -2,29 +2,51 @@ import os
 import sys
 import time
 import codecs
+import functools
 import contextlib
+import contextvars
 import numpy
 from collections import deque
 
 
 class Logger(object):
-    """ Convenient double logger that redirects `stdout` and save the output also to the file """
-    def __init__(self, filename):
-        self.terminal = sys.stdout
-        self.log = codecs.open(filename, "wb", encoding="utf8")
+    """ Double logger of a run: the output is printed to `stdout` and saved to the log file.\
+        `stdout` itself is left intact, the output of the methods decorated by `logged` is\
+        routed to the logger of their object by `log` """
+    def __init__(self, filename=None, mode="wb"):
+        self.log = codecs.open(filename, mode, encoding="utf8") if filename else None
 
     def write(self, message, terminal=True, log=True):
         if terminal:
-            self.terminal.write(message)
-        if log:
+            sys.stdout.write(message)
+        if log and self.log:
             self.log.write(message)
 
-    def __del__(self):
-        if sys:
-            sys.stdout = self.terminal
+    def flush(self):
+        sys.stdout.flush()
+        if self.log:
+            self.log.flush()
 
-    def __getattr__(self, attr):
-        return getattr(self.terminal, attr)
+
+# Logger of the run that is computed in the current thread (or `asyncio` task)
+active_logger = contextvars.ContextVar('active_logger', default=None)
+
+
+def log(*args, **kwargs):
+    """ `print` to the logger of the active run, to `stdout` outside of the runs """
+    print(*args, file=active_logger.get() or sys.stdout, **kwargs)
+
+
+def logged(method):
+    """ Make the `logger` of the object active while its `method` is executed """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        token = active_logger.set(self.logger)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            active_logger.reset(token)
+    return wrapper
 
 
 class Throttler(object):
@@ -166,13 +188,88 @@ def particle_orderer(particles):
     return particles
 
 
-class Dynamic2DArray(object):
-    def __init__(self, header):
+class Retention(object):
+
+    """ ## Retention policy of the histories
+
+        Rows of a history are kept if they are among the first `head` rows (initial state) or the\
+        last `window` rows (input of the multistep solvers) or are archived for the output: every\
+        `every`-th row and the rows at which $\\ln T$ has dropped by `dlnT` since the last\
+        archived one. Other rows are dropped as they leave the window.
+    """
+
+    def __init__(self, window, head=2, every=0, dlnT=0.):
+        self.window = window
+        self.head = head
+        self.every = every
+        self.dlnT = dlnT
+
+    def archived(self, index, T, T_archived):
+        """ Whether the row `index` appended at the temperature `T` is kept for the output """
+        if index < self.head or self.every and index % self.every == 0:
+            return True
+        return bool(self.dlnT) and T is not None and (
+            T_archived is None or numpy.log(T_archived / T) >= self.dlnT
+        )
+
+
+class RetainedRows(object):
+
+    """ Bounded storage of the histories with a `Retention` policy (all rows are kept without it).\
+        The rows stay in the chronological order: the first rows are `[0]`, `[1]`, ..., the last\
+        rows are `[-1]`, `[-2]`, ... """
+
+    retention = None
+    # Number of the rows appended, including the dropped ones
+    count = 0
+    # Rows before `compacted` are kept for good
+    compacted = 0
+    kept = None
+    T_archived = None
+
+    def retain(self, T=None):
+        """ Mark the last appended row and drop the rows that left the window """
+        if self.retention is None:
+            return
+
+        if self.kept is None or len(self.kept) < len(self._data):
+            kept = numpy.zeros(len(self._data), dtype=bool)
+            if self.kept is not None:
+                kept[:len(self.kept)] = self.kept
+            self.kept = kept
+
+        archived = self.retention.archived(self.count - 1, T, self.T_archived)
+        if archived and T is not None:
+            self.T_archived = T
+        self.kept[self.length - 1] = archived
+
+        # Rows are compacted once the window is exceeded twice: the cost per row stays constant
+        window = self.retention.window
+        if self.length - self.compacted >= 2 * window:
+            start = self.compacted
+            mask = self.kept[start:self.length].copy()
+            mask[-window:] = True
+            rows, kept = self._data[start:self.length][mask], self.kept[start:self.length][mask]
+
+            self.length = start + len(rows)
+            self._data[start:self.length] = rows
+            self.kept[start:self.length] = kept
+            self.compacted = self.length - window
+
+    @property
+    def nbytes(self):
+        """ Memory allocated for the rows """
+        return self._data.nbytes + (self.kept.nbytes if self.kept is not None else 0)
+
+
+class Dynamic2DArray(RetainedRows):
+    def __init__(self, header, retention=None, dtype=float):
         self.header = header
+        self.retention = retention
 
         self.length = 0
         self.size = 10
-        self._data = numpy.zeros((self.size, len(self.header)))
+        self._data = numpy.zeros((self.size, len(self.header)), dtype=dtype)
 
     def __len__(self):
         return self.length
@@ -191,12 +288,15 @@ class Dynamic2DArray(object):
         #     index = self.length+1-index
         # return self._data[index]
 
-    def append(self, row):
+    def append(self, row, T=None):
+        """ :param T: Temperature of the row for the `Retention` policy """
         if self.length == self.size or self.length == len(self._data) - 2:
             self.size = int(1.5*self.size)
             self._data = numpy.resize(self._data, (self.size, len(self.header)))
         self._data[self.length][:] = row
         self.length += 1
+        self.count += 1
+        self.retain(T)
 
     def extend(self, rows):
         for row in rows:
@@ -215,8 +315,8 @@ class Dynamic2DArray(object):
                       header='\t'.join(['{:e}'.format(h) for h in self.header]))
 
 
-class DynamicRecArray(object):
-    def __init__(self, columns, dtypes=None):
+class DynamicRecArray(RetainedRows):
+    def __init__(self, columns, dtypes=None, retention=None):
         if dtypes is None:
             dtypes = [float] * len(columns)
 
@@ -227,6 +327,7 @@ class DynamicRecArray(object):
 
         self.unit_names = [column[1] for column in columns]
         self.units = numpy.array([column[2] for column in columns])
+        self.retention = retention
 
         self.length = 0
         self.size = 10
@@ -252,7 +353,8 @@ class DynamicRecArray(object):
             index = self.length+1-index
         return self._data[:][index]
 
-    def append(self, rec):
+    def append(self, rec, T=None):
+        """ :param T: Temperature of the record for the `Retention` policy """
         if isinstance(rec, dict):
             rec = tuple(rec[column] for column in self.columns)
 
@@ -261,6 +363,8 @@ class DynamicRecArray(object):
             self._data = numpy.resize(self._data, self.size)
         self._data[self.length] = rec
         self.length += 1
+        self.count += 1
+        self.retain(T)
 
     def extend(self, recs):
         for rec in recs:
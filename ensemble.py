@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+# Ensemble of universes
+
+Parameter scans run the same particle content and interaction topology for many parameter points.\
+`EnsembleUniverse` evolves several such `Universe` objects in lockstep with a single control flow.\
+The only work it batches over the members is the update of the distribution functions:
+
+  * distribution functions and collision integrals of all members are rows of two ensemble\
+    arrays (members $\\times$ the flat state of the `DistributionState`), the collision integrals\
+    of all members are applied, checked and clipped by single NumPy calls
+  * with `COLLISION_THREADS > 1` the collision integrals of all members share the queue of the\
+    [[collision scheduler|interactions/scheduler.py]]; they are computed member by member otherwise
+  * parameters of the members are available as arrays with the leading ensemble axis (`values`)
+
+Everything else runs member by member in a Python loop, the same as in a standalone `Universe`:\
+the particle updates, the initialization of the interactions, the collision integrals themselves\
+(there is no batched call of the integration routines), the temperature equation, the step size\
+control, the equilibrium fast-forward and the steps of the `STIFF_SOLVER`. The members therefore\
+evolve exactly as standalone universes.
+
+Members keep their own `Params`, histories, checkpoints and output folders, so the per-species\
+code and the outputs of each member are the same as for a standalone `Universe`. Members that\
+reach the final temperature stop while the others continue.
+
+    ensemble = EnsembleUniverse([universe_1, universe_2, ...])
+    ensemble.evolve(T_final)
+"""
+import numpy
+
+from interactions import scheduler
+from particles.state import DistributionState, apply_collision_integrals
+
+
+class EnsembleUniverse(object):
+
+    """ ## Universes with the same particle content evolved in lockstep """
+
+    def __init__(self, universes):
+        self.universes = list(universes)
+        if not self.universes:
+            raise ValueError("Ensemble has no members")
+
+        topology = self.topology(self.universes[0])
+        for universe in self.universes[1:]:
+            if self.topology(universe) != topology:
+                raise ValueError("Ensemble members have different particle content or grids")
+
+        size = self.universes[0].state.size
+        self.distribution = numpy.zeros((len(self.universes), size))
+        self.collision_integral = numpy.zeros((len(self.universes), size))
+
+        for index, universe in enumerate(self.universes):
+            universe.state = DistributionState(universe.particles,
+                                               distribution=self.distribution[index],
+                                               collision_integral=self.collision_integral[index])
+
+    @property
+    def config(self):
+        """ Run configuration of the ensemble steps: the one of the first member """
+        return self.universes[0].config
+
+    def __len__(self):
+        return len(self.universes)
+
+    @staticmethod
+    def topology(universe):
+        return [(particle.name, particle.grid.MOMENTUM_SAMPLES) for particle in universe.particles]
+
+    def values(self, name):
+        """ Array of the parameter `name` of all members """
+        return numpy.array([getattr(universe.params, name) for universe in self.universes])
+
+    def evolve(self, T_final, export=True, init_time=True):
+        """ Evolve all members down to the temperature `T_final`. Members restored from a\
+            checkpoint resume their stage the same as `Universe.evolve` """
+        evolving = []
+        for universe in self.universes:
+            universe.stage += 1
+            if universe.stage < universe.resume_stage:
+                continue
+            resumed = universe.stage == universe.resume_stage
+
+            if init_time and not resumed:
+                universe.params.init_time(universe.total_energy_density())
+            if universe.params.rho is None:
+                universe.params.update(universe.total_energy_density(), universe.total_entropy())
+            if not resumed:
+                universe.save_params()
+            evolving.append(universe)
+
+        active = self.active(evolving, T_final)
+        while active:
+            for universe in active:
+                universe.log()
+
+            self.make_step([universe for universe in active if not universe.fast_forward(T_final)])
+
+            for universe in active:
+                universe.save()
+                universe.step += 1
+                if universe.folder and universe.step % universe.export_freq == 0:
+                    universe.store()
+                if universe.folder and universe.step % universe.checkpoint_freq == 0:
+                    universe.checkpoint()
+
+            active = self.active(evolving, T_final)
+
+        for universe in evolving:
+            if not (universe.params.T > 0):
+                raise RuntimeError("(T < 0): suspect numerical instability")
+            universe.log()
+            if export:
+                universe.export()
+
+        return [universe.data for universe in self.universes]
+
+    @staticmethod
+    def active(universes, T_final):
+        return [universe for universe in universes if universe.params.T > T_final]
+
+    def make_step(self, active):
+        """ Single step of the `active` members: only the update of the distribution functions is\
+            batched over the members """
+        if not active:
+            return
+
+        if self.config.STIFF_SOLVER:
+            for universe in active:
+                universe.make_step()
+            return
+
+        for universe in active:
+            universe.update_particles()
+            universe.init_interactions()
+
+        self.calculate_collisions(active)
+        self.update_distributions(active)
+
+        for universe in active:
+            universe.temperature_fraction()
+            if universe.step_monitor:
+                universe.step_monitor(universe)
+            universe.advance()
+
+    def calculate_collisions(self, active):
+        """ Collision integrals of all `active` members """
+        if self.config.COLLISION_THREADS <= 1:
+            for universe in active:
+                universe.calculate_collisions()
+            return
+
+        particles = [particle for universe in active for particle in universe.particles
+                     if particle.collision_integrals]
+        for particle, collision_integral in zip(particles, scheduler.calculate(particles)):
+            particle.collision_integral = collision_integral
+
+    def update_distributions(self, active):
+        """ Apply the collision integrals of all `active` members at once """
+        if any(universe.oscillations for universe in active):
+            for universe in active:
+                universe.update_distributions()
+            return
+
+        mask = numpy.zeros(self.distribution.shape, dtype=bool)
+        h = numpy.zeros((len(self), 1))
+        regulars = []
+        for universe in active:
+            index = self.universes.index(universe)
+            regular = universe.state.prepare_update()
+            mask[index] = universe.state.update_mask(regular)
+            h[index] = universe.params.h
+            regulars += regular
+
+        apply_collision_integrals(self.distribution, self.collision_integral, mask, h)
+
+        for particle in regulars:
+            particle.record_distribution()
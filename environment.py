@@ -22,10 +22,43 @@ defaults = {
     # while solving for the temperature evolution
     'ADAMS_BASHFORTH_TEMPERATURE_CORRECTION': True,
 
+    # Integrate the temperature and all distribution functions as a single ODE system with a stiff
+    # solver of `scipy.integrate` ('BDF' or 'Radau') instead of the fixed-step operator splitting
+    'STIFF_SOLVER': '',
+    # Jacobian of the system: diagonal loss terms of the collision integrals ('diagonal') or finite
+    # differences computed by the solver ('numerical')
+    'STIFF_JACOBIAN': 'diagonal',
+    # Relative and absolute tolerances of the stiff solver
+    'STIFF_SOLVER_RTOL': 1e-5,
+    'STIFF_SOLVER_ATOL': 1e-10,
+
+    # Whether the step size should be chosen from the local error estimates of the temperature and
+    # distribution functions updates instead of being fixed
+    'ADAPTIVE_TIMESTEP': False,
+    # The target relative local error of a single step with the adaptive step size. Steps above it
+    # are not repeated, only the following steps are made smaller
+    'ADAPTIVE_TIMESTEP_TOLERANCE': 1e-4,
+
+    # Whether the temperature should be integrated in large steps while all species are in the
+    # equilibrium or free-streaming, up to the next decoupling temperature or regime switch
+    'EQUILIBRIUM_FAST_FORWARD': False,
+    # The maximal step in $\ln a$ of the equilibrium fast-forward
+    'FAST_FORWARD_MAX_DY': 0.5,
+    # The maximal step in $\ln a$ of the equilibrium fast-forward while the input of the
+    # nucleosynthesis is recorded
+    'FAST_FORWARD_NUCLEOSYNTHESIS_DY': 0.05,
+    # Relative tolerance of the ODE solver of the equilibrium fast-forward
+    'FAST_FORWARD_RTOL': 1e-8,
+
     # Whether the code should use Adams-Moulton or implicit Euler numerical scheme
     # while solving for the distribution function evolution
     'ADAMS_MOULTON_DISTRIBUTION_CORRECTION': False,
 
+    # The numerical scheme of the distribution functions evolution $f' = A + B f$: Adams-Moulton
+    # method ('adams_moulton') or exponential time differencing of the first ('etd1') or second
+    # ('etd2') order that integrates the loss term $B f$ exactly and stays stable for $B h \ll -1$
+    'DISTRIBUTION_SOLVER': 'adams_moulton',
+
     # The default number of points on the momentum space grid
     'MOMENTUM_SAMPLES': 401,
     # The maximal value on the momentum space grid in MeV
@@ -54,15 +87,142 @@ defaults = {
 
     'LAGUERRE_GAUSS_FOR_MASSIVE_EQUILIBRIUM_PARTICLES': True,
 
+    # Take the thermodynamical quantities of the intermediate regime and the terms of the
+    # temperature equation of massive equilibrium particles from the tables of the functions of
+    # $M / T$ instead of integrating them at every step
+    'TABULATED_EQUILIBRIUM_THERMODYNAMICS': False,
+    # Relative interpolation error of the equilibrium tables
+    'EQUILIBRIUM_TABLE_TOLERANCE': 1e-8,
+
+    # Number of the latest rows of the particle histories (distribution functions, collision
+    # integrals and parameters) kept for the solvers, 0 keeps the complete histories
+    'HISTORY_WINDOW': 0,
+    # Older rows of the bounded histories kept for the output: every `HISTORY_ARCHIVE_EVERY`-th
+    # row and the rows at which $\ln T$ has dropped by `HISTORY_ARCHIVE_DLNT` since the last kept one
+    'HISTORY_ARCHIVE_EVERY': 0,
+    'HISTORY_ARCHIVE_DLNT': 0.,
+    # Store the history of the distribution functions in single precision (the collision
+    # integrals used by the solvers are always kept in double precision)
+    'HISTORY_FLOAT32': False,
+
+    # Light elements abundances are computed by the external KAWANO program ('kawano', output in
+    # `kawano_output.dat`) or by the built-in reaction network ('network', `network_output.dat`)
+    'NUCLEOSYNTHESIS': 'kawano',
+
+    # Number of workers that compute the collision integrals of all particles in a shared pool.
+    # With a single worker particles and integrals are computed one by one, each integral is
+    # parallelized over momenta with OpenMP
+    'COLLISION_THREADS': 1,
+    # Number of momenta in a single work item of the collision integrals pool
+    'COLLISION_CHUNK_SIZE': 4,
+
+    # Quadrature engine of the four-particle collision integrals: nested adaptive Gauss-Kronrod
+    # rules ('adaptive') or the fixed-order tensor product of the Gauss-Legendre rules of the
+    # `FOUR_PARTICLE_GAUSS_ORDER` on the kinematically allowed domains ('gauss_legendre')
+    'FOUR_PARTICLE_QUADRATURE': 'adaptive',
+    # The order of the Gauss-Legendre rules of the four-particle engine in both momenta: every
+    # momentum takes its square kernel evaluations, so it is lower than the 1D `GAUSS_LEGENDRE_ORDER`
+    'FOUR_PARTICLE_GAUSS_ORDER': 40,
+
+    # Precompute the kinematic part of the four-particle collision integrals on a fixed lattice
+    # and reuse it while the grids and conformal masses of the reactants stay the same
+    'TABULATED_COLLISION_KERNELS': False,
+    # The order of the Gauss-Legendre lattice of the tabulated kernels in both momenta
+    'TABULATED_KERNEL_ORDER': 40,
+    # Change of the squared conformal mass of any reactant in units of $(aT)^2$ that triggers
+    # a rebuild of the table. It grows by $2 (m / T)^2 dy$ per step: the electrons at 1 MeV reuse
+    # a table for about 6 steps of `dy = 0.003125`, and for about 25 steps at 2 MeV
+    'TABULATED_KERNEL_MASS_TOLERANCE': 1e-2,
+    # Memory budget of the tabulated kernels cache in MB
+    'COLLISION_KERNEL_CACHE_MB': 1024,
+
+    # Replace the four-particle collision integrals by their linear expansion in the distribution
+    # functions of the non-equilibrium reactants around a reference state (near-equilibrium regime)
+    'LINEARIZED_COLLISIONS': False,
+    # Deviation of any distribution function from the reference state (relative to its maximum)
+    # that triggers a rebuild of the expansion
+    'LINEARIZED_DEVIATION_TOLERANCE': 1e-3,
+    # Drift of the squared conformal masses and temperatures of the reactants (in units of $aT$)
+    # that triggers a rebuild of the expansion. The expansion includes the first derivatives in
+    # these parameters, so the drift only bounds the second order terms
+    'LINEARIZED_TEMPERATURE_TOLERANCE': 1e-2,
+
 }
 
 
-def get(name):
+# String values of the boolean settings that mean `False`
+FALSE_STRINGS = ('', '0', 'false', 'no', 'off')
+
+
+def parse(name, value):
+    """ Cast the string `value` of the setting `name` to the type of its default """
     default = defaults.get(name)
-    val = os.environ.get(name, default)
+    if default is None or not isinstance(value, str):
+        return value
+    if isinstance(default, bool):
+        return value.strip().lower() not in FALSE_STRINGS
+    return type(default)(value)
 
-    if default:
-        typ = type(default)
-        val = typ(val)
 
-    return val
+def get(name):
+    """ Current value of the setting `name` from the process environment or its default.\
+        Settings without a default (state of the kinematics helpers) are returned as strings """
+    if name in os.environ:
+        return parse(name, os.environ[name])
+    return defaults.get(name)
+
+
+class Configuration(object):
+
+    """ ## Run configuration
+
+        Immutable typed settings resolved once: the `defaults` overridden by the process\
+        environment and then by the keyword `overrides`. Every `Universe` carries its own\
+        configuration in `Params.config`, so runs in one process can use different settings\
+        without touching the process environment:
+
+            config = Configuration(LOGARITHMIC_TIMESTEP=False)
+            universe = Universe(params=Params(T=T, dx=dx, config=config))
+            config.REGIME_SWITCHING_FACTOR
+    """
+
+    def __init__(self, **overrides):
+        settings = {name: get(name) for name in defaults}
+        for name, value in overrides.items():
+            if name not in defaults:
+                raise KeyError("Unknown setting {}".format(name))
+            settings[name] = parse(name, value)
+        object.__setattr__(self, '_settings', settings)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._settings[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Configuration is immutable, use `replace` to change {}".format(name))
+
+    def __getstate__(self):
+        return self._settings
+
+    def __setstate__(self, settings):
+        object.__setattr__(self, '_settings', settings)
+
+    def __repr__(self):
+        return "Configuration({})".format(", ".join(
+            "{}={!r}".format(name, value) for name, value in sorted(self._settings.items())
+        ))
+
+    def get(self, name):
+        """ Value of the setting `name`, the ones without a default are read from the process\
+            environment like by `environment.get` """
+        if name in self._settings:
+            return self._settings[name]
+        return get(name)
+
+    def replace(self, **overrides):
+        """ New configuration with the given settings changed """
+        return Configuration(**dict(self._settings, **overrides))
@@ -1,16 +1,25 @@
 # -*- coding: utf-8 -*-
 
 import os
-import sys
 import time
+import pickle
 import shutil
+from collections import OrderedDict
 from datetime import timedelta
 
-import environment
-from common import CONST, UNITS, Params, utils
-from common.integrators import adams_bashforth_correction, MAX_ADAMS_BASHFORTH_ORDER
+import numpy
+from scipy import integrate
+
+from common import CONST, UNITS, Params, utils, storage
+from common.integrators import (
+    adams_bashforth_correction, adams_bashforth_error, MAX_ADAMS_BASHFORTH_ORDER
+)
+from common.integrators.method_of_lines import MethodOfLines
+from interactions import scheduler
+from particles.state import DistributionState
 
 import kawano
+import nucleosynthesis
 
 
 class Universe(object):
@@ -18,22 +27,37 @@ class Universe(object):
     """ ## Universe
         The master object that governs the calculation. """
 
-    # System state is rendered to the evolution.txt file each `export_freq` steps
+    # New rows of the system state are appended to the evolution.bin file each `export_freq` steps
     export_freq = 100
+    # Binary snapshot of the system state is written each `checkpoint_freq` steps
+    checkpoint_freq = 1000
+    checkpoint_name = "checkpoint.pickle"
     log_throttler = None
     clock_start = None
+    # Output of the run: `stdout` and the log file in the `folder`
+    logger = None
+    logfile = None
 
     particles = None
     interactions = None
+    # Contiguous buffers of the distribution functions and collision integrals of all particles
+    state = None
 
     kawano = None
+    # Electrons and neutrinos that define the weak rates of the nucleosynthesis input
+    kawano_particles = None
     kawano_log = None
+    abundances = None
 
     oscillations = None
 
     step_monitor = None
 
-    data = utils.DynamicRecArray([
+    # Stiff solver of the whole system used instead of the fixed-step scheme with `STIFF_SOLVER`
+    method_of_lines = None
+
+    # Columns of the history of the cosmological parameters, kept in `data` of every instance
+    data_columns = [
         ['aT', 'MeV', UNITS.MeV],
         ['T', 'MeV', UNITS.MeV],
         ['a', None, 1],
@@ -43,35 +67,56 @@ class Universe(object):
         ['N_eff', None, 1],
         ['fraction', None, 1],
         ['S', 'MeV^3', UNITS.MeV**3]
-    ])
+    ]
+    data = None
 
-    def __init__(self, folder=None, params=None, max_log_rate=2):
+    def __init__(self, folder=None, params=None, max_log_rate=2, resume=False, config=None):
         """
         :param folder: Log file path (current `datetime` by default)
+        :param resume: Keep the contents of `folder` if it holds a checkpoint to `resume` from
+        :param config: Run configuration (`environment.Configuration`) that replaces the one of\
+            the `params`
         """
 
         self.particles = []
         self.interactions = []
+        self.data = utils.DynamicRecArray(self.data_columns)
 
         self.clock_start = time.time()
+        self.logger = utils.Logger()
         self.log_throttler = utils.Throttler(max_log_rate)
 
         self.params = params
         if not self.params:
             self.params = Params()
+        if config is not None:
+            self.params.config = config
+            self.params.infer()
 
         self.folder = folder
+        resume = resume and bool(self.folder) and os.path.exists(self.checkpoint_path)
         if self.folder:
-            if os.path.exists(folder):
+            if os.path.exists(folder) and not resume:
                 shutil.rmtree(folder)
-            self.init_log(folder=folder)
+            self.init_log(folder=folder, append=resume)
+
+        self.stores = {}
 
         self.fraction = 0
 
         self.step = 1
 
+        # Consecutive `evolve` calls are counted to skip the ones completed before the checkpoint
+        self.stage = 0
+        self.resume_stage = 0
+
+    @property
+    def config(self):
+        """ Run configuration shared by the particles and integrals through `Params` """
+        return self.params.config
+
     def init_kawano(self, datafile='s4.dat', **kwargs):
-        kawano.init_kawano(**kwargs)
+        self.kawano_particles = kawano.init_kawano(**kwargs)
         if self.folder:
             self.kawano_log = open(os.path.join(self.folder, datafile), 'w')
             self.kawano_log.write("\t".join([col[0] for col in kawano.heading]) + "\n")
@@ -83,7 +128,7 @@ class Universe(object):
         if self.oscillation_matter:
             MSW_12 = CONST.MSW_constant * self.oscillation_particles[0].grid.TEMPLATE**2 * self.params.T**4 / CONST.delta_m12_sq / self.params.a**2
             MSW_13 = CONST.MSW_constant * self.oscillation_particles[0].grid.TEMPLATE**2 * self.params.T**4 / CONST.delta_m13_sq / self.params.a**2
-            if not environment.get("NORMAL_HIERARCHY_NEUTRINOS"):
+            if not self.config.NORMAL_HIERARCHY_NEUTRINOS:
                 MSW_13 *= -1
 
         else:
@@ -99,6 +144,7 @@ class Universe(object):
         self.oscillation_matter = matter_effects
         self.oscillation_parameters()
 
+    @utils.logged
     def evolve(self, T_final, export=True, init_time=True):
         """
         ## Main computing routine
@@ -110,47 +156,50 @@ class Universe(object):
         long before then BBN. Then most particle species are in the thermodynamical equilibrium.
 
         """
+        self.stage += 1
+        if self.stage < self.resume_stage:
+            return self.data
+        resumed = self.stage == self.resume_stage
+
         T_initial = self.params.T
 
-        print("\n\n" + "#"*32 + " Initial states " + "#"*32 + "\n")
+        utils.log("\n\n" + "#"*32 + " Initial states " + "#"*32 + "\n")
         for particle in self.particles:
-            print(particle)
-        print("\n\n" + "#"*34 + " Log output " + "#"*34 + "\n")
+            utils.log(particle)
+        utils.log("\n\n" + "#"*34 + " Log output " + "#"*34 + "\n")
 
         for interaction in self.interactions:
             if interaction.integrals:
-                print(interaction)
-        print("\n")
+                utils.log(interaction)
+        utils.log("\n")
 
         # TODO: test if changing updating particles beforehand changes the computed time
-        if init_time:
+        if init_time and not resumed:
             self.params.init_time(self.total_energy_density())
 
         if self.params.rho is None:
 #            self.update_particles()
             self.params.update(self.total_energy_density(), self.total_entropy())
-        self.save_params()
+        if not resumed:
+            self.save_params()
 
         while self.params.T > T_final:
             try:
                 self.log()
-                self.make_step()
+                if not self.fast_forward(T_final):
+                    self.make_step()
                 self.save()
                 self.step += 1
                 if self.folder and self.step % self.export_freq == 0:
-                    with open(os.path.join(self.folder, "evolution.txt"), "wb") as f:
-                        self.data.savetxt(f)
-                    if self.kawano:
-                        with open(os.path.join(self.folder, "kawano.txt"), "wb") as f:
-                            self.kawano_data.savetxt(f)
+                    self.store()
+                if self.folder and self.step % self.checkpoint_freq == 0:
+                    self.checkpoint()
             except KeyboardInterrupt:
-                print("\nKeyboard interrupt!")
-                sys.exit(1)
-                break
+                utils.log("\nKeyboard interrupt!")
+                raise
 
         if not (self.params.T > 0):
-            print("\n(T < 0): suspect numerical instability")
-            sys.exit(1)
+            raise RuntimeError("(T < 0): suspect numerical instability")
 
         self.log()
         if export:
@@ -158,43 +207,292 @@ class Universe(object):
 
         return self.data
 
+    @utils.logged
     def export(self):
-        print("\n\n" + "#"*33 + " Final states " + "#"*33 + "\n")
+        utils.log("\n\n" + "#"*33 + " Final states " + "#"*33 + "\n")
         for particle in self.particles:
-            print(particle)
-        print("\n")
+            utils.log(particle)
+        utils.log("\n")
+        utils.log("Memory of the histories: {:.1f} MB".format(self.memory_report()['Total'] / 2.**20))
+
+        if self.kawano and self.config.NUCLEOSYNTHESIS == 'network':
+            self.abundances = nucleosynthesis.solve(self.kawano_data)
+            utils.log("Observables:", ", ".join("{} = {:e}".format(name, value)
+                                                for name, value in self.abundances.observables().items()))
 
         if self.folder:
             if self.kawano:
 
                 self.kawano_log.close()
-                print(kawano.run(self.folder))
-
-                with open(os.path.join(self.folder, "kawano.txt"), "wb") as f:
-                    self.kawano_data.savetxt(f)
+                if self.abundances:
+                    self.abundances.savetxt(os.path.join(self.folder, 'network_output.dat'))
+                else:
+                    utils.log(kawano.run(self.folder, config=self.config))
+
+            utils.log("Execution log saved to file {}".format(self.logfile))
+            self.logger.flush()
+
+            self.store()
+            for store in self.stores.values():
+                storage.to_txt(store.path)
+
+    def store(self):
+        """ Append the new rows of the data arrays to the binary files in the output folder """
+        arrays = {'evolution': self.data}
+        if self.kawano:
+            arrays['kawano'] = self.kawano_data
+
+        for name, array in arrays.items():
+            if name not in self.stores:
+                self.stores[name] = storage.RecArrayStore(os.path.join(self.folder, name + ".bin"))
+            self.stores[name].flush(array)
+
+    def memory_report(self):
+        """ Memory (in bytes) allocated for the histories of the system state and of every\
+            particle species, bounded by the `HISTORY_WINDOW` settings """
+        report = OrderedDict([('Universe', self.data.nbytes)])
+        if self.kawano:
+            report['Kawano'] = self.kawano_data.nbytes
+        for particle in self.particles:
+            report[particle.name] = sum(history.nbytes for history in particle.data.values())
+        report['Total'] = sum(report.values())
+        return report
+
+    @property
+    def checkpoint_path(self):
+        return os.path.join(self.folder, self.checkpoint_name)
+
+    def snapshot(self):
+        """ Complete dynamical state of the system: cosmological parameters, distribution\
+            functions of the particle species and the histories used by the multistep methods """
+        return {
+            'stage': self.stage,
+            'step': self.step,
+            'fraction': self.fraction,
+            'params': {key: value for key, value in vars(self.params).items() if key != 'config'},
+            'data': self.data,
+            'kawano_data': self.kawano_data if self.kawano else None,
+            'particles': [particle.snapshot() for particle in self.particles],
+            'state': self.state.snapshot() if self.state is not None else None
+        }
+
+    def restore(self, snapshot):
+        """ Restore the system state saved by `snapshot`. Particles and interactions have to be\
+            set up the same way as in the run that produced it """
+        if len(snapshot['particles']) != len(self.particles):
+            raise ValueError("Snapshot contains {} particle species instead of {}"
+                             .format(len(snapshot['particles']), len(self.particles)))
+
+        vars(self.params).update(snapshot['params'])
+        for particle, state in zip(self.particles, snapshot['particles']):
+            particle.restore(state)
+        if snapshot.get('state') is not None:
+            self.state.restore(snapshot['state'])
+
+        self.data = snapshot['data']
+        self.fraction = snapshot['fraction']
+        self.step = snapshot['step']
+        self.resume_stage = snapshot['stage']
+        self.stage = 0
+
+        if self.kawano and snapshot['kawano_data'] is not None:
+            self.kawano_data = snapshot['kawano_data']
+            if self.kawano_log:
+                for i in range(len(self.kawano_data)):
+                    self.kawano_log.write(self.kawano_data.row_repr(i) + "\n")
+
+    def checkpoint(self):
+        """ Write the system state to the output folder. The file is replaced atomically, so an\
+            interrupted run always leaves the previous checkpoint intact """
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self.snapshot(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    @utils.logged
+    def resume(self, folder=None):
+        """ Continue the computation from the last checkpoint saved in the `folder`
+
+            The `evolve` calls that were completed before the checkpoint are skipped and the one\
+            that was interrupted continues from the saved step.
+
+            :return: `True` if the checkpoint was found and restored
+        """
+        path = os.path.join(folder or self.folder, self.checkpoint_name)
+        if not os.path.exists(path):
+            return False
 
-            print("Execution log saved to file {}".format(self.logfile))
+        with open(path, "rb") as f:
+            self.restore(pickle.load(f))
 
-            with open(os.path.join(self.folder, "evolution.txt"), "wb") as f:
-                self.data.savetxt(f)
+        utils.log("Resumed from {} at step #{}, T = {:e} MeV"
+                  .format(path, self.step, self.params.T / UNITS.MeV))
+        return True
 
     def make_step(self):
+        if self.config.STIFF_SOLVER:
+            if self.method_of_lines is None:
+                self.method_of_lines = MethodOfLines(self)
+            self.method_of_lines.step()
+            self.log_throttler.update()
+            return
+
         self.integrand(self.params.x, self.params.aT)
 
         if self.step_monitor:
             self.step_monitor(self)
 
-        if environment.get('ADAMS_BASHFORTH_TEMPERATURE_CORRECTION'):
-            fs = (list(self.data['fraction'][-MAX_ADAMS_BASHFORTH_ORDER:]) + [self.fraction])
+        self.advance()
 
-            self.params.aT += adams_bashforth_correction(fs=fs, h=self.params.h)
+    def advance(self):
+        """ Advance the temperature and the scale factor over the step from the `fraction` of the\
+            temperature equation computed by the `integrand` """
+        fs = (list(self.data['fraction'][-MAX_ADAMS_BASHFORTH_ORDER:]) + [self.fraction])
+        if self.config.ADAMS_BASHFORTH_TEMPERATURE_CORRECTION:
+            order = min(MAX_ADAMS_BASHFORTH_ORDER, len(fs))
+            self.params.aT += adams_bashforth_correction(fs=fs, h=self.params.h,
+                                                         hs=self.params.steps)
         else:
+            order = 1
             self.params.aT += self.fraction * self.params.h
 
+        if self.config.ADAPTIVE_TIMESTEP:
+            # The error of the method is estimated by the difference with the next order method
+            error = max(
+                [adams_bashforth_error(fs, h=self.params.h,
+                                       order=min(order + 1, len(fs), MAX_ADAMS_BASHFORTH_ORDER),
+                                       hs=self.params.steps) / abs(self.params.aT)]
+                + [particle.distribution_error() for particle in self.particles]
+            )
+
         self.params.x += self.params.dx
         self.params.update(self.total_energy_density(), self.total_entropy())
 
+        self.params.steps = (self.params.steps + [self.params.h])[-MAX_ADAMS_BASHFORTH_ORDER:]
+        if self.config.ADAPTIVE_TIMESTEP:
+            self.adapt_step(error, order)
+
+        self.log_throttler.update()
+
+    def adapt_step(self, error, order):
+        """ Choose the size of the next step from the relative local `error` estimate of the last\
+            one made by the method of the given `order`:
+
+            \begin{equation}
+                h_{n+1} = h_n \min\left(2, \max\left(\frac12,
+                    0.9 \left(\frac{\epsilon}{err}\right)^{\frac{1}{order+1}}\right)\right)
+            \end{equation}
+
+            bounded by `Params.h_min` and `Params.h_max`.
+
+            Steps are never rejected: the collision integrals of a step are too expensive to be\
+            recomputed. A step whose `error` exceeds `ADAPTIVE_TIMESTEP_TOLERANCE` is kept and only\
+            the next step is shrunk (at most by half per step), so the tolerance bounds the error\
+            of the steps that follow a sudden change rather than of every step.
+        """
+        tolerance = self.config.ADAPTIVE_TIMESTEP_TOLERANCE
+
+        factor = 2.
+        if error > 0:
+            factor = min(2., max(.5, .9 * (tolerance / error) ** (1. / (order + 1))))
+
+        h = min(self.params.h_max, max(self.params.h_min, self.params.h * factor))
+        self.params.set_step(h, nominal=False)
+
+    def equilibrium_events(self, T_final):
+        """ Temperatures below the current one at which the description of the equilibrium system\
+            changes: decoupling and regime switching of the species, the start of the\
+            nucleosynthesis output and the final temperature """
+        regime_factor = self.config.REGIME_SWITCHING_FACTOR
+
+        events = [T_final]
+        if self.kawano:
+            events.append(self.kawano.T_kawano)
+        for particle in self.particles:
+            events.append(particle.decoupling_temperature)
+            if particle.mass > 0:
+                events += [particle.mass * regime_factor, particle.mass / regime_factor]
+
+        return [T for T in events if T < self.params.T]
+
+    def fast_forward(self, T_final):
+        """ ## Equilibrium fast-forward
+
+            While all species are in the equilibrium or free-streaming, there are no collision\
+            integrals to compute and the temperature equation expresses the conservation of\
+            entropy. With `EQUILIBRIUM_FAST_FORWARD` such windows are integrated by an explicit\
+            high-order ODE solver in steps of up to `FAST_FORWARD_MAX_DY` in $\ln a$, until the\
+            next of the `equilibrium_events`.
+
+            The last `MAX_ADAMS_BASHFORTH_ORDER` steps before the event are of the regular size, so\
+            the kinetic solver takes over with a uniform history of the temperature equation.
+
+            :return: `False` if the step has to be made by `make_step`
+        """
+        if not self.config.EQUILIBRIUM_FAST_FORWARD:
+            return False
+        self.mark_free_streaming()
+        if not all(particle.in_equilibrium or particle.free_streaming for particle in self.particles):
+            return False
+
+        params = self.params
+        logarithmic = self.config.LOGARITHMIC_TIMESTEP
+
+        # Distance to the event in the units of the step assuming the conservation of $aT$: in the
+        # equilibrium $aT$ can only grow, so the event is never overshot
+        T_event = max(self.equilibrium_events(T_final))
+        longest = self.config.FAST_FORWARD_MAX_DY
+        if self.kawano and params.T <= self.kawano.T_kawano:
+            longest = min(longest, self.config.FAST_FORWARD_NUCLEOSYNTHESIS_DY)
+        if logarithmic:
+            distance = numpy.log(params.T / T_event)
+        else:
+            distance = params.x * (params.T / T_event - 1.)
+            longest = params.x * numpy.expm1(longest)
+
+        regular = MAX_ADAMS_BASHFORTH_ORDER * params.h
+        if distance < regular + params.h:
+            return False
+        h = params.h if distance < 2 * regular + params.h else min(longest, distance - 2 * regular)
+
+        self.update_particles()
+        fraction = self.temperature_fraction()
+        if self.step_monitor:
+            self.step_monitor(self)
+
+        start = numpy.log(params.a) if logarithmic else params.x
+        solution = integrate.solve_ivp(self.equilibrium_derivatives, (start, start + h),
+                                       [params.aT, params.t], method='DOP853',
+                                       rtol=self.config.FAST_FORWARD_RTOL)
+        if not solution.success:
+            raise RuntimeError("Equilibrium fast-forward failed: {}".format(solution.message))
+
+        aT, t = solution.y[:, -1]
+        params.set_state(x=params.m * numpy.exp(start + h) if logarithmic else start + h, aT=aT, t=t)
+        self.update_particles(record=False)
+        params.update(self.total_energy_density(), self.total_entropy(), advance_time=False)
+        params.steps = (params.steps + [h])[-MAX_ADAMS_BASHFORTH_ORDER:]
+
+        # The history keeps the right-hand side at the beginning of the step
+        self.fraction = fraction
+        if self.method_of_lines is not None:
+            self.method_of_lines.solver = None
+
         self.log_throttler.update()
+        return True
+
+    def equilibrium_derivatives(self, coordinate, vector):
+        """ Derivatives of $(aT, t)$ over $\ln a$ (or $x$) of the system in the equilibrium """
+        params = self.params
+        logarithmic = self.config.LOGARITHMIC_TIMESTEP
+
+        x = params.m * numpy.exp(coordinate) if logarithmic else coordinate
+        params.set_state(x=x, aT=vector[0], t=vector[1])
+        self.update_particles(record=False)
+        params.update(self.total_energy_density(), self.total_entropy(), advance_time=False)
+
+        dt = 1. / params.H if logarithmic else 1. / (x * params.H)
+        return [self.temperature_fraction(), dt]
 
     def add_particles(self, particles):
         for particle in particles:
@@ -203,14 +501,37 @@ class Universe(object):
         self.particles += particles
 
         self.particles = utils.particle_orderer(self.particles)
+        self.state = DistributionState(self.particles)
 
-    def update_particles(self):
+    @utils.logged
+    def update_particles(self, record=True):
         """ ### 1. Update particles state
             Update particle species distribution functions, check for regime switching,\
             update precalculated variables like energy density and pressure. """
 
+        self.mark_free_streaming()
         for particle in self.particles:
-            particle.update()
+            particle.update(record=record)
+
+    def mark_free_streaming(self):
+        """ Flag the non-equilibrium species that take part in no interaction (e.g. after the\
+            interactions are switched off): their thermodynamics is computed from the cached\
+            comoving moments of the distribution functions """
+        colliding = [item.specie for interaction in self.interactions
+                     for integral in interaction.integrals for item in integral.reaction]
+        # Oscillations mix the collision integrals of the flavours
+        if self.oscillations:
+            _, flavours = self.oscillations
+            if any(flavour is specie for flavour in flavours for specie in colliding):
+                colliding += flavours
+
+        for particle in self.particles:
+            particle.free_streaming = (
+                not particle.in_equilibrium
+                and not hasattr(particle, 'fast_decay')
+                and (particle.thermal_dyn or getattr(particle, 'Q', 0) == 0)
+                and all(particle is not specie for specie in colliding)
+            )
 
     def init_interactions(self):
         """ ### 2. Initialize non-equilibrium interactions
@@ -230,6 +551,11 @@ class Universe(object):
 
         particles = [particle for particle in self.particles if particle.collision_integrals]
 
+        if self.config.COLLISION_THREADS > 1:
+            for particle, collision_integral in zip(particles, scheduler.calculate(particles)):
+                particle.collision_integral = collision_integral
+            return
+
         with utils.printoptions(precision=3, linewidth=100):
             for particle in particles:
                 # with (utils.benchmark(lambda: "δf/f ({}) = {}".format(particle.symbol, particle.collision_integral / particle._distribution * self.params.h),
@@ -245,14 +571,18 @@ class Universe(object):
 
             if any(self.params.T < A.decoupling_temperature for A in particles):
 
-                integrals = {A.flavour: A.collision_integral for A in particles}
+                # Collision integrals are views into the shared buffer that is overwritten below
+                integrals = {A.flavour: A.collision_integral.copy() for A in particles}
 
                 for A in particles:
                     A.collision_integral = sum(pattern[(A.flavour, B.flavour)] * integrals[B.flavour]
                                                for B in particles)
 
-        for particle in self.particles:
-            particle.update_distribution()
+        if self.state is not None:
+            self.state.update_distributions(self.params.h)
+        else:
+            for particle in self.particles:
+                particle.update_distribution()
 
     def calculate_temperature_terms(self):
         """ ### 5. Calculate temperature equation terms """
@@ -293,9 +623,13 @@ class Universe(object):
         # 4\. Update particles distributions
         self.update_distributions()
         # 5\. Calculate temperature equation terms
+        return self.temperature_fraction()
+
+    def temperature_fraction(self):
+        """ Right-hand side of the temperature equation from the current state of the particles """
         numerator, denominator = self.calculate_temperature_terms()
 
-        if environment.get('LOGARITHMIC_TIMESTEP'):
+        if self.config.LOGARITHMIC_TIMESTEP:
             self.fraction = self.params.x * numerator / denominator
         else:
             self.fraction = numerator / denominator
@@ -315,6 +649,7 @@ class Universe(object):
             'S': self.params.S
         })
 
+    @utils.logged
     def save(self):
         """ Save current Universe parameters into the data arrays or output files """
         self.save_params()
@@ -324,9 +659,9 @@ class Universe(object):
             #     t[s]         x    Tg[10^9K]   dTg/dt[10^9K/s] rho_tot[g cm^-3]     H[s^-1]
             # n nue->p e  p e->n nue  n->p e nue  p e nue->n  n e->p nue  p nue->n e
 
-            rates = self.kawano.baryonic_rates(self.params.a)
+            rates = self.kawano.baryonic_rates(self.params.a, self.kawano_particles)
 
-            if environment.get('LOGARITHMIC_TIMESTEP'):
+            if self.config.LOGARITHMIC_TIMESTEP:
                 dTdt = (self.fraction - self.params.aT) * self.params.H / self.params.a
             else:
                 dTdt = (self.fraction - self.params.T / self.params.m) * self.params.H * self.params.m
@@ -346,27 +681,29 @@ class Universe(object):
             self.kawano_data.append(row)
 
             if self.log_throttler.output:
-                print("KAWANO", self.kawano_data.row_repr(-1, names=True))
-            self.kawano_log.write(self.kawano_data.row_repr(-1) + "\n")
+                utils.log("KAWANO", self.kawano_data.row_repr(-1, names=True))
+            if self.kawano_log:
+                self.kawano_log.write(self.kawano_data.row_repr(-1) + "\n")
 
-    def init_log(self, folder=''):
+    def init_log(self, folder='', append=False):
         self.logfile = utils.ensure_path(os.path.join(self.folder, 'log.txt'))
-        sys.stdout = utils.Logger(self.logfile)
+        self.logger = utils.Logger(self.logfile, "ab" if append else "wb")
 
+    @utils.logged
     def log(self):
         """ Runtime log output """
 
         # Print parameters every now and then
         if self.log_throttler.output:
-            print('[{clock}] #{step}\tt = {t:e} s\taT = {aT:e} MeV\tT = {T:e} MeV'
-                  '\tδaT/aT = {daT:e}\tS = {S:e} MeV^3'
-                  .format(clock=timedelta(seconds=int(time.time() - self.clock_start)),
-                          step=self.step,
-                          t=self.params.t / UNITS.s,
-                          aT=self.params.aT / UNITS.MeV,
-                          T=self.params.T / UNITS.MeV,
-                          daT=self.fraction * self.params.h / self.params.aT,
-                          S=self.params.S / UNITS.MeV**3))
+            utils.log('[{clock}] #{step}\tt = {t:e} s\taT = {aT:e} MeV\tT = {T:e} MeV'
+                        '\tδaT/aT = {daT:e}\tS = {S:e} MeV^3'
+                        .format(clock=timedelta(seconds=int(time.time() - self.clock_start)),
+                                step=self.step,
+                                t=self.params.t / UNITS.s,
+                                aT=self.params.aT / UNITS.MeV,
+                                T=self.params.T / UNITS.MeV,
+                                daT=self.fraction * self.params.h / self.params.aT,
+                                S=self.params.S / UNITS.MeV**3))
 
     def total_entropy(self):
         return sum(particle.entropy for particle in self.particles) #* (self.params.a_ini/self.params.a)**3
@@ -43,6 +43,12 @@ class BoltzmannIntegral(object):
     """ Grids corresponding to particles integrated over """
     grids = None
 
+    # Reaction structure of the C++ integration routines and the state of the reactants it holds
+    creaction = None
+    creaction_key = None
+    creaction_grids = None
+    creaction_grids_key = None
+
     def __init__(self, **kwargs):
         """ Update self with configuration `kwargs`, construct particles list and \
             energy conservation law of the integral. """
@@ -75,6 +81,48 @@ class BoltzmannIntegral(object):
         """
         raise NotImplementedError()
 
+    def reaction_views(self, grid_t, particle_t, reaction_t):
+        """ Reaction structure of the C++ integration routines. Grids and distribution functions\
+            of the reactants are passed as views of their arrays: the distribution functions\
+            updated in place are seen without a rebuild. The grids in units of $aT$ are rebuilt\
+            only when $aT$ changes or a distribution function is replaced by a new array. The\
+            conformal masses grow with the scale factor at every step, so the changes of the\
+            masses, temperatures and regimes of the reactants only rebuild the light structures\
+            around the same grids """
+        aT = self.particle.params.aT
+        grids_key = (aT, ) + tuple(id(item.specie._distribution) for item in self.reaction)
+
+        if self.creaction_grids is None or grids_key != self.creaction_grids_key:
+            self.creaction_grids = [
+                grid_t(grid=item.specie.grid.TEMPLATE / aT, distribution=item.specie._distribution)
+                for item in self.reaction
+            ]
+            self.creaction_grids_key = grids_key
+            self.creaction = None
+
+        key = tuple(
+            (item.specie.conformal_mass / aT, item.specie.aT / aT, item.specie.in_equilibrium)
+            for item in self.reaction
+        )
+
+        if self.creaction is None or key != self.creaction_key:
+            self.creaction = [
+                reaction_t(
+                    specie=particle_t(
+                        m=m,
+                        grid=grid,
+                        eta=int(item.specie.eta),
+                        in_equilibrium=int(in_equilibrium),
+                        T=T
+                    ),
+                    side=item.side
+                )
+                for item, grid, (m, T, in_equilibrium) in zip(self.reaction, self.creaction_grids, key)
+            ]
+            self.creaction_key = key
+
+        return self.creaction
+
     def rates(self):
         forward_integral = numpy.vectorize(lambda p0: p0**2 / (2 * numpy.pi)**3
                                            * self.integrate(p0, self.F_A)[0])
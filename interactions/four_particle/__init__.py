@@ -3,12 +3,15 @@ import numpy
 from scipy.integrate import simps
 from scipy.interpolate import interp1d, UnivariateSpline
 import os
-import environment
 from collections import Counter
 from common import CONST, UNITS, kinematics
+from common.integrators import gauss_legendre
 from interactions.boltzmann import BoltzmannIntegral
+from interactions.four_particle import tables, linearized
+from interactions import scheduler
 from interactions.four_particle.cpp.integral import (
-    integration, M_t, grid_t, particle_t, reaction_t,
+    integration, integration_split, integration_fixed, integration_split_fixed,
+    M_t, grid_t, particle_t, reaction_t,
     CollisionIntegralKind
 )
 
@@ -86,6 +89,9 @@ class FourParticleM(object):
 
 class FourParticleIntegral(BoltzmannIntegral):
 
+    # Linear expansion of the integral used with `LINEARIZED_COLLISIONS`
+    linearization = None
+
     def __init__(self, **kwargs):
         super(FourParticleIntegral, self).__init__(**kwargs)
 
@@ -99,7 +105,6 @@ class FourParticleIntegral(BoltzmannIntegral):
         if self.grids is None:
             self.grids = tuple([self.reaction[1].specie.grid, self.reaction[2].specie.grid])
 
-        self.creaction = None
         self.cMs = None
 
     def integrate(self, ps, stepsize=None):
@@ -121,26 +126,10 @@ class FourParticleIntegral(BoltzmannIntegral):
         if stepsize is None:
             stepsize = params.h
 
-        if not environment.get('LOGARITHMIC_TIMESTEP'):
+        if not params.config.LOGARITHMIC_TIMESTEP:
             stepsize /= params.aT
 
-        if not self.creaction:
-            self.creaction = [
-                reaction_t(
-                    specie=particle_t(
-                        m=particle.specie.conformal_mass / params.aT,
-                        grid=grid_t(
-                            grid=particle.specie.grid.TEMPLATE / params.aT,
-                            distribution=particle.specie._distribution
-                        ),
-                        eta=int(particle.specie.eta),
-                        in_equilibrium=int(particle.specie.in_equilibrium),
-                        T=particle.specie.aT / params.aT
-                    ),
-                    side=particle.side
-                )
-                for particle in self.reaction
-            ]
+        self.reaction_views(grid_t, particle_t, reaction_t)
 
         ps = ps / params.aT
         # All matrix elements share the same weak scale multiplier
@@ -154,7 +143,7 @@ class FourParticleIntegral(BoltzmannIntegral):
 
         constant *= kinematics.CollisionMultiplier4p(self)
 
-        if not environment.get('LOGARITHMIC_TIMESTEP'):
+        if not params.config.LOGARITHMIC_TIMESTEP:
             constant /= params.x
 
         stepsize *= constant
@@ -169,9 +158,8 @@ class FourParticleIntegral(BoltzmannIntegral):
         ps, interpolate = kinematics.interpolation_4p(self, ps, slice_1)
 
         if self.kind in [CollisionIntegralKind.Full, CollisionIntegralKind.Full_vacuum_decay] and not hasattr(self.particle, 'fast_decay'):
-            # C = integration(ps, *bounds, self.creaction, self.cMs, stepsize, CollisionIntegralKind.Full)
-            A = integration(ps, *bounds, self.creaction, self.cMs, stepsize, CollisionIntegralKind.F_1)
-            B = integration(ps, *bounds, self.creaction, self.cMs, stepsize, CollisionIntegralKind.F_f)
+            # F_1 and F_f parts are integrated in a single pass over the momentum space
+            A, B = self.integrate_kernels(ps, bounds, stepsize, [CollisionIntegralKind.F_1, CollisionIntegralKind.F_f])
             C = A + self.particle.distribution(ps * params.aT) * B
             if interpolate:
                 C = list(interp1d(ps, C, kind='linear')(slice_1 / params.aT))
@@ -179,8 +167,7 @@ class FourParticleIntegral(BoltzmannIntegral):
                 B = list(interp1d(ps, B, kind='linear')(slice_1 / params.aT))
             return numpy.array(list(C) + slice_2) * constant, numpy.array(list(B) + slice_2) * constant
 
-        fullstack = integration(ps, *bounds, self.creaction, self.cMs, stepsize, self.kind)
-        fullstack = numpy.array(fullstack)
+        fullstack, = self.integrate_kernels(ps, bounds, stepsize, [self.kind])
 
         if interpolate:
             fullstack = interp1d(ps, fullstack, kind='linear')(slice_1 / params.aT)
@@ -188,10 +175,9 @@ class FourParticleIntegral(BoltzmannIntegral):
         fullstack = numpy.append(fullstack, slice_2)
 
         scaled_output = kinematics.scaling(self, fullstack, constant)
-        if not scaled_output:
+        if scaled_output is False:
             return kinematics.return_function(self, fullstack)
-        else:
-            fullstack = scaled_output
+        fullstack = scaled_output
 
         if hasattr(self.particle, 'fast_decay'):
             if self.kind in [CollisionIntegralKind.F_decay, CollisionIntegralKind.F_f_vacuum_decay]:
@@ -203,3 +189,35 @@ class FourParticleIntegral(BoltzmannIntegral):
             constant *= self.particle._distribution
 
         return fullstack * constant
+
+    def integrate_kernels(self, ps, bounds, stepsize, kinds):
+        """ Collision integrals of the given `kinds` (`F_1` and `F_f` parts are computed together)\
+            from the linear expansion around a reference state, from the tabulated kernels or by\
+            the quadrature engine selected by the `FOUR_PARTICLE_QUADRATURE` setting """
+        config = self.particle.params.config
+        if config.LINEARIZED_COLLISIONS:
+            return linearized.integrate(self, ps, bounds, kinds)
+
+        if config.TABULATED_COLLISION_KERNELS:
+            integrals = tables.integrate(self, ps, kinds)
+            if integrals is not None:
+                return integrals
+
+        split = kinds == [CollisionIntegralKind.F_1, CollisionIntegralKind.F_f]
+
+        if config.FOUR_PARTICLE_QUADRATURE == 'gauss_legendre':
+            nodes, weights = gauss_legendre.quadrature(config.FOUR_PARTICLE_GAUSS_ORDER)
+
+            def kernels(ps):
+                if split:
+                    return list(integration_split_fixed(ps, *bounds, self.creaction, self.cMs, nodes, weights))
+                return [integration_fixed(ps, *bounds, self.creaction, self.cMs, kind, nodes, weights)
+                        for kind in kinds]
+        else:
+            def kernels(ps):
+                if split:
+                    return list(integration_split(ps, *bounds, self.creaction, self.cMs, stepsize))
+                return [integration(ps, *bounds, self.creaction, self.cMs, stepsize, kind)
+                        for kind in kinds]
+
+        return scheduler.chunked(kernels, ps)
@@ -0,0 +1,82 @@
+/*
+    Micro-benchmark of the GSL workspace handling in `integration`.
+
+    Compares allocating two 100000-interval workspaces for every momentum point (the former\
+    behaviour) with taking them from the thread-local `workspace_pool`. Each point performs the\
+    same cheap `gsl_integration_qag` call, so the difference is the allocation overhead.
+
+        make bench
+*/
+#include <chrono>
+#include <cmath>
+#include <cstdio>
+#include <cstdlib>
+
+#include <gsl/gsl_errno.h>
+#include <gsl/gsl_integration.h>
+
+#include "workspace_pool.h"
+
+
+typedef double dbl;
+
+const size_t subdivisions = 100000;
+
+
+dbl integrand(dbl x, void *p) {
+    return exp(-x) * x * x;
+}
+
+
+dbl integrate(gsl_integration_workspace *w) {
+    gsl_function F;
+    F.function = &integrand;
+    F.params = nullptr;
+
+    dbl result, error;
+    gsl_integration_qag(&F, 0., 10., 1e-10, 1e-2, subdivisions, GSL_INTEG_GAUSS15, w, &result, &error);
+    return result;
+}
+
+
+template <typename Func>
+dbl timeit(const char *name, size_t points, Func step) {
+    dbl total(0.);
+    auto start = std::chrono::steady_clock::now();
+
+    #pragma omp parallel for reduction(+:total)
+    for (size_t i = 0; i < points; ++i) {
+        total += step();
+    }
+
+    std::chrono::duration<dbl> elapsed = std::chrono::steady_clock::now() - start;
+    printf("%-24s %8zu points: %10.3f ms (%.3f us/point)\n",
+           name, points, elapsed.count() * 1e3, elapsed.count() * 1e6 / points);
+    return total;
+}
+
+
+int main(int argc, char *argv[]) {
+    size_t points = argc > 1 ? std::atoi(argv[1]) : 20000;
+    gsl_set_error_handler_off();
+
+    dbl allocated = timeit("alloc/free per point", points, []() {
+        gsl_integration_workspace *w1 = gsl_integration_workspace_alloc(subdivisions);
+        gsl_integration_workspace *w2 = gsl_integration_workspace_alloc(subdivisions);
+        dbl result = integrate(w1) + integrate(w2);
+        gsl_integration_workspace_free(w1);
+        gsl_integration_workspace_free(w2);
+        return result;
+    });
+
+    dbl pooled = timeit("thread-local pool", points, []() {
+        return integrate(thread_workspace(0, subdivisions)) + integrate(thread_workspace(1, subdivisions));
+    });
+
+    if (std::abs(allocated - pooled) > 1e-12 * std::abs(allocated)) {
+        printf("Results differ: %e != %e\n", allocated, pooled);
+        return 1;
+    }
+
+    return 0;
+}
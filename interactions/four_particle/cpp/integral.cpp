@@ -6,8 +6,8 @@ dbl energy(dbl y, dbl mass=0) {
 }
 
 
-std::pair<int, int> binary_find(const std::vector<dbl> &grid, dbl x) {
-    int head(0), tail(grid.size() - 1);
+std::pair<int, int> binary_find(const dbl *grid, size_t size, dbl x) {
+    int head(0), tail(size - 1);
     int middle;
 
     if (grid[tail] < x) {
@@ -38,8 +38,7 @@ std::pair<int, int> binary_find(const std::vector<dbl> &grid, dbl x) {
 }
 
 
-dbl distribution_interpolation(const std::vector<dbl> &grid,
-                               const std::vector<dbl> &distribution,
+dbl distribution_interpolation(const dbl *grid, const dbl *distribution, size_t size,
                                dbl p, dbl m=0., int eta=1, dbl T=1.,
                                bool in_equilibrium=false) {
 
@@ -51,14 +50,14 @@ dbl distribution_interpolation(const std::vector<dbl> &grid,
     }
 
     int i_lo, i_hi;
-    std::tie(i_lo, i_hi) = binary_find(grid, p);
+    std::tie(i_lo, i_hi) = binary_find(grid, size, p);
     if(i_lo == -1) {
         throw std::runtime_error("Input momentum is too small for the given grid");
     }
 
     if(i_hi == -1) {
-        return distribution[grid.size()-1]
-            * exp((energy(grid[grid.size() -1], m) - energy(p, m)) / T);
+        return distribution[size - 1]
+            * exp((energy(grid[size - 1], m) - energy(p, m)) / T);
     }
 
     if(i_lo == i_hi) {
@@ -110,7 +109,7 @@ dbl distribution_interpolation(const std::vector<dbl> &grid,
 
 dbl distribution_interpolation(const particle_t &specie, dbl p) {
     return distribution_interpolation(
-        specie.grid.grid, specie.grid.distribution,
+        specie.grid.grid, specie.grid.distribution, specie.grid.size,
         p,
         specie.m, specie.eta,
         specie.T, specie.in_equilibrium
@@ -246,13 +245,14 @@ dbl in_bounds(const std::array<dbl, 4> p, const std::array<dbl, 4> E, const std:
 }
 
 
-dbl integrand_full(
+dbl kinematic_kernel(
     dbl p0, dbl p1, dbl p2,
     const std::vector<reaction_t> &reaction, const std::vector<M_t> &Ms,
-    int kind
+    std::array<dbl, 4> &p
 ) {
     /*
-    Collision integral interior.
+    Kinematic part of the collision integral interior: phase space factors and D-functions.
+    Momenta of all reactants are stored into `p`.
     */
 
     dbl integrand = 0.;
@@ -265,7 +265,7 @@ dbl integrand_full(
         m[i] = reaction[i].specie.m;
     }
 
-    std::array<dbl, 4> p, E;
+    std::array<dbl, 4> E;
     p[0] = p0;
     p[1] = p1;
     p[2] = p2;
@@ -316,14 +316,48 @@ dbl integrand_full(
 
     temp *= ds;
 
-    if (temp == 0.) { return integrand; }
+    return temp;
+}
+
+
+dbl integrand_kernel(
+    dbl p0, dbl p1, dbl p2,
+    const std::vector<reaction_t> &reaction, const std::vector<M_t> &Ms,
+    std::array<dbl, 4> &f
+) {
+    /*
+    Kinematic part of the collision integral interior. Distribution functions of the reactants\
+    are stored into `f` when the result is non-zero.
+    */
+
+    std::array<dbl, 4> p;
+    dbl temp = kinematic_kernel(p0, p1, p2, reaction, Ms, p);
+
+    if (temp == 0.) { return temp; }
 
-    std::array<dbl, 4> f;
     for (int k = 0; k < 4; ++k) {
         const particle_t &specie = reaction[k].specie;
         f[k] = distribution_interpolation(specie, p[k]);
     }
 
+    return temp;
+}
+
+
+dbl integrand_full(
+    dbl p0, dbl p1, dbl p2,
+    const std::vector<reaction_t> &reaction, const std::vector<M_t> &Ms,
+    int kind
+) {
+    /*
+    Collision integral interior.
+    */
+
+    std::array<dbl, 4> f;
+    dbl temp = integrand_kernel(p0, p1, p2, reaction, Ms, f);
+
+    if (temp == 0.) { return 0.; }
+
     auto integral_kind = CollisionIntegralKind(kind);
 
     switch (integral_kind) {
@@ -539,16 +573,12 @@ dbl p2_max_scat(const std::vector<reaction_t> &reaction, dbl p0, dbl p1) {
 }
 
 
-dbl integrand_2nd_integration(
-    dbl p1, void *p
+bool p2_bounds(
+    const std::vector<reaction_t> &reaction, dbl p0, dbl p1, dbl max_3,
+    dbl &min_2, dbl &max_2
 ) {
-    struct integration_params &old_params = *(struct integration_params *) p;
-    dbl min_2 = old_params.min_2;
-    dbl max_2 = old_params.max_2;
-    dbl max_3 = old_params.max_3;
-    dbl p0 = old_params.p0;
-    auto reaction = *old_params.reaction;
-
+    /* Integration bounds of the inner integral over p2. Returns `false` if the integration\
+       region is empty */
     auto reaction_type = get_reaction_type(reaction);
 
     if (reaction_type == Kinematics::DECAY) {
@@ -567,7 +597,7 @@ dbl integrand_2nd_integration(
         dbl min = reaction[3].specie.m - energy(p0, reaction[0].specie.m) - energy(p1, reaction[1].specie.m);
         dbl min2 = pow(min, 2) - pow(reaction[2].specie.m, 2);
         if (max <= 0 || max2 <= 0) {
-            return 0.;
+            return false;
         }
         else {
             max_2 = sqrt(max2);
@@ -580,6 +610,69 @@ dbl integrand_2nd_integration(
         }
     }
 
+    return true;
+}
+
+
+bool p1_bounds(
+    const std::vector<reaction_t> &reaction, dbl p0, dbl max_3,
+    dbl &min_1, dbl &max_1
+) {
+    /* Integration bounds of the outer integral over p1. Returns `false` if the integration\
+       region is empty */
+    auto reaction_type = get_reaction_type(reaction);
+
+    if (reaction_type == Kinematics::DECAY) {
+        max_1 = sqrt(
+            pow(energy(p0, reaction[0].specie.m) - reaction[2].specie.m - reaction[3].specie.m, 2)
+            - pow(reaction[1].specie.m, 2)
+        );
+    }
+    if (reaction_type == Kinematics::SCATTERING) {
+        dbl min = reaction[2].specie.m + reaction[3].specie.m - energy(p0, reaction[0].specie.m);
+        dbl min2 = pow(min, 2) - pow(reaction[1].specie.m, 2);
+        if (min <= 0 || min2 <= 0) {
+            min_1 = 0.;
+        }
+        else {
+            min_1 = sqrt(min2);
+        }
+        if (max_1 > 3. * min_1) {
+            max_1 = max_1;
+        }
+        else {
+            max_1 = 3. * min_1;
+        }
+    }
+    if (reaction_type == Kinematics::CREATION) {
+        if (reaction[3].specie.m == 0.) { return false; }
+        dbl max = energy(max_3, reaction[3].specie.m) - reaction[2].specie.m - energy(p0, reaction[0].specie.m);
+        dbl max2 = pow(max, 2) - pow(reaction[1].specie.m, 2);
+        if (max <= 0 || max2 <= 0) {
+            return false;
+        }
+        else {
+            max_1 = sqrt(max2);
+        }
+        min_1 = 0.;
+    }
+
+    return true;
+}
+
+
+dbl integrand_2nd_integration(
+    dbl p1, void *p
+) {
+    struct integration_params &old_params = *(struct integration_params *) p;
+    dbl min_2 = old_params.min_2;
+    dbl max_2 = old_params.max_2;
+    dbl p0 = old_params.p0;
+
+    if (!p2_bounds(*old_params.reaction, p0, p1, old_params.max_3, min_2, max_2)) {
+        return 0.;
+    }
+
     gsl_function F;
     struct integration_params params = old_params;
     params.p1 = p1;
@@ -601,57 +694,22 @@ dbl integrand_2nd_integration(
 }
 
 
-std::vector<dbl> integration(
-    std::vector<dbl> ps, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
+void integration(
+    const dbl *ps, size_t size, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
     const std::vector<reaction_t> &reaction,
     const std::vector<M_t> &Ms,
-    dbl stepsize, int kind=0
+    dbl stepsize, int kind, dbl *integral
 ) {
+    /* Collision integral at the `size` momenta `ps`, written into the `integral` buffer */
 
-    std::vector<dbl> integral(ps.size(), 0.);
-
-    // Determine the integration bounds
-    auto reaction_type = get_reaction_type(reaction);
+    std::fill(integral, integral + size, 0.);
 
     // Note firstprivate() clause: those variables will be copied for each thread
-    #pragma omp parallel for default(none) shared(std::cout,ps, Ms, reaction, integral, stepsize, kind, reaction_type) firstprivate(min_1, max_1, min_2, max_2, max_3)
-    for (size_t i = 0; i < ps.size(); ++i) {
+    #pragma omp parallel for default(none) shared(std::cout, ps, size, Ms, reaction, integral, stepsize, kind) firstprivate(min_1, max_1, min_2, max_2, max_3)
+    for (size_t i = 0; i < size; ++i) {
         dbl p0 = ps[i];
 
-        if (reaction_type == Kinematics::DECAY) {
-            max_1 = sqrt(
-                pow(energy(p0, reaction[0].specie.m) - reaction[2].specie.m - reaction[3].specie.m, 2)
-                - pow(reaction[1].specie.m, 2)
-            );
-        }
-        if (reaction_type == Kinematics::SCATTERING) {
-            dbl min = reaction[2].specie.m + reaction[3].specie.m - energy(p0, reaction[0].specie.m);
-            dbl min2 = pow(min, 2) - pow(reaction[1].specie.m, 2);
-            if (min <= 0 || min2 <= 0) {
-                min_1 = 0.;
-            }
-            else {
-                min_1 = sqrt(min2);
-            }
-            if (max_1 > 3. * min_1) {
-                max_1 = max_1;
-            }
-            else {
-                max_1 = 3. * min_1;
-            }
-        }
-        if (reaction_type == Kinematics::CREATION) {
-            if (reaction[3].specie.m == 0.) {continue; }
-            dbl max = energy(max_3, reaction[3].specie.m) - reaction[2].specie.m - energy(p0, reaction[0].specie.m);
-            dbl max2 = pow(max, 2) - pow(reaction[1].specie.m, 2);
-            if (max <= 0 || max2 <= 0) {
-                continue;
-            }
-            else {
-                max_1 = sqrt(max2);
-            }
-            min_1 = 0.;
-        }
+        if (!p1_bounds(reaction, p0, max_3, min_1, max_1)) { continue; }
 
         dbl result(0.), error(0.);
         size_t status;
@@ -671,8 +729,8 @@ std::vector<dbl> integration(
         }
 
         size_t subdivisions = 100000;
-        gsl_integration_workspace *w1 = gsl_integration_workspace_alloc(subdivisions);
-        gsl_integration_workspace *w2 = gsl_integration_workspace_alloc(subdivisions);
+        gsl_integration_workspace *w1 = thread_workspace(0, subdivisions);
+        gsl_integration_workspace *w2 = thread_workspace(1, subdivisions);
         struct integration_params params = {
             p0, 0., 0.,
             &reaction, &Ms,
@@ -689,23 +747,441 @@ std::vector<dbl> integration(
             printf("2nd integration_1 result: %e ± %e. %i intervals. %s\n", result, error, (int) w1->size, gsl_strerror(status));
             throw std::runtime_error("Integrator failed to reach required accuracy");
         }
-        gsl_integration_workspace_free(w1);
-        gsl_integration_workspace_free(w2);
         integral[i] += result;
     }
+}
+
+
+/* ## Simultaneous integration of the F_1 and F_f kernels
+
+    `Full` collision integrals are split into the constant $\mathcal{F}_1$ and the linear in $f_1$\
+    $\mathcal{F}_f$ parts. Both parts share the integration region, the D-functions and the\
+    distribution functions of the reactants, so they are integrated together: the adaptive\
+    Gauss-Kronrod rule below works with two-component integrands and refines an interval until\
+    both components reach their accuracy.
+*/
+
+typedef std::array<dbl, 2> dbl2;
+
+namespace gk15 {
+    // Gauss-Kronrod 15-point abscissae and weights (QUADPACK qk15)
+    const dbl xgk[8] = {
+        0.991455371120812639206854697526329, 0.949107912342758524526189684047851,
+        0.864864423359769072789712788640926, 0.741531185599394439863864773280788,
+        0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+        0.207784955007898467600689403773245, 0.000000000000000000000000000000000
+    };
+    const dbl wgk[8] = {
+        0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+        0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+        0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+        0.204432940075298892414161999234649, 0.209482141084727828012999174891714
+    };
+    const dbl wg[4] = {
+        0.129484966168869693270611432679082, 0.279705391489276667901467771423780,
+        0.381830050505118944950369775488975, 0.417959183673469387755102040816327
+    };
+}
+
+
+dbl rescale_error(dbl err, dbl result_abs, dbl result_asc) {
+    /* Error estimate of the Gauss-Kronrod rule as in QUADPACK */
+    err = std::abs(err);
+    if (result_asc != 0. && err != 0.) {
+        dbl scale = pow(200. * err / result_asc, 1.5);
+        err = scale < 1. ? result_asc * scale : result_asc;
+    }
+    if (result_abs > std::numeric_limits<dbl>::min() / (50. * std::numeric_limits<dbl>::epsilon())) {
+        err = std::max(err, 50. * std::numeric_limits<dbl>::epsilon() * result_abs);
+    }
+    return err;
+}
+
+
+struct interval2 {
+    dbl a;
+    dbl b;
+    dbl2 result;
+    dbl2 error;
+};
+
+
+template <typename Func>
+interval2 gauss_kronrod_15(const Func &f, dbl a, dbl b) {
+    dbl center = (a + b) / 2.;
+    dbl half = (b - a) / 2.;
+
+    std::array<dbl2, 15> fv;
+    fv[7] = f(center);
+    for (int j = 0; j < 7; ++j) {
+        dbl dx = half * gk15::xgk[j];
+        fv[j] = f(center - dx);
+        fv[14 - j] = f(center + dx);
+    }
+
+    interval2 interval;
+    interval.a = a;
+    interval.b = b;
+
+    for (int c = 0; c < 2; ++c) {
+        dbl fc = fv[7][c];
+        dbl result_gauss = fc * gk15::wg[3];
+        dbl result_kronrod = fc * gk15::wgk[7];
+        dbl result_abs = std::abs(result_kronrod);
+
+        for (int j = 0; j < 7; ++j) {
+            dbl sum = fv[j][c] + fv[14 - j][c];
+            result_kronrod += gk15::wgk[j] * sum;
+            result_abs += gk15::wgk[j] * (std::abs(fv[j][c]) + std::abs(fv[14 - j][c]));
+            if (j % 2 == 1) {
+                result_gauss += gk15::wg[j / 2] * sum;
+            }
+        }
+
+        dbl mean = result_kronrod / 2.;
+        dbl result_asc = gk15::wgk[7] * std::abs(fc - mean);
+        for (int j = 0; j < 7; ++j) {
+            result_asc += gk15::wgk[j] * (std::abs(fv[j][c] - mean) + std::abs(fv[14 - j][c] - mean));
+        }
+
+        interval.result[c] = result_kronrod * half;
+        interval.error[c] = rescale_error((result_kronrod - result_gauss) * half,
+                                          result_abs * std::abs(half), result_asc * std::abs(half));
+    }
+
+    return interval;
+}
+
+
+template <typename Func>
+dbl2 integrate_adaptive_2(const Func &f, dbl a, dbl b, const dbl2 &abseps, dbl releps,
+                          size_t subdivisions, std::vector<interval2> &intervals) {
+    /* Adaptive bisection of the interval with the largest error relative to the tolerance of\
+       its components. `intervals` is a caller-owned buffer reused between the calls */
+    intervals.clear();
+    intervals.push_back(gauss_kronrod_15(f, a, b));
+
+    dbl2 result = intervals[0].result;
+    dbl2 error = intervals[0].error;
+
+    while (true) {
+        dbl2 tolerance;
+        bool converged = true;
+        for (int c = 0; c < 2; ++c) {
+            tolerance[c] = std::max(abseps[c], releps * std::abs(result[c]));
+            converged = converged && error[c] <= tolerance[c];
+        }
+        if (converged) { break; }
+
+        if (intervals.size() >= subdivisions) {
+            printf("(%e, %e) integration result: (%e, %e) ± (%e, %e). %i intervals.\n",
+                   a, b, result[0], result[1], error[0], error[1], (int) intervals.size());
+            throw std::runtime_error("Integrator failed to reach required accuracy");
+        }
+
+        size_t worst = 0;
+        dbl worst_error = -1.;
+        for (size_t k = 0; k < intervals.size(); ++k) {
+            dbl e = std::max(intervals[k].error[0] / tolerance[0], intervals[k].error[1] / tolerance[1]);
+            if (e > worst_error) {
+                worst_error = e;
+                worst = k;
+            }
+        }
+
+        interval2 parent = intervals[worst];
+        dbl middle = (parent.a + parent.b) / 2.;
+        if (!(parent.a < middle && middle < parent.b)) {
+            // The interval can not be bisected any further: roundoff limits the accuracy
+            break;
+        }
+
+        interval2 left = gauss_kronrod_15(f, parent.a, middle);
+        interval2 right = gauss_kronrod_15(f, middle, parent.b);
+
+        for (int c = 0; c < 2; ++c) {
+            result[c] += left.result[c] + right.result[c] - parent.result[c];
+            error[c] += left.error[c] + right.error[c] - parent.error[c];
+        }
+
+        intervals[worst] = left;
+        intervals.push_back(right);
+    }
+
+    return result;
+}
+
+
+void integration_split(
+    const dbl *ps, size_t size, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
+    const std::vector<reaction_t> &reaction,
+    const std::vector<M_t> &Ms,
+    dbl stepsize, dbl *integral_1, dbl *integral_f
+) {
+    /* Integrals of the F_1 and F_f kernels computed in a single traversal of the momentum space */
+
+    std::fill(integral_1, integral_1 + size, 0.);
+    std::fill(integral_f, integral_f + size, 0.);
+
+    // Note firstprivate() clause: those variables will be copied for each thread
+    #pragma omp parallel for default(none) shared(ps, size, Ms, reaction, integral_1, integral_f, stepsize) firstprivate(min_1, max_1, min_2, max_2, max_3)
+    for (size_t i = 0; i < size; ++i) {
+        dbl p0 = ps[i];
+
+        if (!p1_bounds(reaction, p0, max_3, min_1, max_1)) { continue; }
+
+        dbl releps = 1e-2;
+        dbl2 abseps = {releps / stepsize, releps / stepsize};
+        if (reaction[0].specie.m == 0.) {
+            abseps[0] *= distribution_interpolation(reaction[0].specie, p0);
+        }
+
+        size_t subdivisions = 100000;
+        std::vector<interval2> outer_intervals, inner_intervals;
+
+        auto inner = [&](dbl p1) -> dbl2 {
+            dbl lower = min_2, upper = max_2;
+            if (!p2_bounds(reaction, p0, p1, max_3, lower, upper)) {
+                return dbl2{0., 0.};
+            }
+
+            auto kernels = [&](dbl p2) -> dbl2 {
+                std::array<dbl, 4> f;
+                dbl temp = integrand_kernel(p0, p1, p2, reaction, Ms, f);
+                if (temp == 0.) {
+                    return dbl2{0., 0.};
+                }
+                return dbl2{temp * F_1(reaction, f), temp * F_f(reaction, f)};
+            };
+
+            return integrate_adaptive_2(kernels, lower, upper, abseps, releps, subdivisions, inner_intervals);
+        };
+
+        dbl2 result = integrate_adaptive_2(inner, min_1, max_1, abseps, releps, subdivisions, outer_intervals);
+
+        integral_1[i] += result[0];
+        integral_f[i] += result[1];
+    }
+}
+
+/* ## Gauss-Legendre lattice
+
+    Tensor product of the Gauss-Legendre rules with `nodes` and `weights` (on $[-1, 1]$) mapped\
+    onto the kinematically allowed p1 and p2 intervals at the momentum p0. `visit(weight, p1, p2)`\
+    is called for every point of the lattice with its quadrature weight.
+*/
+template <typename Visitor>
+void gauss_legendre_lattice(
+    dbl p0, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
+    const std::vector<reaction_t> &reaction,
+    const std::vector<dbl> &nodes, const std::vector<dbl> &weights,
+    const Visitor &visit
+) {
+    dbl lower_1 = min_1, upper_1 = max_1;
+
+    if (!p1_bounds(reaction, p0, max_3, lower_1, upper_1)) { return; }
+
+    dbl half_1 = (upper_1 - lower_1) / 2.,
+        center_1 = (upper_1 + lower_1) / 2.;
+
+    for (size_t j = 0; j < nodes.size(); ++j) {
+        dbl p1 = center_1 + half_1 * nodes[j];
+        dbl lower_2 = min_2, upper_2 = max_2;
+
+        if (!p2_bounds(reaction, p0, p1, max_3, lower_2, upper_2)) { continue; }
+
+        dbl half_2 = (upper_2 - lower_2) / 2.,
+            center_2 = (upper_2 + lower_2) / 2.;
+
+        for (size_t k = 0; k < nodes.size(); ++k) {
+            visit(weights[j] * weights[k] * half_1 * half_2, p1, center_2 + half_2 * nodes[k]);
+        }
+    }
+}
+
+
+/* ## Fixed-order quadrature engine
+
+    Alternative to the adaptive integration with a predictable cost: every momentum point takes\
+    exactly `nodes.size()^2` integrand evaluations on the Gauss-Legendre lattice.
+*/
+template <typename Integrand>
+std::vector<dbl2> fixed_order_integration(
+    const dbl *ps, size_t size, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
+    const std::vector<reaction_t> &reaction,
+    const std::vector<dbl> &nodes, const std::vector<dbl> &weights,
+    const Integrand &integrand
+) {
+    std::vector<dbl2> integral(size, dbl2{0., 0.});
+
+    #pragma omp parallel for default(none) shared(ps, size, reaction, nodes, weights, integral, integrand, min_1, max_1, min_2, max_2, max_3) schedule(dynamic)
+    for (size_t i = 0; i < size; ++i) {
+        dbl p0 = ps[i];
+        dbl2 &result = integral[i];
+
+        gauss_legendre_lattice(p0, min_1, max_1, min_2, max_2, max_3, reaction, nodes, weights,
+            [&](dbl weight, dbl p1, dbl p2) {
+                dbl2 value = integrand(p0, p1, p2);
+                result[0] += weight * value[0];
+                result[1] += weight * value[1];
+            });
+    }
 
     return integral;
 }
 
 
+void integration_fixed(
+    const dbl *ps, size_t size, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
+    const std::vector<reaction_t> &reaction,
+    const std::vector<M_t> &Ms,
+    int kind,
+    const std::vector<dbl> &nodes, const std::vector<dbl> &weights,
+    dbl *result
+) {
+    auto integrand = [&reaction, &Ms, kind](dbl p0, dbl p1, dbl p2) -> dbl2 {
+        return dbl2{integrand_full(p0, p1, p2, reaction, Ms, kind), 0.};
+    };
+
+    auto integral = fixed_order_integration(ps, size, min_1, max_1, min_2, max_2, max_3,
+                                            reaction, nodes, weights, integrand);
+
+    for (size_t i = 0; i < size; ++i) {
+        result[i] = integral[i][0];
+    }
+}
+
+
+void integration_split_fixed(
+    const dbl *ps, size_t size, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
+    const std::vector<reaction_t> &reaction,
+    const std::vector<M_t> &Ms,
+    const std::vector<dbl> &nodes, const std::vector<dbl> &weights,
+    dbl *integral_1, dbl *integral_f
+) {
+    auto integrand = [&reaction, &Ms](dbl p0, dbl p1, dbl p2) -> dbl2 {
+        std::array<dbl, 4> f;
+        dbl temp = integrand_kernel(p0, p1, p2, reaction, Ms, f);
+        if (temp == 0.) {
+            return dbl2{0., 0.};
+        }
+        return dbl2{temp * F_1(reaction, f), temp * F_f(reaction, f)};
+    };
+
+    auto integral = fixed_order_integration(ps, size, min_1, max_1, min_2, max_2, max_3,
+                                            reaction, nodes, weights, integrand);
+
+    for (size_t i = 0; i < size; ++i) {
+        integral_1[i] = integral[i][0];
+        integral_f[i] = integral[i][1];
+    }
+}
+
+
+/* ## Output buffers
+
+    Integration routines write the results into NumPy arrays: either the preallocated arrays\
+    passed as `out` (C-contiguous float64 of the size of `ps`) or new ones. The pointers to the\
+    data are taken while the GIL is held, the integration itself runs without it.
+*/
+npcdbl output_array(const py::object &out, size_t size) {
+    if (out.is_none()) {
+        return npcdbl(size);
+    }
+    if (!py::isinstance<py::array_t<dbl, py::array::c_style>>(out)) {
+        throw std::invalid_argument("Output has to be a C-contiguous float64 array");
+    }
+    auto array = py::reinterpret_borrow<npcdbl>(out);
+    if ((size_t) array.size() != size) {
+        throw std::invalid_argument("Output array does not match the momenta");
+    }
+    return array;
+}
+
+
+
+/* ## Tabulated kinematic kernels
+
+    The kinematic part of the collision integrand depends only on the momenta and masses of the\
+    reactants. For fixed grids and masses it is computed once on the lattice of Gauss-Legendre\
+    nodes `nodes` (on $[-1, 1]$, with `weights`) of the p1 and p2 integrations and reused for\
+    all subsequent steps: the collision integral becomes a weighted sum over the lattice.
+
+    Returns the non-zero lattice entries: index of the `ps` point, the quadrature weight\
+    multiplied by the kernel and the momenta p1, p2, p3.
+*/
+py::tuple kernel_table(
+    std::vector<dbl> ps, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
+    const std::vector<reaction_t> &reaction,
+    const std::vector<M_t> &Ms,
+    const std::vector<dbl> &nodes, const std::vector<dbl> &weights
+) {
+    struct entry {
+        dbl weight;
+        dbl p1;
+        dbl p2;
+        dbl p3;
+    };
+
+    std::vector<std::vector<entry>> rows(ps.size());
+
+    #pragma omp parallel for default(none) shared(ps, Ms, reaction, nodes, weights, rows, min_1, max_1, min_2, max_2, max_3) schedule(dynamic)
+    for (size_t i = 0; i < ps.size(); ++i) {
+        dbl p0 = ps[i];
+        std::vector<entry> &row = rows[i];
+
+        gauss_legendre_lattice(p0, min_1, max_1, min_2, max_2, max_3, reaction, nodes, weights,
+            [&](dbl weight, dbl p1, dbl p2) {
+                std::array<dbl, 4> p;
+                dbl temp = kinematic_kernel(p0, p1, p2, reaction, Ms, p);
+                if (temp != 0.) {
+                    row.push_back({weight * temp, p[1], p[2], p[3]});
+                }
+            });
+    }
+
+    size_t size = 0;
+    for (const auto &row : rows) {
+        size += row.size();
+    }
+
+    py::array_t<int> index(size);
+    npdbl weight(size), p1(size), p2(size), p3(size);
+    auto index_ = index.mutable_unchecked<1>();
+    auto weight_ = weight.mutable_unchecked<1>();
+    auto p1_ = p1.mutable_unchecked<1>();
+    auto p2_ = p2.mutable_unchecked<1>();
+    auto p3_ = p3.mutable_unchecked<1>();
+
+    size_t n = 0;
+    for (size_t i = 0; i < rows.size(); ++i) {
+        for (const entry &e : rows[i]) {
+            index_(n) = i;
+            weight_(n) = e.weight;
+            p1_(n) = e.p1;
+            p2_(n) = e.p2;
+            p3_(n) = e.p3;
+            ++n;
+        }
+    }
+
+    return py::make_tuple(index, weight, p1, p2, p3);
+}
+
+
 PYBIND11_MODULE(integral, m) {
     m.def("distribution_interpolation", [](
-        const std::vector<dbl> &grid,
-        const std::vector<dbl> &distribution,
+        const npcdbl &grid,
+        const npcdbl &distribution,
         const py::array_t<double> &ps, dbl m=0., int eta=1, dbl T=1.,
         bool in_equilibrium=false) {
-            auto v = [grid, distribution, m, eta, T, in_equilibrium](double p) {
-                return distribution_interpolation(grid, distribution, p, m, eta, T, in_equilibrium);
+            if (distribution.size() != grid.size()) {
+                throw std::invalid_argument("Distribution function does not match the grid");
+            }
+            const dbl *grid_ = grid.data(), *distribution_ = distribution.data();
+            size_t size = grid.size();
+            auto v = [grid_, distribution_, size, m, eta, T, in_equilibrium](double p) {
+                return distribution_interpolation(grid_, distribution_, size, p, m, eta, T, in_equilibrium);
             };
             return py::vectorize(v)(ps);
         },
@@ -713,8 +1189,10 @@ PYBIND11_MODULE(integral, m) {
         "grid"_a, "distribution"_a,
         "p"_a, "m"_a=0, "eta"_a=1, "T"_a=1., "in_equilibrium"_a=false
     );
-    m.def("binary_find", &binary_find,
-          "grid"_a, "x"_a);
+    m.def("binary_find", [](const npcdbl &grid, dbl x) {
+            return binary_find(grid.data(), grid.size(), x);
+        },
+        "grid"_a, "x"_a);
 
     m.def("D1", &D1);
     m.def("D2", &D2);
@@ -728,9 +1206,78 @@ PYBIND11_MODULE(integral, m) {
           "p"_a, "E"_a, "m"_a,
           "K1"_a, "K2"_a, "order"_a, "sides"_a);
 
-    m.def("integration", &integration,
+    m.def("integration", [](
+        const npcdbl &ps, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
+        const std::vector<reaction_t> &reaction, const std::vector<M_t> &Ms,
+        dbl stepsize, int kind, const py::object &out) {
+            npcdbl integral = output_array(out, ps.size());
+            dbl *integral_ = integral.mutable_data();
+            {
+                py::gil_scoped_release release;
+                integration(ps.data(), ps.size(), min_1, max_1, min_2, max_2, max_3,
+                            reaction, Ms, stepsize, kind, integral_);
+            }
+            return integral;
+        },
+        "ps"_a, "min_1"_a, "max_1"_a, "min_2"_a, "max_2"_a, "max_3"_a,
+        "reaction"_a, "Ms"_a, "stepsize"_a, "kind"_a, "out"_a=py::none());
+    m.def("integration_fixed", [](
+        const npcdbl &ps, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
+        const std::vector<reaction_t> &reaction, const std::vector<M_t> &Ms, int kind,
+        const std::vector<dbl> &nodes, const std::vector<dbl> &weights, const py::object &out) {
+            npcdbl integral = output_array(out, ps.size());
+            dbl *integral_ = integral.mutable_data();
+            {
+                py::gil_scoped_release release;
+                integration_fixed(ps.data(), ps.size(), min_1, max_1, min_2, max_2, max_3,
+                                  reaction, Ms, kind, nodes, weights, integral_);
+            }
+            return integral;
+        },
+        "ps"_a, "min_1"_a, "max_1"_a, "min_2"_a, "max_2"_a, "max_3"_a,
+        "reaction"_a, "Ms"_a, "kind"_a, "nodes"_a, "weights"_a, "out"_a=py::none());
+    m.def("integration_split_fixed", [](
+        const npcdbl &ps, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
+        const std::vector<reaction_t> &reaction, const std::vector<M_t> &Ms,
+        const std::vector<dbl> &nodes, const std::vector<dbl> &weights,
+        const py::object &out_1, const py::object &out_f) {
+            npcdbl integral_1 = output_array(out_1, ps.size()),
+                   integral_f = output_array(out_f, ps.size());
+            dbl *integral_1_ = integral_1.mutable_data(), *integral_f_ = integral_f.mutable_data();
+            {
+                py::gil_scoped_release release;
+                integration_split_fixed(ps.data(), ps.size(), min_1, max_1, min_2, max_2, max_3,
+                                        reaction, Ms, nodes, weights, integral_1_, integral_f_);
+            }
+            return py::make_tuple(integral_1, integral_f);
+        },
+        "ps"_a, "min_1"_a, "max_1"_a, "min_2"_a, "max_2"_a, "max_3"_a,
+        "reaction"_a, "Ms"_a, "nodes"_a, "weights"_a, "out_1"_a=py::none(), "out_f"_a=py::none());
+    m.def("kernel_table", &kernel_table,
           "ps"_a, "min_1"_a, "max_1"_a, "min_2"_a, "max_2"_a, "max_3"_a,
-          "reaction"_a, "Ms"_a, "stepsize"_a, "kind"_a);
+          "reaction"_a, "Ms"_a, "nodes"_a, "weights"_a);
+    m.def("integration_split", [](
+        const npcdbl &ps, dbl min_1, dbl max_1, dbl min_2, dbl max_2, dbl max_3,
+        const std::vector<reaction_t> &reaction, const std::vector<M_t> &Ms,
+        dbl stepsize, const py::object &out_1, const py::object &out_f) {
+            npcdbl integral_1 = output_array(out_1, ps.size()),
+                   integral_f = output_array(out_f, ps.size());
+            dbl *integral_1_ = integral_1.mutable_data(), *integral_f_ = integral_f.mutable_data();
+            {
+                py::gil_scoped_release release;
+                integration_split(ps.data(), ps.size(), min_1, max_1, min_2, max_2, max_3,
+                                  reaction, Ms, stepsize, integral_1_, integral_f_);
+            }
+            return py::make_tuple(integral_1, integral_f);
+        },
+        "ps"_a, "min_1"_a, "max_1"_a, "min_2"_a, "max_2"_a, "max_3"_a,
+        "reaction"_a, "Ms"_a, "stepsize"_a, "out_1"_a=py::none(), "out_f"_a=py::none());
+
+    m.def("set_num_threads", [](int threads) { omp_set_num_threads(threads); },
+          "Number of OpenMP threads for the parallel regions started by the calling thread",
+          "threads"_a);
+    m.def("get_num_threads", []() { return omp_get_max_threads(); },
+          "Number of OpenMP threads for the parallel regions started by the calling thread");
 
     py::enum_<CollisionIntegralKind>(m, "CollisionIntegralKind")
         .value("Full", CollisionIntegralKind::Full)
@@ -748,14 +1295,19 @@ PYBIND11_MODULE(integral, m) {
              "order"_a, "K1"_a=0., "K2"_a=0., "K"_a=0.);
 
     py::class_<grid_t>(m, "grid_t")
-        .def(py::init<std::vector<dbl>, std::vector<dbl>>(),
-             "grid"_a, "distribution"_a);
+        .def(py::init<npcdbl, npcdbl>(),
+             "grid"_a, "distribution"_a)
+        .def_readonly("grid", &grid_t::grid_array)
+        .def_readonly("distribution", &grid_t::distribution_array);
 
     py::class_<particle_t>(m, "particle_t")
         .def(py::init<int, dbl, grid_t, int, dbl>(),
-             "eta"_a, "m"_a, "grid"_a, "in_equilibrium"_a, "T"_a);
+             "eta"_a, "m"_a, "grid"_a, "in_equilibrium"_a, "T"_a)
+        .def_readonly("m", &particle_t::m)
+        .def_readonly("grid", &particle_t::grid);
 
     py::class_<reaction_t>(m, "reaction_t")
         .def(py::init<particle_t, int>(),
-             "specie"_a, "side"_a);
+             "specie"_a, "side"_a)
+        .def_readonly("specie", &reaction_t::specie);
 }
@@ -1,9 +1,13 @@
 #include <iostream>
+#include <algorithm>
 #include <cmath>
 #include <array>
+#include <limits>
 #include <vector>
 #include <complex>
 
+#include <omp.h>
+
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/numpy.h>
@@ -11,11 +15,15 @@
 #include <gsl/gsl_errno.h>
 #include <gsl/gsl_integration.h>
 
+#include "workspace_pool.h"
+
 
 namespace py = pybind11;
 using namespace pybind11::literals;
 typedef double dbl;
 typedef py::array_t<dbl> npdbl;
+// Contiguous arrays whose memory is read directly by the integration routines
+typedef py::array_t<dbl, py::array::c_style | py::array::forcecast> npcdbl;
 
 
 enum class Kinematics {
@@ -46,11 +54,26 @@ struct M_t {
     dbl K;
 };
 
+/* Grid and distribution function of a specie are views of the NumPy arrays: `grid_t` keeps\
+   references to the arrays and the pointers to their data read by the integration routines. The\
+   distribution function can be updated in place without rebuilding the reaction.
+
+   Copies of `grid_t` touch the reference counts of the arrays, so they are only made while the\
+   GIL is held: the integration routines take the reactions by reference. */
 struct grid_t {
-    grid_t(std::vector<dbl> grid, std::vector<dbl> distribution)
-        : grid(grid), distribution(distribution) {}
-    std::vector<dbl> grid;
-    std::vector<dbl> distribution;
+    grid_t(npcdbl grid_array, npcdbl distribution_array)
+        : grid_array(grid_array), distribution_array(distribution_array),
+          grid(grid_array.data()), distribution(distribution_array.data()),
+          size(grid_array.size()) {
+        if (distribution_array.size() != grid_array.size()) {
+            throw std::invalid_argument("Distribution function does not match the grid");
+        }
+    }
+    npcdbl grid_array;
+    npcdbl distribution_array;
+    const dbl *grid;
+    const dbl *distribution;
+    size_t size;
 };
 
 struct particle_t {
@@ -72,11 +95,10 @@ struct reaction_t {
 dbl energy(dbl y, dbl mass);
 
 
-std::pair<int, int> binary_find(const std::vector<dbl> &grid, dbl x);
+std::pair<int, int> binary_find(const dbl *grid, size_t size, dbl x);
 
 
-dbl distribution_interpolation(const std::vector<dbl> &grid,
-                               const std::vector<dbl> &distribution,
+dbl distribution_interpolation(const dbl *grid, const dbl *distribution, size_t size,
                                dbl p, dbl m, int eta, dbl T,
                                bool in_equilibrium);
 
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+# Linearised collision integrals
+
+Close to the equilibrium the distribution functions $f_s$ of the non-equilibrium reactants stay\
+near a reference state $f_s^0$ and the collision integral is well approximated by its expansion
+
+\begin{equation}
+    I[f] \approx I[f^0] + \sum_s J_s (f_s - f_s^0), \qquad J_s = \frac{\partial I}{\partial f_s}
+\end{equation}
+
+where the Jacobians $J_s$ are matrices over the momenta of the collision integral and the grid\
+of the species $s$. Applying the collision integral reduces to a matrix-vector product per\
+species instead of a two-dimensional integration for every momentum.
+
+The expansion is built on a kernel table of the reference masses (see the tabulated kernels): the\
+integrals and the Jacobians follow from the table without any further integration. Derivatives in\
+the masses take one more table per massive reactant, so a rebuild costs about as much as two\
+integrations. The table is kept by the expansion and is not counted in `COLLISION_KERNEL_CACHE_MB`.\
+Tables that do not fit into this budget fall back to forward differences of the fixed-order\
+Gauss-Legendre engine (the adaptive one is too noisy to be differentiated), one integration per\
+grid point of every non-equilibrium species.
+
+The expansion is built in units of the reference $aT_0$. The grids and the integration bounds are\
+fixed in comoving momenta, so the expansion stays on the same momenta when $aT$ changes and is\
+rescaled by the homogeneity of the kernel (see the tabulated kernels). Squared conformal masses\
+$M_s^2$ and temperatures $aT_s$ of the reactants still change every step (the conformal mass of\
+the electrons grows with the scale factor), so the expansion also includes the first\
+derivatives in these parameters:
+
+\begin{equation}
+    I[f, \theta] \approx I[f^0, \theta^0] + \sum_s J_s (f_s - f_s^0)
+        + \sum_k \frac{\partial I}{\partial \theta_k} (\theta_k - \theta_k^0)
+\end{equation}
+
+The expansion is rebuilt when the distribution of any species deviates from its reference by more\
+than `LINEARIZED_DEVIATION_TOLERANCE` (relative to the maximum of the distribution) or when any\
+parameter $\theta_k$ in units of $aT$ drifts by more than `LINEARIZED_TEMPERATURE_TOLERANCE`.
+"""
+from __future__ import division
+
+import numpy
+
+from common.integrators import gauss_legendre
+from interactions import scheduler
+from interactions.four_particle import tables
+from interactions.four_particle.tables import kernel_degree
+from interactions.four_particle.cpp.integral import (
+    integration_fixed, integration_split_fixed, grid_t, particle_t, reaction_t, CollisionIntegralKind
+)
+
+
+# Relative perturbation of the distribution function used for the finite differences
+PERTURBATION = 1e-4
+# Values of the distribution function below this fraction of its maximum are perturbed as if they
+# were at the floor, so that the differences are not dominated by the roundoff. The exponential
+# interpolation is far from linear in the small values, so the floor is kept well below
+# `LINEARIZED_DEVIATION_TOLERANCE`
+PERTURBATION_FLOOR = numpy.sqrt(numpy.finfo(float).eps)
+# Perturbation of the squared masses and temperatures of the reactants in units of $aT$
+PARAMETER_PERTURBATION = 1e-4
+
+
+class Linearization(object):
+
+    """ ## Collision integral expanded around the reference state of the reactants """
+
+    def __init__(self, interaction, ps, bounds, kinds):
+        aT = interaction.particle.params.aT
+        self.kinds = list(kinds)
+        self.degree = kernel_degree(interaction)
+
+        # Momenta and integration bounds in units of the reference $aT_0$
+        self.aT = aT
+        self.ps = ps.copy()
+        self.bounds = numpy.array(bounds)
+
+        self.species = unique_species(interaction)
+        self.references = [specie._distribution.copy() for specie in self.species]
+        self.parameters = reaction_parameters(interaction)
+
+        momenta = tables.grid_momenta(interaction, ps, aT)
+        self.table = tables.KernelTable(interaction, momenta) if tables.fits(interaction, momenta) else None
+
+        def integrals(distributions, parameters):
+            return evaluate(interaction, self.ps, self.bounds, kinds, distributions, parameters, aT=aT,
+                            table=self.table)
+
+        self.values = integrals(self.references, self.parameters)
+
+        if self.table is not None:
+            self.jacobians = self.table.jacobians(interaction.reaction, kinds, aT, self.species)
+        else:
+            self.jacobians = []
+            for index, reference in enumerate(self.references):
+                jacobian = numpy.zeros((len(kinds), len(ps), len(reference)))
+                floor = PERTURBATION_FLOOR * numpy.abs(reference).max()
+                for j, f in enumerate(reference):
+                    step = max(f, floor) * PERTURBATION
+                    if not step > 0:
+                        continue
+                    distributions = list(self.references)
+                    distributions[index] = reference.copy()
+                    distributions[index][j] += step
+
+                    values = integrals(distributions, self.parameters)
+                    for k, (value, value0) in enumerate(zip(values, self.values)):
+                        jacobian[k, :, j] = (value - value0) / step
+                self.jacobians.append(jacobian)
+
+        self.gradient = numpy.zeros((len(kinds), len(ps), len(self.parameters)))
+        for j, (parameter, scale) in enumerate(zip(self.parameters, parameter_scales(self.parameters, aT))):
+            # Massless reactants stay massless
+            if not parameter > 0:
+                continue
+            parameters = self.parameters.copy()
+            parameters[j] += scale * PARAMETER_PERTURBATION
+
+            values = integrals(self.references, parameters)
+            for k, (value, value0) in enumerate(zip(values, self.values)):
+                self.gradient[k, :, j] = (value - value0) / (scale * PARAMETER_PERTURBATION)
+
+    def valid(self, interaction, ps, bounds):
+        """ Whether the expansion still describes the current state of the reactants """
+        aT = interaction.particle.params.aT
+        if not numpy.allclose(ps * aT, self.ps * self.aT, rtol=1e-9, atol=0) \
+                or not numpy.allclose(numpy.array(bounds) * aT, self.bounds * self.aT, rtol=1e-9, atol=0):
+            return False
+
+        config = interaction.particle.params.config
+        drift = numpy.abs(reaction_parameters(interaction) - self.parameters) \
+            / parameter_scales(self.parameters, aT)
+        if numpy.any(drift > config.LINEARIZED_TEMPERATURE_TOLERANCE):
+            return False
+
+        tolerance = config.LINEARIZED_DEVIATION_TOLERANCE
+        return all(
+            numpy.max(numpy.abs(specie._distribution - reference)) <= tolerance * numpy.max(reference)
+            for specie, reference in zip(self.species, self.references)
+        )
+
+    def __call__(self, interaction):
+        """ Collision integrals for the current state of the reactants (in units of $aT$) """
+        values = [value.copy() for value in self.values]
+        deviations = [jacobian.dot(specie._distribution - reference)
+                      for specie, reference, jacobian in zip(self.species, self.references, self.jacobians)]
+        deviations.append(self.gradient.dot(reaction_parameters(interaction) - self.parameters))
+
+        for deviation in deviations:
+            for value, delta in zip(values, deviation):
+                value += delta
+
+        aT = interaction.particle.params.aT
+        return [value * (aT / self.aT)**-self.degree for value in values]
+
+
+def unique(species):
+    """ Species in the order of appearance, each one once """
+    result = []
+    for specie in species:
+        if all(specie is not other for other in result):
+            result.append(specie)
+    return result
+
+
+def unique_species(interaction):
+    """ Non-equilibrium species of the reaction, each one once """
+    return unique(item.specie for item in interaction.reaction if not item.specie.in_equilibrium)
+
+
+def reaction_parameters(interaction):
+    """ Squared conformal masses and temperatures of the species of the reaction """
+    return numpy.array([
+        value
+        for specie in unique(item.specie for item in interaction.reaction)
+        for value in (specie.conformal_mass**2, specie.aT)
+    ])
+
+
+def parameter_scales(parameters, aT):
+    """ Units of the squared masses and temperatures of the reactants """
+    return numpy.tile([aT**2, aT], len(parameters) // 2)
+
+
+def reactant_states(interaction, distributions, parameters):
+    """ Distribution functions, conformal masses and temperatures of the reactants for the\
+        `distributions` of the non-equilibrium species and the squared masses and temperatures\
+        `parameters` """
+    species = unique_species(interaction)
+    reactants = unique(item.specie for item in interaction.reaction)
+
+    states = []
+    for item in interaction.reaction:
+        specie = item.specie
+        distribution = specie._distribution
+        for other, f in zip(species, distributions):
+            if specie is other:
+                distribution = f
+        index = next(i for i, other in enumerate(reactants) if specie is other)
+        mass2, T = parameters[2 * index: 2 * index + 2]
+        states.append((distribution, numpy.sqrt(mass2), T))
+    return states
+
+
+def evaluate(interaction, ps, bounds, kinds, distributions, parameters=None, aT=None, table=None):
+    """ Collision integrals of the given `kinds` for the `distributions` of the non-equilibrium\
+        species and the squared masses and temperatures `parameters` of the reactants. Computed on\
+        the kernel `table` if it is built for these masses, on a new table if it fits into the cache\
+        budget and by the fixed-order engine otherwise. Momenta, bounds and the results are in units\
+        of `aT` (current $aT$ by default) """
+    if aT is None:
+        aT = interaction.particle.params.aT
+    if parameters is None:
+        parameters = reaction_parameters(interaction)
+
+    states = reactant_states(interaction, distributions, parameters)
+    masses = numpy.array([mass for _, mass, _ in states])
+
+    momenta = tables.grid_momenta(interaction, ps, aT)
+    if table is None or not numpy.allclose(masses, table.masses, rtol=1e-12, atol=0):
+        table = tables.KernelTable(interaction, momenta, masses) if tables.fits(interaction, momenta) else None
+    if table is not None:
+        return table.integrate(interaction.reaction, kinds, aT, states)
+
+    creaction = [
+        reaction_t(
+            specie=particle_t(
+                m=mass / aT,
+                grid=grid_t(grid=item.specie.grid.TEMPLATE / aT, distribution=distribution),
+                eta=int(item.specie.eta),
+                in_equilibrium=int(item.specie.in_equilibrium),
+                T=T / aT
+            ),
+            side=item.side
+        )
+        for item, (distribution, mass, T) in zip(interaction.reaction, states)
+    ]
+
+    nodes, weights = gauss_legendre.quadrature(interaction.particle.params.config.FOUR_PARTICLE_GAUSS_ORDER)
+
+    def kernels(ps):
+        if kinds == [CollisionIntegralKind.F_1, CollisionIntegralKind.F_f]:
+            return list(integration_split_fixed(ps, *bounds, creaction, interaction.cMs, nodes, weights))
+        return [integration_fixed(ps, *bounds, creaction, interaction.cMs, kind, nodes, weights)
+                for kind in kinds]
+
+    return scheduler.chunked(kernels, ps)
+
+
+def integrate(interaction, ps, bounds, kinds):
+    """ Collision integrals of the given `kinds` on the momenta `ps` (in units of $aT$) from the\
+        linear expansion of the `interaction`, rebuilt if it is no longer valid """
+    linearization = interaction.linearization
+    if linearization is None or linearization.kinds != list(kinds) \
+            or not linearization.valid(interaction, ps, bounds):
+        linearization = Linearization(interaction, ps, bounds, kinds)
+        interaction.linearization = linearization
+
+    return linearization(interaction)
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+# Tabulated collision kernels
+
+Kinematic part of the four-particle collision integrand (phase space factors and $D$-functions)\
+depends only on the momenta and masses of the reactants. For fixed momentum grids and constant\
+conformal masses it is computed once on a lattice of Gauss-Legendre nodes and the collision\
+integral reduces to a weighted sum of the distribution functional over the lattice.
+
+Tables are built in comoving momenta $y$. Collision integrals in units of $aT$ follow from the\
+homogeneity of the kernel: all momenta and masses scale together, so
+
+\begin{equation}
+    I(y / aT) = (aT)^{-5} I(y)
+\end{equation}
+
+(or $(aT)^{-2}$ for constant matrix elements). Masses enter the kernel only through the energies\
+$E^2 = y^2 + M^2$ of the thermal momenta $y \sim aT$, so the drift of the conformal masses is\
+measured in units of $aT$:
+
+\begin{equation}
+    \delta = \frac{|M^2 - M_0^2|}{(aT)^2}
+\end{equation}
+
+It grows by $2 (M / aT)^2 dy$ per step, and the table is rebuilt once it exceeds\
+`TABULATED_KERNEL_MASS_TOLERANCE`. Memory taken by the tables is bounded by\
+`COLLISION_KERNEL_CACHE_MB`; least recently used tables are evicted first.
+
+The distribution functional is linear in the distribution function of every reactant, and the\
+exponential interpolation on the lattice depends on two grid points per node, so the derivatives\
+of the integrals in the distribution functions on the grids follow from the table as well\
+(`KernelTable.jacobians`, used by the linearised collision integrals).
+"""
+from __future__ import division
+
+import numpy
+import threading
+from collections import OrderedDict
+
+from particles.interpolation import Nodes, exponential_interpolation, exponential_interpolation_derivatives
+from interactions.four_particle.cpp.integral import (
+    kernel_table, grid_t, particle_t, reaction_t, CollisionIntegralKind
+)
+
+
+# Rough memory footprint of a single lattice entry including the interpolation nodes
+ENTRY_BYTES = 200
+
+_tables = OrderedDict()
+# The cache is shared by the collision integrals computed in parallel and by concurrent runs
+_tables_lock = threading.Lock()
+
+
+class KernelTable(object):
+
+    """ ## Kinematic kernel of a collision integral on a fixed lattice
+        Built for the current conformal masses of the reactants unless other `masses` are given """
+
+    def __init__(self, interaction, ps, masses=None):
+        reaction = interaction.reaction
+        self.masses = conformal_masses(interaction) if masses is None else numpy.array(masses)
+        self.size = len(ps)
+
+        creaction = [
+            reaction_t(
+                specie=particle_t(
+                    m=mass,
+                    grid=grid_t(grid=item.specie.grid.TEMPLATE, distribution=item.specie._distribution),
+                    eta=int(item.specie.eta),
+                    in_equilibrium=int(item.specie.in_equilibrium),
+                    T=item.specie.aT
+                ),
+                side=item.side
+            )
+            for item, mass in zip(reaction, self.masses)
+        ]
+
+        bounds = (
+            interaction.grids[0].MIN_MOMENTUM,
+            interaction.grids[0].MAX_MOMENTUM,
+            interaction.grids[1].MIN_MOMENTUM,
+            interaction.grids[1].MAX_MOMENTUM,
+            reaction[3].specie.grid.MAX_MOMENTUM
+        )
+
+        nodes, weights = numpy.polynomial.legendre.leggauss(interaction.particle.params.config.TABULATED_KERNEL_ORDER)
+        self.index, self.weight, p1, p2, p3 = kernel_table(ps, *bounds, creaction, interaction.cMs,
+                                                          nodes, weights)
+
+        self.nodes = [Nodes(item.specie.grid.TEMPLATE, points)
+                      for item, points in zip(reaction, (ps, p1, p2, p3))]
+
+        self.degree = kernel_degree(interaction)
+        self.nbytes = len(self.index) * ENTRY_BYTES
+
+    def distributions(self, reaction, states=None):
+        """ Distribution functions of the reactants on the lattice. `states` replace the\
+            distribution functions, conformal masses and temperatures of the reactants """
+        if states is None:
+            states = [reactant_state(item.specie) for item in reaction]
+
+        fs = []
+        for item, nodes, (distribution, mass, T) in zip(reaction, self.nodes, states):
+            specie = item.specie
+            if specie.in_equilibrium:
+                E, _, _ = nodes.energies(mass)
+                f = 1. / (numpy.exp(E / T) + specie.eta)
+            else:
+                f = exponential_interpolation(nodes, distribution, mass, specie.eta, T)
+            fs.append(f)
+
+        fs[0] = fs[0][self.index]
+        return fs
+
+    def integrate(self, reaction, kinds, aT, states=None):
+        """ Collision integrals of the given `kinds` in units of `aT` """
+        fs = self.distributions(reaction, states)
+        functionals = Functionals(reaction, fs)
+
+        return [
+            numpy.bincount(self.index, weights=self.weight * functionals(kind), minlength=self.size)
+            * aT**-self.degree
+            for kind in kinds
+        ]
+
+    def jacobians(self, reaction, kinds, aT, species):
+        """ Derivatives of the collision integrals of the given `kinds` (in units of `aT`) in the\
+            distribution functions of the non-equilibrium `species` on their grids: one array of\
+            the shape (kinds, momenta, grid) per species """
+        fs = self.distributions(reaction)
+        values = Functionals(reaction, fs)
+
+        jacobians = []
+        for specie in species:
+            size = len(specie._distribution)
+            jacobian = numpy.zeros((len(kinds), self.size * size))
+
+            for position, (item, nodes) in enumerate(zip(reaction, self.nodes)):
+                if item.specie is not specie:
+                    continue
+
+                d_lo, d_hi = exponential_interpolation_derivatives(
+                    nodes, specie._distribution, specie.conformal_mass, specie.eta, specie.aT
+                )
+                i_lo, i_hi = nodes.i_lo, nodes.i_hi
+                if position == 0:
+                    d_lo, d_hi, i_lo, i_hi = (array[self.index] for array in (d_lo, d_hi, i_lo, i_hi))
+
+                # The functional is linear in $f$ of the reactant: the difference is its exact derivative
+                shifted = list(fs)
+                shifted[position] = fs[position] + 1.
+                derivatives = Functionals(reaction, shifted)
+
+                for k, kind in enumerate(kinds):
+                    weight = self.weight * (derivatives(kind) - values(kind))
+                    for i, d in ((i_lo, d_lo), (i_hi, d_hi)):
+                        jacobian[k] += numpy.bincount(self.index * size + i, weights=weight * d,
+                                                      minlength=self.size * size)
+
+            jacobians.append(jacobian.reshape(len(kinds), self.size, size) * aT**-self.degree)
+        return jacobians
+
+
+class Functionals(object):
+
+    """ Vectorized counterparts of the distribution functionals of the C++ module """
+
+    def __init__(self, reaction, fs):
+        self.reaction = reaction
+        self.fs = fs
+
+    def F_A(self, skip_index=-1):
+        temp = -numpy.ones_like(self.fs[0])
+        for i, (item, f) in enumerate(zip(self.reaction, self.fs)):
+            if i != skip_index:
+                temp *= f if item.side == -1 else 1. - item.specie.eta * f
+        return temp
+
+    def F_B(self, skip_index=-1):
+        temp = numpy.ones_like(self.fs[0])
+        for i, (item, f) in enumerate(zip(self.reaction, self.fs)):
+            if i != skip_index:
+                temp *= f if item.side == 1 else 1. - item.specie.eta * f
+        return temp
+
+    def __call__(self, kind):
+        eta = self.reaction[0].specie.eta
+        f0 = self.fs[0]
+
+        if kind == CollisionIntegralKind.F_1:
+            return self.F_B(0)
+        if kind == CollisionIntegralKind.F_f:
+            return self.F_A(0) - eta * self.F_B(0)
+        if kind == CollisionIntegralKind.F_decay:
+            return self.F_A(0)
+        if kind == CollisionIntegralKind.F_creation:
+            return self.F_B()
+        if kind == CollisionIntegralKind.F_1_vacuum_decay:
+            return self.fs[3]
+        if kind == CollisionIntegralKind.F_f_vacuum_decay:
+            return -numpy.ones_like(f0)
+        if kind == CollisionIntegralKind.Full_vacuum_decay:
+            return self.fs[3] - f0
+        return self.F_B(0) + f0 * (self.F_A(0) - eta * self.F_B(0))
+
+
+def kernel_degree(interaction):
+    """ Degree of homogeneity of the collision integral in the momenta and masses """
+    return 2 if interaction.Ms[0].K != 0. else 5
+
+
+def conformal_masses(interaction):
+    return numpy.array([item.specie.conformal_mass for item in interaction.reaction])
+
+
+def reactant_state(specie):
+    """ Distribution function, conformal mass and temperature of the reactant """
+    return specie._distribution, specie.conformal_mass, specie.aT
+
+
+def mass_drift(interaction, table):
+    """ Change of the squared conformal masses of the reactants since the `table` was built\
+        in units of $(aT)^2$ """
+    aT = interaction.particle.params.aT
+    return numpy.abs(conformal_masses(interaction)**2 - table.masses**2).max() / aT**2
+
+
+def table_key(interaction, ps):
+    return (
+        tuple((item.specie.name, item.side, item.specie.grid.BOUNDS, len(item.specie.grid.TEMPLATE))
+              for item in interaction.reaction),
+        tuple((tuple(M.order), M.K1, M.K2, M.K) for M in interaction.Ms),
+        ps.tobytes()
+    )
+
+
+def fits(interaction, ps):
+    """ Whether a kernel table on the momenta `ps` fits into the cache budget """
+    config = interaction.particle.params.config
+    return len(ps) * config.TABULATED_KERNEL_ORDER**2 * ENTRY_BYTES <= config.COLLISION_KERNEL_CACHE_MB * 2**20
+
+
+def grid_momenta(interaction, ps, aT):
+    """ Grid points of the particle for the momenta `ps` in units of `aT`: they are recovered\
+        exactly so that the tables can be reused """
+    template = interaction.particle.grid.TEMPLATE
+    index = numpy.searchsorted(template, ps * aT * (1. - 1e-9))
+    return template[numpy.minimum(index, len(template) - 1)]
+
+
+def get_table(interaction, ps):
+    """ Cached kernel table of the `interaction` on the momenta `ps`. Returns `None` if the table\
+        does not fit into the cache budget """
+    config = interaction.particle.params.config
+    budget = config.COLLISION_KERNEL_CACHE_MB * 2**20
+    key = table_key(interaction, ps)
+
+    with _tables_lock:
+        table = _tables.pop(key, None)
+    if table is not None and mass_drift(interaction, table) > config.TABULATED_KERNEL_MASS_TOLERANCE:
+        table = None
+
+    if table is None:
+        if not fits(interaction, ps):
+            return None
+        table = KernelTable(interaction, ps)
+
+    with _tables_lock:
+        _tables[key] = table
+        while sum(cached.nbytes for cached in _tables.values()) > budget:
+            _tables.popitem(last=False)
+
+        return _tables.get(key)
+
+
+def integrate(interaction, ps, kinds):
+    """ Collision integrals of the given `kinds` on the momenta `ps` (in units of $aT$) computed\
+        with the tabulated kernels. Returns `None` if no table is available """
+    aT = interaction.particle.params.aT
+
+    table = get_table(interaction, grid_momenta(interaction, ps, aT))
+    if table is None:
+        return None
+    return table.integrate(interaction.reaction, kinds, aT)
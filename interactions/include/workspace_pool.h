@@ -0,0 +1,45 @@
+#pragma once
+
+#include <vector>
+
+#include <gsl/gsl_integration.h>
+
+
+/* ## GSL integration workspaces
+
+    Workspaces are allocated once per thread and reused by all subsequent integrations. Each level\
+    of the nested integration gets its own workspace; the pool grows lazily when a deeper nesting\
+    or a larger number of subdivisions is requested.
+*/
+class workspace_pool {
+public:
+    workspace_pool() {}
+    workspace_pool(const workspace_pool &) = delete;
+    workspace_pool &operator=(const workspace_pool &) = delete;
+
+    ~workspace_pool() {
+        for (gsl_integration_workspace *w : workspaces) {
+            if (w) { gsl_integration_workspace_free(w); }
+        }
+    }
+
+    gsl_integration_workspace *get(size_t level, size_t subdivisions) {
+        if (workspaces.size() <= level) {
+            workspaces.resize(level + 1, nullptr);
+        }
+        gsl_integration_workspace *&w = workspaces[level];
+        if (w == nullptr || w->limit < subdivisions) {
+            if (w) { gsl_integration_workspace_free(w); }
+            w = gsl_integration_workspace_alloc(subdivisions);
+        }
+        return w;
+    }
+
+private:
+    std::vector<gsl_integration_workspace *> workspaces;
+};
+
+inline gsl_integration_workspace *thread_workspace(size_t level, size_t subdivisions) {
+    static thread_local workspace_pool pool;
+    return pool.get(level, subdivisions);
+}
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+# Collision integrals scheduler
+
+Collision integrals of all particles are computed in a single pool of `COLLISION_THREADS`\
+workers instead of particle by particle and integral by integral. Every integral is a task of\
+its own and every call of the four-particle integration routines is further split into chunks\
+of `COLLISION_CHUNK_SIZE` momenta that are put into one shared queue. Idle workers take the next\
+chunk regardless of the integral or the particle it belongs to, so reactions with short momentum\
+slices do not leave cores idle. Integration routines release the GIL and run a single OpenMP\
+thread inside the pool workers.
+
+Results are reduced back per particle by `DistributionParticle.reduce_collision_integrals`.
+
+Integrals of some particles change the state read by the integrals of the other particles (see\
+`is_barrier`). Such particles act as barriers: they are computed only after all preceding\
+particles are done and before any of the following particles is started, which keeps the results\
+identical to the serial evaluation order.
+
+Runs computed in one process (e.g. by different threads) share the pools of the same size, also\
+when their chunk sizes differ. The scheduler used by the momentum chunks is looked up per thread,\
+so concurrent runs do not take each other's chunk sizes. Pools are shut down at exit.
+"""
+import atexit
+import numpy
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import environment
+from common import kinematics
+from interactions.four_particle.cpp.integral import set_num_threads
+
+
+class CollisionScheduler(object):
+
+    """ ## Collision integrals and the momentum chunks in the shared thread pools """
+
+    def __init__(self, threads, chunk_size):
+        self.threads = threads
+        self.chunk_size = chunk_size
+        self.integrals, self.chunks = get_pools(threads)
+
+    def attach(self):
+        """ Split the momenta of the integrals computed by the current thread into the chunks """
+        _current.scheduler = self
+
+    def integrate(self, integral, ps, stepsize):
+        """ Integral task of the pool worker """
+        self.attach()
+        return integral.integrate(ps, stepsize=stepsize)
+
+    def chunked(self, function, ps):
+        """ Evaluate `function` returning a list of arrays over the momenta `ps` chunk by chunk """
+        if len(ps) <= self.chunk_size:
+            return function(ps)
+
+        futures = [self.chunks.submit(function, ps[i:i + self.chunk_size])
+                   for i in range(0, len(ps), self.chunk_size)]
+        parts = [future.result() for future in futures]
+
+        return [numpy.concatenate(part) for part in zip(*parts)]
+
+    def calculate(self, particles):
+        """ Collision integrals of the `particles` on their grids """
+        results = [None] * len(particles)
+        pending = []
+
+        def reduce_pending():
+            for index, ps, futures in pending:
+                results[index] = particles[index].reduce_collision_integrals(
+                    ps, [future.result() for future in futures]
+                )
+            del pending[:]
+
+        for index, particle in enumerate(particles):
+            ps = particle.grid.TEMPLATE
+
+            if is_barrier(particle):
+                reduce_pending()
+                results[index] = particle.calculate_collision_integral(ps)
+            elif not particle.collision_integrals or particle.decayed:
+                results[index] = numpy.zeros(len(ps))
+            else:
+                pending.append((index, ps, [
+                    self.integrals.submit(self.integrate, integral, ps, particle.params.h)
+                    for integral in particle.collision_integrals
+                ]))
+
+        reduce_pending()
+        return results
+
+
+def is_barrier(particle):
+    """ Fast-decaying particles rescale the distribution functions used by the others, particles\
+        that reach the decay threshold drop their distribution functions and the sterile neutrino\
+        stores its energy scale for the grid cut-offs of the other particles """
+    return (
+        hasattr(particle, 'fast_decay')
+        or particle.name == 'Sterile neutrino (Dirac)'
+        or kinematics.decay_threshold_reached(particle)
+    )
+
+
+# Scheduler of the collision integrals that are being computed by the current thread
+_current = threading.local()
+
+# Schedulers by the `COLLISION_THREADS` and `COLLISION_CHUNK_SIZE` settings
+_schedulers = {}
+# Pools of the integral tasks and of the momentum chunks by the number of threads
+_pools = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_pools(threads):
+    """ Shared pools of the integral tasks and of the momentum chunks of the given size """
+    if threads not in _pools:
+        # Integral tasks mostly wait for their chunks; chunk workers never wait, so the two
+        # pools can not deadlock each other. Integrals shorter than a chunk are computed by the
+        # integral tasks themselves, so the workers of both pools run a single OpenMP thread
+        _pools[threads] = tuple(
+            ThreadPoolExecutor(threads, initializer=set_num_threads, initargs=(1, ))
+            for _ in range(2)
+        )
+    return _pools[threads]
+
+
+def get_scheduler(config=None):
+    """ Shared scheduler for the `COLLISION_THREADS` and `COLLISION_CHUNK_SIZE` of the run\
+        configuration (of the process environment by default) """
+    if config is None:
+        config = environment.Configuration()
+    key = (config.COLLISION_THREADS, config.COLLISION_CHUNK_SIZE)
+
+    with _schedulers_lock:
+        if key not in _schedulers:
+            _schedulers[key] = CollisionScheduler(*key)
+        return _schedulers[key]
+
+
+@atexit.register
+def shutdown():
+    """ Stop the workers of all pools, the following runs start new ones """
+    with _schedulers_lock:
+        for pools in _pools.values():
+            for pool in pools:
+                pool.shutdown()
+        _pools.clear()
+        _schedulers.clear()
+
+
+def calculate(particles):
+    """ Collision integrals of the `particles` computed in the shared pool """
+    scheduler = get_scheduler(particles[0].params.config if particles else None)
+
+    previous = getattr(_current, 'scheduler', None)
+    scheduler.attach()
+    try:
+        return scheduler.calculate(particles)
+    finally:
+        _current.scheduler = previous
+
+
+def chunked(function, ps):
+    """ Split the evaluation of `function` over the momenta `ps` between the pool workers when\
+        the collision integrals are scheduled, evaluate it directly otherwise """
+    scheduler = getattr(_current, 'scheduler', None)
+    if scheduler is None:
+        return function(ps)
+    return scheduler.chunked(function, ps)
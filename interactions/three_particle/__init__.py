@@ -3,7 +3,6 @@ import numpy
 from scipy.integrate import simps
 from collections import Counter
 
-import environment
 from common import kinematics, UNITS
 from interactions.boltzmann import BoltzmannIntegral
 from interactions.three_particle.cpp.integral import (
@@ -64,25 +63,10 @@ class ThreeParticleIntegral(BoltzmannIntegral):
         if stepsize is None:
             stepsize = params.h
 
-        if not environment.get('LOGARITHMIC_TIMESTEP'):
+        if not params.config.LOGARITHMIC_TIMESTEP:
             stepsize /= params.aT
 
-        self.creaction = [
-            reaction_t3(
-                specie=particle_t3(
-                    m=particle.specie.conformal_mass / params.aT,
-                    grid=grid_t3(
-                        grid=particle.specie.grid.TEMPLATE / params.aT,
-                        distribution=particle.specie._distribution
-                    ),
-                    eta=int(particle.specie.eta),
-                    in_equilibrium=int(particle.specie.in_equilibrium),
-                    T=particle.specie.aT / params.aT
-                ),
-                side=particle.side
-            )
-            for particle in self.reaction
-        ]
+        self.reaction_views(grid_t3, particle_t3, reaction_t3)
 
         ps = ps / params.aT
         self.cMs = sum(M.K for M in self.Ms)
@@ -103,7 +87,7 @@ class ThreeParticleIntegral(BoltzmannIntegral):
 
         constant *= kinematics.CollisionMultiplier3p(self)
 
-        if not environment.get('LOGARITHMIC_TIMESTEP'):
+        if not params.config.LOGARITHMIC_TIMESTEP:
             constant /= params.x
 
         stepsize *= constant_else
@@ -116,17 +100,16 @@ class ThreeParticleIntegral(BoltzmannIntegral):
         if self.kind in [CollisionIntegralKind.Full, CollisionIntegralKind.Full_vacuum_decay] and not hasattr(self.particle, 'fast_decay'):
             C = integration_3(ps, *bounds, self.creaction, stepsize, CollisionIntegralKind.Full)
             B = integration_3(ps, *bounds, self.creaction, stepsize, CollisionIntegralKind.F_f)
-            return numpy.array(slice_1 + C + slice_3) * constant, numpy.array(slice_1 + B + slice_3) * constant
+            return (numpy.concatenate([slice_1, C, slice_3]) * constant,
+                    numpy.concatenate([slice_1, B, slice_3]) * constant)
 
         fullstack = integration_3(ps, *bounds, self.creaction, stepsize, self.kind)
-        fullstack = numpy.array(slice_1 + fullstack + slice_3)
+        fullstack = numpy.concatenate([slice_1, fullstack, slice_3])
 
         scaled_output = kinematics.scaling(self, fullstack, constant)
-        try:
-            if not scaled_output:
-                return kinematics.return_function(self, fullstack)
-        except:
-            fullstack = scaled_output
+        if scaled_output is False:
+            return kinematics.return_function(self, fullstack)
+        fullstack = scaled_output
 
         if hasattr(self.particle, 'fast_decay'):
             if self.kind in [CollisionIntegralKind.F_decay, CollisionIntegralKind.F_f_vacuum_decay]:
@@ -6,8 +6,8 @@ dbl energy(dbl y, dbl mass=0) {
 }
 
 
-std::pair<int, int> binary_find(const std::vector<dbl> &grid, dbl x) {
-    int head(0), tail(grid.size() - 1);
+std::pair<int, int> binary_find(const dbl *grid, size_t size, dbl x) {
+    int head(0), tail(size - 1);
     int middle;
 
     if (grid[tail] < x) {
@@ -38,8 +38,7 @@ std::pair<int, int> binary_find(const std::vector<dbl> &grid, dbl x) {
 }
 
 
-dbl distribution_interpolation(const std::vector<dbl> &grid,
-                               const std::vector<dbl> &distribution,
+dbl distribution_interpolation(const dbl *grid, const dbl *distribution, size_t size,
                                dbl p, dbl m=0., int eta=1, dbl T=1.,
                                bool in_equilibrium=false) {
 
@@ -51,14 +50,14 @@ dbl distribution_interpolation(const std::vector<dbl> &grid,
     }
 
     int i_lo, i_hi;
-    std::tie(i_lo, i_hi) = binary_find(grid, p);
+    std::tie(i_lo, i_hi) = binary_find(grid, size, p);
     if(i_lo == -1) {
         throw std::runtime_error("Input momentum is too small for the given grid");
     }
 
     if(i_hi == -1) {
-        return distribution[grid.size()-1]
-            * exp((energy(grid[grid.size() -1], m) - energy(p, m)) / T);
+        return distribution[size - 1]
+            * exp((energy(grid[size - 1], m) - energy(p, m)) / T);
     }
 
     if(i_lo == i_hi) {
@@ -110,7 +109,7 @@ dbl distribution_interpolation(const std::vector<dbl> &grid,
 
 dbl distribution_interpolation(const particle_t3 &specie, dbl p) {
     return distribution_interpolation(
-        specie.grid.grid, specie.grid.distribution,
+        specie.grid.grid, specie.grid.distribution, specie.grid.size,
         p,
         specie.m, specie.eta,
         specie.T, specie.in_equilibrium
@@ -474,18 +473,20 @@ dbl p1_bounds_4(const std::vector<reaction_t3> &reaction, dbl p0, dbl max_2
 }
 
 
-std::vector<dbl> integration_3(
-    std::vector<dbl> ps, dbl min_1, dbl max_1, dbl max_2, const std::vector<reaction_t3> &reaction,
-    dbl stepsize, int kind=0
+void integration_3(
+    const dbl *ps, size_t size, dbl min_1, dbl max_1, dbl max_2,
+    const std::vector<reaction_t3> &reaction,
+    dbl stepsize, int kind, dbl *integral
 ) {
+    /* Collision integral at the `size` momenta `ps`, written into the `integral` buffer */
 
-    std::vector<dbl> integral(ps.size(), 0.);
+    std::fill(integral, integral + size, 0.);
 
     auto reaction_type = get_reaction_type(reaction);
 
     // Note firstprivate() clause: those variables will be copied for each thread
-    #pragma omp parallel for default(none) shared(std::cout,ps, reaction, integral, stepsize, kind, reaction_type) firstprivate(min_1, max_1, max_2)
-    for (size_t i = 0; i < ps.size(); ++i) {
+    #pragma omp parallel for default(none) shared(std::cout, ps, size, reaction, integral, stepsize, kind, reaction_type) firstprivate(min_1, max_1, max_2)
+    for (size_t i = 0; i < size; ++i) {
         dbl p0 = ps[i];
 
         if (p0 == 0) {
@@ -528,7 +529,7 @@ std::vector<dbl> integration_3(
             dbl abseps = releps / stepsize;
 
             size_t subdivisions = 10000;
-            gsl_integration_workspace *w = gsl_integration_workspace_alloc(subdivisions);
+            gsl_integration_workspace *w = thread_workspace(0, subdivisions);
             struct integration_params params = {
                 p0, 0.,
                 &reaction,
@@ -547,22 +548,41 @@ std::vector<dbl> integration_3(
                 throw std::runtime_error("Integrator failed to reach required accuracy");
             }
 
-            gsl_integration_workspace_free(w);
             integral[i] += result;
         }
     }
-    return integral;
+}
+
+
+npcdbl output_array(const py::object &out, size_t size) {
+    /* Preallocated output array `out` (C-contiguous float64 of the size of `ps`) or a new one */
+    if (out.is_none()) {
+        return npcdbl(size);
+    }
+    if (!py::isinstance<py::array_t<dbl, py::array::c_style>>(out)) {
+        throw std::invalid_argument("Output has to be a C-contiguous float64 array");
+    }
+    auto array = py::reinterpret_borrow<npcdbl>(out);
+    if ((size_t) array.size() != size) {
+        throw std::invalid_argument("Output array does not match the momenta");
+    }
+    return array;
 }
 
 
 PYBIND11_MODULE(integral, m) {
     m.def("distribution_interpolation", [](
-        const std::vector<dbl> &grid,
-        const std::vector<dbl> &distribution,
+        const npcdbl &grid,
+        const npcdbl &distribution,
         const py::array_t<double> &ps, dbl m=0., int eta=1, dbl T=1.,
         bool in_equilibrium=false) {
-            auto v = [grid, distribution, m, eta, T, in_equilibrium](double p) {
-                return distribution_interpolation(grid, distribution, p, m, eta, T, in_equilibrium);
+            if (distribution.size() != grid.size()) {
+                throw std::invalid_argument("Distribution function does not match the grid");
+            }
+            const dbl *grid_ = grid.data(), *distribution_ = distribution.data();
+            size_t size = grid.size();
+            auto v = [grid_, distribution_, size, m, eta, T, in_equilibrium](double p) {
+                return distribution_interpolation(grid_, distribution_, size, p, m, eta, T, in_equilibrium);
             };
             return py::vectorize(v)(ps);
         },
@@ -571,12 +591,25 @@ PYBIND11_MODULE(integral, m) {
         "p"_a, "m"_a=0, "eta"_a=1, "T"_a=1., "in_equilibrium"_a=false
     );
 
-    m.def("binary_find", &binary_find,
-          "grid"_a, "x"_a);
-
-    m.def("integration_3", &integration_3,
-          "ps"_a, "min_1"_a, "max_1"_a, "max_2"_a,
-          "reaction"_a, "stepsize"_a, "kind"_a);
+    m.def("binary_find", [](const npcdbl &grid, dbl x) {
+            return binary_find(grid.data(), grid.size(), x);
+        },
+        "grid"_a, "x"_a);
+
+    m.def("integration_3", [](
+        const npcdbl &ps, dbl min_1, dbl max_1, dbl max_2,
+        const std::vector<reaction_t3> &reaction, dbl stepsize, int kind, const py::object &out) {
+            npcdbl integral = output_array(out, ps.size());
+            dbl *integral_ = integral.mutable_data();
+            {
+                py::gil_scoped_release release;
+                integration_3(ps.data(), ps.size(), min_1, max_1, max_2,
+                              reaction, stepsize, kind, integral_);
+            }
+            return integral;
+        },
+        "ps"_a, "min_1"_a, "max_1"_a, "max_2"_a,
+        "reaction"_a, "stepsize"_a, "kind"_a, "out"_a=py::none());
 
     py::enum_<CollisionIntegralKind_3>(m, "CollisionIntegralKind_3")
         .value("Full", CollisionIntegralKind_3::Full)
@@ -590,14 +623,19 @@ PYBIND11_MODULE(integral, m) {
         .enum_::export_values();
 
     py::class_<grid_t3>(m, "grid_t3")
-        .def(py::init<std::vector<dbl>, std::vector<dbl>>(),
-             "grid"_a, "distribution"_a);
+        .def(py::init<npcdbl, npcdbl>(),
+             "grid"_a, "distribution"_a)
+        .def_readonly("grid", &grid_t3::grid_array)
+        .def_readonly("distribution", &grid_t3::distribution_array);
 
     py::class_<particle_t3>(m, "particle_t3")
         .def(py::init<int, dbl, grid_t3, int, dbl>(),
-             "eta"_a, "m"_a, "grid"_a, "in_equilibrium"_a, "T"_a);
+             "eta"_a, "m"_a, "grid"_a, "in_equilibrium"_a, "T"_a)
+        .def_readonly("m", &particle_t3::m)
+        .def_readonly("grid", &particle_t3::grid);
 
     py::class_<reaction_t3>(m, "reaction_t3")
         .def(py::init<particle_t3, int>(),
-             "specie"_a, "side"_a);
+             "specie"_a, "side"_a)
+        .def_readonly("specie", &reaction_t3::specie);
 }
\ No newline at end of file
@@ -1,4 +1,5 @@
 #include <iostream>
+#include <algorithm>
 #include <cmath>
 #include <array>
 #include <vector>
@@ -11,10 +12,14 @@
 #include <gsl/gsl_errno.h>
 #include <gsl/gsl_integration.h>
 
+#include "workspace_pool.h"
+
 namespace py = pybind11;
 using namespace pybind11::literals;
 typedef double dbl;
 typedef py::array_t<dbl> npdbl;
+// Contiguous arrays whose memory is read directly by the integration routines
+typedef py::array_t<dbl, py::array::c_style | py::array::forcecast> npcdbl;
 
 enum class Kinematics_3 {
   DECAY = 1,
@@ -32,11 +37,22 @@ enum class CollisionIntegralKind_3 {
   F_decay = 7
 };
 
+/* Views of the grid and distribution function arrays of a specie, see `grid_t` of the\
+   four-particle integrals. Copies are only made while the GIL is held */
 struct grid_t3 {
-    grid_t3(std::vector<dbl> grid, std::vector<dbl> distribution)
-        : grid(grid), distribution(distribution) {}
-    std::vector<dbl> grid;
-    std::vector<dbl> distribution;
+    grid_t3(npcdbl grid_array, npcdbl distribution_array)
+        : grid_array(grid_array), distribution_array(distribution_array),
+          grid(grid_array.data()), distribution(distribution_array.data()),
+          size(grid_array.size()) {
+        if (distribution_array.size() != grid_array.size()) {
+            throw std::invalid_argument("Distribution function does not match the grid");
+        }
+    }
+    npcdbl grid_array;
+    npcdbl distribution_array;
+    const dbl *grid;
+    const dbl *distribution;
+    size_t size;
 };
 
 struct particle_t3 {
@@ -57,10 +73,9 @@ struct reaction_t3 {
 
 dbl energy(dbl y, dbl mass);
 
-std::pair<int, int> binary_find(const std::vector<dbl> &grid, dbl x);
+std::pair<int, int> binary_find(const dbl *grid, size_t size, dbl x);
 
-dbl distribution_interpolation(const std::vector<dbl> &grid,
-                               const std::vector<dbl> &distribution,
+dbl distribution_interpolation(const dbl *grid, const dbl *distribution, size_t size,
                                dbl p, dbl m, int eta, dbl T,
                                bool in_equilibrium);
 
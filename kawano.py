@@ -8,8 +8,10 @@ from scipy.integrate import simps
 from subprocess import Popen, PIPE
 
 from collections import namedtuple
+import environment
+import nucleosynthesis
 from common import UNITS, CONST, utils
-from common.integrators import integrate_1D
+from common.integrators import gauss_legendre
 from library import SM
 
 
@@ -19,18 +21,27 @@ q = (SM.particles.hadrons.neutron['mass'] - SM.particles.hadrons.proton['mass'])
 # q = 1.2933 * UNITS.MeV
 m_e = SM.particles.leptons.electron['mass']
 
-a = None
-
 Particles = namedtuple("Particles", "electron neutrino")
-particles = None
 
 
 def init_kawano(electron=None, neutrino=None):
-    global particles
-    particles = Particles(electron=electron, neutrino=neutrino)
+    """ Species of the run that define the weak rates, kept by the `Universe` """
+    return Particles(electron=electron, neutrino=neutrino)
+
 
+def run(data_folder, input="s4.dat", output="kawano_output.dat", config=None):
+    """ Light elements abundances on the background table `input` written by the `Universe` to\
+        the `data_folder`. The external KAWANO program writes them to `output`; with\
+        `NUCLEOSYNTHESIS = 'network'` the built-in reaction network writes `network_output.dat`.\
+        :return: Contents of the output file """
+    if config is None:
+        config = environment.Configuration()
+
+    if config.NUCLEOSYNTHESIS == 'network':
+        abundances = nucleosynthesis.solve(read_table(os.path.join(data_folder, input)))
+        with open(abundances.savetxt(os.path.join(data_folder, 'network_output.dat')), "r") as network_output:
+            return network_output.read()
 
-def run(data_folder, input="s4.dat", output="kawano_output.dat"):
     p = Popen(utils.getenv('KAWANO', 'KAWANO/kawano_noneq'), stdin=PIPE, env={
         "INPUT": os.path.join(data_folder, input),
         "OUTPUT": os.path.join(data_folder, output)
@@ -57,96 +68,55 @@ def run(data_folder, input="s4.dat", output="kawano_output.dat"):
         return kawano_output.read()
 
 
-@numpy.vectorize
-def _rate1(y):
-    """ n + ν_e ⟶  e + p """
-    E_e = q * a + y
-    if E_e < m_e * a:
-        return 0.
-    y_e = numpy.sqrt(E_e**2 - (m_e * a)**2)
-    return (y**2 * y_e * E_e
-            * (1. - particles.electron.distribution(y_e)) * particles.neutrino.distribution(y))
-
-
-@numpy.vectorize
-def _rate2(y):
-    """ e + p ⟶  n + ν_e """
-    E_e = q * a + y
-    if E_e < m_e * a:
-        return 0.
-    y_e = numpy.sqrt(E_e**2 - (m_e * a)**2)
-    return (y**2 * y_e * E_e
-            * particles.electron.distribution(y_e) * (1. - particles.neutrino.distribution(y)))
-
-
-@numpy.vectorize
-def _rate3(y):
-    """ n ⟶  e + ν_e' + p """
-    E_e = q * a - y
-    if E_e < m_e * a:
-        return 0.
-    y_e = numpy.sqrt(E_e**2 - (m_e * a)**2)
-    return (y**2 * y_e * E_e
-            * (1. - particles.electron.distribution(y_e))
-            * (1. - particles.neutrino.distribution(y)))
-
-
-@numpy.vectorize
-def _rate4(y):
-    """ e + ν_e' + p ⟶  n """
-    E_e = q * a - y
-    if E_e < m_e * a:
-        return 0.
-    y_e = numpy.sqrt(E_e**2 - (m_e * a)**2)
-    return (y**2 * y_e * E_e
-            * particles.electron.distribution(y_e) * particles.neutrino.distribution(y))
-
-
-@numpy.vectorize
-def _rate5(y):
-    """ n + e' ⟶  ν_e' + p """
-    E_e = -q * a + y
-    if E_e < m_e * a:
-        return 0.
-    y_e = numpy.sqrt(E_e**2 - (m_e * a)**2)
-    return (y**2 * y_e * E_e
-            * particles.electron.distribution(y_e) * (1. - particles.neutrino.distribution(y)))
-
-
-@numpy.vectorize
-def _rate6(y):
-    """ ν_e' + p ⟶  n + e' """
-    E_e = -q * a + y
-    if E_e < m_e * a:
-        return 0.
-    y_e = numpy.sqrt(E_e**2 - (m_e * a)**2)
-
-    return (y**2 * y_e * E_e
-            * (1. - particles.electron.distribution(y_e)) * particles.neutrino.distribution(y))
-
-
-def baryonic_rates(_a):
-    global a
-    a = _a
+def baryonic_rates(a, particles):
+    """ ## Weak $n \leftrightarrow p$ rates
+
+        Rates of the six reactions normalized by the free neutron decay rate:
 
+          1. n + ν_e ⟶  e + p
+          2. e + p ⟶  n + ν_e
+          3. n ⟶  e + ν_e' + p
+          4. e + ν_e' + p ⟶  n
+          5. n + e' ⟶  ν_e' + p
+          6. ν_e' + p ⟶  n + e'
+
+        Direct and reverse reactions share the neutrino momentum interval and the electron\
+        energy. Integrands of all reactions are evaluated on one set of Gauss-Legendre nodes\
+        (mapped onto the three intervals), so the distribution functions of electrons and\
+        neutrinos are computed once per node for all reactions.
+
+        :param particles: Electrons and neutrinos of the run (`init_kawano`)
+    """
     grid = particles.neutrino.grid
 
-    data = []
-    for integrand, bounds in [
-            (_rate1, (grid.MIN_MOMENTUM, grid.MAX_MOMENTUM)),
-            (_rate2, (grid.MIN_MOMENTUM, grid.MAX_MOMENTUM)),
-            (_rate3, (grid.MIN_MOMENTUM, (q - m_e) * a)),
-            (_rate4, (grid.MIN_MOMENTUM, (q - m_e) * a)),
-            (_rate5, ((q + m_e) * a, grid.MAX_MOMENTUM)),
-            (_rate6, ((q + m_e) * a, grid.MAX_MOMENTUM))
-    ]:
-        if bounds[0] < bounds[1]:
-            data.append(CONST.rate_normalization / particles.neutrino.params.a**5
-                        * integrate_1D(integrand, bounds=bounds)[0])
-        else:
-            data.append(0.)
+    # Neutrino momentum intervals and the electron energy $E_e = \pm q a \pm y$ of the three pairs
+    lower = numpy.array([grid.MIN_MOMENTUM, grid.MIN_MOMENTUM, (q + m_e) * a])
+    upper = numpy.array([grid.MAX_MOMENTUM, (q - m_e) * a, grid.MAX_MOMENTUM])
+    sign_q = numpy.array([1., 1., -1.])
+    sign_y = numpy.array([1., -1., 1.])
 
-    return data
+    half = numpy.maximum(upper - lower, 0.) / 2.
+    y = half[:, None] * gauss_legendre.points + (upper + lower)[:, None] / 2.
+
+    E_e = sign_q[:, None] * q * a + sign_y[:, None] * y
+    allowed = E_e >= m_e * a
+    y_e = numpy.sqrt(numpy.where(allowed, E_e**2 - (m_e * a)**2, 0.))
+
+    f_nu = particles.neutrino.distribution(y.ravel()).reshape(y.shape)
+    f_e = particles.electron.distribution(y_e.ravel()).reshape(y.shape)
+
+    kernel = numpy.where(allowed, y**2 * y_e * E_e, 0.) * half[:, None] * gauss_legendre.weights
+
+    direct = [(1. - f_e[0]) * f_nu[0], (1. - f_e[1]) * (1. - f_nu[1]), f_e[2] * (1. - f_nu[2])]
+    reverse = [f_e[0] * (1. - f_nu[0]), f_e[1] * f_nu[1], (1. - f_e[2]) * f_nu[2]]
+
+    rates = numpy.array([
+        numpy.dot(kernel[i], integrand)
+        for i in range(3)
+        for integrand in (direct[i], reverse[i])
+    ])
+
+    return CONST.rate_normalization / a**5 * rates
 
 
 Plotting = namedtuple('Plotting', 'figure plots')
@@ -169,6 +139,14 @@ heading = [
 ]
 
 
+def read_table(filepath):
+    """ Background table written by the `Universe` as the `DynamicRecArray` of the `heading` columns """
+    data = utils.DynamicRecArray(heading)
+    for row in numpy.loadtxt(filepath, skiprows=1, ndmin=2):
+        data.append(tuple(row * data.units))
+    return data
+
+
 def import_data(filepath):
     import pandas
     with open(filepath) as f:
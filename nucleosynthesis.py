@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+# Nucleosynthesis network
+
+In-process replacement of the external KAWANO program. The light elements abundances are obtained\
+by integrating the reaction network of the 12 most important BBN reactions (Smith, Kawano and\
+Malaney, ApJS 85 (1993) 219) on top of the background recorded in `Universe.kawano_data`:
+
+  * time, photon temperature and conformal scale factor define the baryon density
+  * the weak $n \leftrightarrow p$ rates are taken directly from the table
+
+The abundances $Y_i = n_i / n_b$ obey
+
+\begin{equation}
+    \frac{d Y_i}{dt} = \sum_{j + k \to i + l} \rho_b \langle \sigma v \rangle_{jk} Y_j Y_k
+        - \sum_{i + j \to k + l} \rho_b \langle \sigma v \rangle_{ij} Y_i Y_j + \dots
+\end{equation}
+
+Reverse rates follow from the detailed balance. The system is stiff and is solved by the BDF\
+method, so no process spawning or file exchange is needed and many networks can be solved in one\
+process.
+"""
+from __future__ import division
+
+import numpy
+from collections import OrderedDict
+from scipy.integrate import solve_ivp
+from scipy.special import zeta
+
+from common import UNITS, CONST
+
+
+# Free neutron lifetime (the default value of KAWANO)
+tau_n = 885.7 * UNITS.s
+# Atomic mass unit
+m_u = 931.494 * UNITS.MeV
+
+# Nuclear reactions are switched on below this temperature: the rate fits are valid for $T_9 < 10$\
+# and above it deuterium is destroyed as soon as it is formed, so only the weak rates matter
+T9_nuclear = 10.
+
+species = ['n', 'p', 'd', 't', 'He3', 'He4', 'Li7', 'Be7']
+index = {name: i for i, name in enumerate(species)}
+
+
+class Reaction(object):
+
+    """ ## Nuclear reaction
+        `rate` is the forward $N_A \langle \sigma v \rangle$ in $cm^3 / (mol \cdot s)$ as a\
+        function of $T_9$. The reverse rate is `reverse` $\cdot e^{-Q_9 / T_9}$ times the forward\
+        one, with an extra $T_9^{3/2}$ for the photodisintegration of a single product. """
+
+    def __init__(self, reactants, products, rate, reverse, Q9):
+        self.reactants = [index[name] for name in reactants]
+        self.products = [index[name] for name in products]
+        self.rate = rate
+        self.reverse = reverse
+        self.Q9 = Q9
+
+        self.symmetry_forward = 2. if len(set(reactants)) < len(reactants) else 1.
+        self.symmetry_reverse = 2. if len(set(products)) < len(products) else 1.
+
+    def flux(self, Y, T9, rho_b):
+        """ Net number of reactions per baryon per second """
+        f = self.rate(T9)
+        r = self.reverse * numpy.exp(-self.Q9 / T9) * f
+
+        forward = rho_b * f * numpy.prod(Y[self.reactants]) / self.symmetry_forward
+        if len(self.products) == 1:
+            backward = r * T9**1.5 * Y[self.products[0]]
+        else:
+            backward = rho_b * r * numpy.prod(Y[self.products]) / self.symmetry_reverse
+
+        return forward - backward
+
+    def flux_gradient(self, Y, T9, rho_b):
+        """ Derivatives of the `flux` with respect to the abundances """
+        f = self.rate(T9)
+        r = self.reverse * numpy.exp(-self.Q9 / T9) * f
+
+        gradient = numpy.zeros_like(Y)
+        for side, coefficient in [
+            (self.reactants, rho_b * f / self.symmetry_forward),
+            (self.products, -(r * T9**1.5 if len(self.products) == 1
+                              else rho_b * r / self.symmetry_reverse))
+        ]:
+            for k in range(len(side)):
+                gradient[side[k]] += coefficient * numpy.prod(Y[side[:k] + side[k + 1:]])
+
+        return gradient
+
+
+def _T9f(T9, c):
+    return T9 / (1. + c * T9)
+
+
+reactions = [
+    # p(n,γ)d
+    Reaction(['n', 'p'], ['d'],
+             lambda T9: 4.742e4 * (1. - .8504 * T9**.5 + .4895 * T9 - .09623 * T9**1.5
+                                   + 8.471e-3 * T9**2 - 2.80e-4 * T9**2.5),
+             4.71e9, 25.82),
+    # d(p,γ)He3
+    Reaction(['d', 'p'], ['He3'],
+             lambda T9: 2.65e3 * T9**(-2/3) * numpy.exp(-3.720 * T9**(-1/3))
+             * (1. + .112 * T9**(1/3) + 1.99 * T9**(2/3) + 1.56 * T9 + .162 * T9**(4/3) + .324 * T9**(5/3)),
+             1.63e10, 63.75),
+    # d(d,n)He3
+    Reaction(['d', 'd'], ['n', 'He3'],
+             lambda T9: 3.95e8 * T9**(-2/3) * numpy.exp(-4.259 * T9**(-1/3))
+             * (1. + .098 * T9**(1/3) + .765 * T9**(2/3) + .525 * T9 + 9.61e-3 * T9**(4/3) + .0167 * T9**(5/3)),
+             1.73, 37.94),
+    # d(d,p)t
+    Reaction(['d', 'd'], ['p', 't'],
+             lambda T9: 4.17e8 * T9**(-2/3) * numpy.exp(-4.258 * T9**(-1/3))
+             * (1. + .098 * T9**(1/3) + .518 * T9**(2/3) + .355 * T9 - .010 * T9**(4/3) - .018 * T9**(5/3)),
+             1.73, 46.80),
+    # He3(n,p)t
+    Reaction(['He3', 'n'], ['p', 't'],
+             lambda T9: 7.21e8 * (1. - .508 * T9**.5 + .228 * T9),
+             1.001, 8.864),
+    # t(d,n)He4
+    Reaction(['t', 'd'], ['n', 'He4'],
+             lambda T9: 1.063e11 * T9**(-2/3) * numpy.exp(-4.559 * T9**(-1/3) - (T9 / .0754)**2)
+             * (1. + .092 * T9**(1/3) - .375 * T9**(2/3) - .242 * T9 + 33.82 * T9**(4/3) + 55.42 * T9**(5/3))
+             + 8.047e8 * T9**(-2/3) * numpy.exp(-.4857 / T9),
+             5.54, 204.1),
+    # He3(d,p)He4
+    Reaction(['He3', 'd'], ['p', 'He4'],
+             lambda T9: 5.021e10 * T9**(-2/3) * numpy.exp(-7.144 * T9**(-1/3) - (T9 / .270)**2)
+             * (1. + .058 * T9**(1/3) + .603 * T9**(2/3) + .245 * T9 + 6.97 * T9**(4/3) + 7.19 * T9**(5/3))
+             + 5.212e8 / T9**.5 * numpy.exp(-1.762 / T9),
+             5.55, 212.4),
+    # He3(α,γ)Be7
+    Reaction(['He3', 'He4'], ['Be7'],
+             lambda T9: 4.817e6 * T9**(-2/3) * numpy.exp(-14.964 * T9**(-1/3))
+             * (1. + .0325 * T9**(1/3) - 1.04e-3 * T9**(2/3) - 2.37e-4 * T9 - 8.11e-5 * T9**(4/3)
+                - 4.69e-5 * T9**(5/3))
+             + 5.938e6 * _T9f(T9, .1071)**(5/6) * T9**-1.5 * numpy.exp(-12.859 * _T9f(T9, .1071)**(-1/3)),
+             1.11e10, 18.42),
+    # t(α,γ)Li7
+    Reaction(['t', 'He4'], ['Li7'],
+             lambda T9: 3.032e5 * T9**(-2/3) * numpy.exp(-8.090 * T9**(-1/3))
+             * (1. + .0516 * T9**(1/3) + .0229 * T9**(2/3) + 8.28e-3 * T9 - 3.28e-4 * T9**(4/3)
+                - 3.01e-4 * T9**(5/3))
+             + 5.109e5 * _T9f(T9, .1378)**(5/6) * T9**-1.5 * numpy.exp(-8.068 * _T9f(T9, .1378)**(-1/3)),
+             1.11e10, 28.63),
+    # Be7(n,p)Li7
+    Reaction(['Be7', 'n'], ['p', 'Li7'],
+             lambda T9: 2.675e9 * (1. - .560 * T9**.5 + .179 * T9 - .0283 * T9**1.5 + 2.214e-3 * T9**2
+                                   - 6.851e-5 * T9**2.5)
+             + 9.391e8 * _T9f(T9, 13.076)**1.5 * T9**-1.5 + 4.467e7 * T9**-1.5 * numpy.exp(-.07486 / T9),
+             1.00, 19.07),
+    # Li7(p,α)He4
+    Reaction(['Li7', 'p'], ['He4', 'He4'],
+             lambda T9: 1.096e9 * T9**(-2/3) * numpy.exp(-8.472 * T9**(-1/3))
+             - 4.830e8 * _T9f(T9, .759)**(5/6) * T9**-1.5 * numpy.exp(-8.472 * _T9f(T9, .759)**(-1/3))
+             + 1.06e10 * T9**-1.5 * numpy.exp(-30.442 / T9),
+             4.69, 201.3),
+]
+
+
+class Background(object):
+
+    """ ## Network background
+        Interpolation of the `Universe.kawano_data` table in time """
+
+    def __init__(self, kawano_data, eta=CONST.eta):
+        data = kawano_data.data
+        if len(data) < 2:
+            raise ValueError("Nucleosynthesis background needs at least 2 rows, got {}"
+                             .format(len(data)))
+
+        self.t = data[kawano_data.columns[0]] / UNITS.s
+        if not numpy.all(numpy.diff(self.t) > 0):
+            raise ValueError("Times of the nucleosynthesis background are not increasing")
+        self.log_t = numpy.log(self.t)
+
+        x = data[kawano_data.columns[1]]
+        T = data[kawano_data.columns[2]]
+
+        # Baryon density scales as $a^{-3}$ and is fixed by $\eta$ after the end of the run
+        n_b = eta * 2. * zeta(3) / numpy.pi**2 * T[-1]**3 * (x[-1] / x)**3
+        self.log_rho_b = numpy.log(n_b * m_u / UNITS.g_cm3)
+        self.log_T9 = numpy.log(T / UNITS.K9)
+
+        # Weak rates are normalized by the free neutron decay rate
+        rates = [data[column] / (tau_n / UNITS.s) for column in kawano_data.columns[6:12]]
+        self.n_to_p = rates[0] + rates[2] + rates[4]
+        self.p_to_n = rates[1] + rates[3] + rates[5]
+
+    def __call__(self, t):
+        """ $T_9$, baryon density in $g / cm^3$ and weak rates in $1 / s$ at the time `t` in seconds """
+        log_t = numpy.log(t)
+        return (
+            numpy.exp(numpy.interp(log_t, self.log_t, self.log_T9)),
+            numpy.exp(numpy.interp(log_t, self.log_t, self.log_rho_b)),
+            numpy.interp(log_t, self.log_t, self.n_to_p),
+            numpy.interp(log_t, self.log_t, self.p_to_n)
+        )
+
+
+class Abundances(object):
+
+    """ ## Light elements abundances
+        `Y[i]` is the abundance of the `species[i]` per baryon at the times `t` (in seconds) """
+
+    def __init__(self, t, T9, Y):
+        self.t = t
+        self.T9 = T9
+        self.Y = Y
+
+    def __getitem__(self, name):
+        return self.Y[index[name]]
+
+    def observables(self):
+        """ Final helium-4 mass fraction and abundances of deuterium, helium-3 and lithium-7\
+            relative to hydrogen (unstable tritium and beryllium-7 are added to their products) """
+        Y = self.Y[:, -1]
+        H = Y[index['p']]
+        return OrderedDict([
+            ('Yp', 4. * Y[index['He4']]),
+            ('D/H', Y[index['d']] / H),
+            ('He3/H', (Y[index['He3']] + Y[index['t']]) / H),
+            ('Li7/H', (Y[index['Li7']] + Y[index['Be7']]) / H)
+        ])
+
+    def savetxt(self, path):
+        """ Save the evolution of the abundances followed by the `Observables:` line """
+        observables = self.observables()
+        with open(path, 'w') as f:
+            numpy.savetxt(f, numpy.vstack([self.t, self.T9, self.Y]).T, delimiter='\t',
+                          header='\t'.join(['t, s', 'T9'] + species))
+            f.write('# ' + '\t'.join(observables.keys()) + '\n')
+            f.write('Observables: ' + '\t'.join('{:e}'.format(value) for value in observables.values())
+                    + '\n')
+        return path
+
+
+def equations(tau, Y, background, t0, nuclear):
+    """ Abundances derivatives at the time `t0 + tau` """
+    T9, rho_b, n_to_p, p_to_n = background(t0 + tau)
+
+    dY = numpy.zeros_like(Y)
+
+    weak = n_to_p * Y[index['n']] - p_to_n * Y[index['p']]
+    dY[index['n']] -= weak
+    dY[index['p']] += weak
+
+    if not nuclear:
+        return dY
+
+    for reaction in reactions:
+        flux = reaction.flux(Y, T9, rho_b)
+        for i in reaction.reactants:
+            dY[i] -= flux
+        for i in reaction.products:
+            dY[i] += flux
+
+    return dY
+
+
+def jacobian(tau, Y, background, t0, nuclear):
+    T9, rho_b, n_to_p, p_to_n = background(t0 + tau)
+
+    J = numpy.zeros((len(Y), len(Y)))
+
+    J[index['n'], index['n']] -= n_to_p
+    J[index['n'], index['p']] += p_to_n
+    J[index['p'], index['n']] += n_to_p
+    J[index['p'], index['p']] -= p_to_n
+
+    if not nuclear:
+        return J
+
+    for reaction in reactions:
+        gradient = reaction.flux_gradient(Y, T9, rho_b)
+        for i in reaction.reactants:
+            J[i] -= gradient
+        for i in reaction.products:
+            J[i] += gradient
+
+    return J
+
+
+def solve(kawano_data, eta=CONST.eta, rtol=1e-6, atol=1e-25):
+    """ Abundances of the light elements on the background of the `kawano_data` table of at least\
+        two rows with increasing times """
+    background = Background(kawano_data, eta=eta)
+    t = background.t
+
+    # Neutrons and protons start in the weak equilibrium
+    _, _, n_to_p, p_to_n = background(t[0])
+    Y = numpy.zeros(len(species))
+    Y[index['n']] = p_to_n / (n_to_p + p_to_n)
+    Y[index['p']] = 1. - Y[index['n']]
+
+    # Weak interactions only, then the full network
+    T9 = numpy.exp(background.log_T9)
+    start = numpy.argmax(T9 <= T9_nuclear) if T9[-1] <= T9_nuclear else len(t) - 1
+    stages = [(t[:start + 1], False), (t[start:], True)]
+
+    ts, Ys = [], []
+    for times, nuclear in stages:
+        if len(times) < 2:
+            continue
+
+        # Time is counted from the beginning of the stage: the initial transients are much shorter\
+        # than the floating point resolution of the absolute time
+        t0 = times[0]
+        solution = solve_ivp(equations, (0., times[-1] - t0), Y, method='BDF', t_eval=times - t0,
+                             jac=jacobian, args=(background, t0, nuclear), rtol=rtol, atol=atol)
+        if not solution.success:
+            raise RuntimeError("Nucleosynthesis network failed: {}".format(solution.message))
+
+        Y = solution.y[:, -1]
+        ts.append(times[:-1])
+        Ys.append(solution.y[:, :-1])
+
+    # Stages cover the whole table, so `Y` is the state at its last time
+    ts.append(t[-1:])
+    Ys.append(Y[:, numpy.newaxis])
+    t = numpy.concatenate(ts)
+
+    return Abundances(t, numpy.exp(numpy.interp(numpy.log(t), background.log_t, background.log_T9)),
+                      numpy.hstack(Ys))
@@ -1,13 +1,14 @@
 """
 For intermediate regime equilibrium particles, density, energy density and pressure\
-are obtained through integration of distribution function
+are obtained through integration of distribution function or from the\
+[[equilibrium tables|particles/equilibrium_tables.py]] (`TABULATED_EQUILIBRIUM_THERMODYNAMICS`)
 """
 
 import numpy
 
-import environment
 from common import integrators
 from common.integrators import gauss_laguerre
+from particles import equilibrium_tables
 
 
 name = 'intermediate'
@@ -94,6 +95,28 @@ def entropy(particle):
     return (energy_density(particle) + pressure(particle)) / particle.params.T
 
 
+def thermodynamics(particle):
+    """ Density, energy density, pressure and entropy at once: the entropy reuses the energy\
+        density and pressure """
+    config = particle.params.config
+    if config.TABULATED_EQUILIBRIUM_THERMODYNAMICS:
+        T = particle.T
+        z = particle.mass / T
+        g = particle.dof / 2. / numpy.pi**2
+
+        def lookup(name):
+            return equilibrium_tables.lookup(name, z, particle.eta,
+                                             config.EQUILIBRIUM_TABLE_TOLERANCE)
+
+        n = g * T**3 * lookup('density')
+        rho = g * T**4 * lookup('energy_density')
+        P = g * T**4 / 3. * lookup('pressure')
+    else:
+        n, rho, P = density(particle), energy_density(particle), pressure(particle)
+
+    return n, rho, P, (rho + P) / particle.params.T
+
+
 # ## Master equation terms
 
 def numerator(particle):
@@ -116,7 +139,15 @@ def denominator(particle):
 
 
 def Int(particle, y_power=2):
-    if environment.get('LAGUERRE_GAUSS_FOR_MASSIVE_EQUILIBRIUM_PARTICLES'):
+    config = particle.params.config
+    if config.TABULATED_EQUILIBRIUM_THERMODYNAMICS:
+        aT = particle.params.aT
+        return (
+            particle.dof / 2. / numpy.pi**2 * aT**(y_power + 1)
+            * equilibrium_tables.lookup('I{}'.format(y_power), particle.conformal_mass / aT,
+                                        particle.eta, config.EQUILIBRIUM_TABLE_TOLERANCE)
+        )
+    elif config.LAGUERRE_GAUSS_FOR_MASSIVE_EQUILIBRIUM_PARTICLES:
         aT = particle.params.aT
         mat = particle.conformal_mass / aT
 
@@ -6,85 +6,104 @@ import numpy
 numpy.seterr(divide='ignore', invalid='ignore', over='ignore')
 from scipy.integrate import simps
 
-import environment
-from common import linear_interpolation
-from common.integrators import lambda_integrate
+from particles.interpolation import grid_nodes, exponential_interpolation
 
 
 name = 'non-equilibrium'
 aT = 0
 adec = 0
-if not environment.get('SIMPSONS_NONEQ_PARTICLES'):
-
-    def density(particle):
-        @lambda_integrate(particle.grid.BOUNDS)
-        def den():
-            return numpy.vectorize(lambda y: (
-                particle.distribution(y) * y**2
-                * particle.dof / 2. / numpy.pi**2 / particle.params.a**3
-            ), otypes=[numpy.float_])
-        return den()
 
 
-    def energy_density(particle):
-        @lambda_integrate(particle.grid.BOUNDS)
-        def energy_den():
-            """ ### Energy density
-
-                \begin{equation}
-                    \rho = \frac{g}{2 \pi^2} \frac{m^4}{x^4} \int dy y^2 \sqrt{y^2 +\
-                    \frac{M_N^2 x^2}{m^2}} f(y)
-                \end{equation}
-            """
-            return numpy.vectorize(lambda y: (
-                particle.distribution(y)
-                * y**2 * particle.conformal_energy(y)
-                * particle.dof / 2. / numpy.pi**2 / particle.params.a**4
-            ), otypes=[numpy.float_])
-        return energy_den()
+def entropy_density(f, eta):
+    integrand = numpy.zeros(len(f))
+    mask = f > 0
+    f = f[mask]
+    integrand[mask] = f * numpy.log(f) + eta * (1 - eta * f) * numpy.log(1 - eta * f)
+    return integrand
 
 
-    def pressure(particle):
-        @lambda_integrate(particle.grid.BOUNDS)
-        def press():
-            """ ### Pressure
+class Interpolated(object):
 
-                \begin{equation}
-                    p = \frac{g}{6 \pi^2} \frac{m^4}{x^4} \int \frac{dy \, y^4 f(y)}\
-                    { \sqrt{y^2 + \frac{M_N^2 x^2}{m^2}} }
-                \end{equation}
-            """
+    """ ## Momentum integrals on the quadrature nodes of the interpolated distribution function """
 
-            return numpy.vectorize(lambda p: (
-                particle.distribution(p) * p**4 / particle.conformal_energy(p)
-                * particle.dof / 6. / numpy.pi**2 / particle.params.a**4
-            ), otypes=[numpy.float_])
-        return press()
+    @staticmethod
+    def distribution(particle):
+        """ Distribution function on the quadrature nodes of the particle grid """
+        nodes = grid_nodes(particle.grid)
+        conformal_mass = particle.mass * particle.aT / particle.decoupling_temperature
+        return nodes, exponential_interpolation(nodes, particle._distribution, conformal_mass,
+                                                particle.eta, particle.aT)
 
+    @staticmethod
+    def quadrature(particle):
+        """ Momenta and weights of the momentum integrals, distribution function on the momenta """
+        nodes, f = Interpolated.distribution(particle)
+        return nodes.points, nodes.weights, f
 
-    def entropy(particle):
-        @lambda_integrate(particle.grid.BOUNDS)
-        def ent():
-            """ ## Entropy
+    @staticmethod
+    def density(particle):
+        nodes, f = Interpolated.distribution(particle)
+        y = nodes.points
+        return (numpy.dot(nodes.weights, f * y**2)
+                * particle.dof / 2. / numpy.pi**2 / particle.params.a**3)
 
-                \begin{equation}
-                    s = - \int_0^\inf p^2 dp \left{ f(p) \ln f(p) \mp (1 \pm f(p)) \ln (1 \pm f(p)) \right}
-                \end{equation}
-            """
+    @staticmethod
+    def energy_density(particle):
+        """ ### Energy density
 
-            def integrand(p):
-                f = particle.distribution(p)
-                eta = particle.eta
+            \begin{equation}
+                \rho = \frac{g}{2 \pi^2} \frac{m^4}{x^4} \int dy y^2 \sqrt{y^2 +\
+                \frac{M_N^2 x^2}{m^2}} f(y)
+            \end{equation}
+        """
+        nodes, f = Interpolated.distribution(particle)
+        y = nodes.points
+        return (numpy.dot(nodes.weights, f * y**2 * particle.conformal_energy(y))
+                * particle.dof / 2. / numpy.pi**2 / particle.params.a**4)
 
-                if f == 0:
-                    return 0.
+    @staticmethod
+    def pressure(particle):
+        """ ### Pressure
 
-                return (- particle.dof / 2 / numpy.pi**2 / particle.params.a**3
-                        * p**2 * (f * numpy.log(f) + eta * (1 - eta * f) * numpy.log(1 - eta * f)))
+            \begin{equation}
+                p = \frac{g}{6 \pi^2} \frac{m^4}{x^4} \int \frac{dy \, y^4 f(y)}\
+                { \sqrt{y^2 + \frac{M_N^2 x^2}{m^2}} }
+            \end{equation}
+        """
+        nodes, f = Interpolated.distribution(particle)
+        y = nodes.points
+        return (numpy.dot(nodes.weights, f * y**4 / particle.conformal_energy(y))
+                * particle.dof / 6. / numpy.pi**2 / particle.params.a**4)
 
-            return numpy.vectorize(integrand, otypes=[numpy.float_])
-        return ent()
+    @staticmethod
+    def entropy(particle):
+        """ ## Entropy
 
+            \begin{equation}
+                s = - \int_0^\inf p^2 dp \left{ f(p) \ln f(p) \mp (1 \pm f(p)) \ln (1 \pm f(p)) \right}
+            \end{equation}
+        """
+        nodes, f = Interpolated.distribution(particle)
+        y = nodes.points
+        return (- particle.dof / 2 / numpy.pi**2 / particle.params.a**3
+                * numpy.dot(nodes.weights, y**2 * entropy_density(f, particle.eta)))
+
+    @staticmethod
+    def thermodynamics(particle):
+        """ Density, energy density, pressure and entropy in a single pass over the quadrature\
+            nodes: the distribution function is interpolated only once """
+        nodes, f = Interpolated.distribution(particle)
+        y = nodes.points
+        w = nodes.weights * y**2 * particle.dof / 2. / numpy.pi**2
+        E = particle.conformal_energy(y)
+        a = particle.params.a
+
+        return (
+            numpy.dot(w, f) / a**3,
+            numpy.dot(w, f * E) / a**4,
+            numpy.dot(w, f * y**2 / E) / 3. / a**4,
+            - numpy.dot(w, entropy_density(f, particle.eta)) / a**3
+        )
 
     # @lambda_integrate()
     # def inverse_gamma_factor(particle):
@@ -99,7 +118,6 @@ if not environment.get('SIMPSONS_NONEQ_PARTICLES'):
 
     #     return numpy.vectorize(integrand, otypes=[numpy.float_])
 
-
     """ ## Master equation terms """
 
     """ ### Numerator
@@ -109,17 +127,15 @@ if not environment.get('SIMPSONS_NONEQ_PARTICLES'):
         \end{equation}
     """
 
-
+    @staticmethod
     def numerator(particle):
-        integral = linear_interpolation(particle.collision_integral / particle.params.x,
-                                        particle.grid.TEMPLATE)
-        return lambda_integrate(particle.grid.BOUNDS)(lambda particle: numpy.vectorize(lambda y: (
-            -1. * particle.dof / 2. / numpy.pi**2
-            * y**2 * particle.conformal_energy(y)
-            * integral(y)
-        ), otypes=[numpy.float_]))(particle)
-
+        nodes = grid_nodes(particle.grid)
+        y = nodes.points
+        integral = numpy.interp(y, particle.grid.TEMPLATE, particle.collision_integral / particle.params.x)
+        return (-1. * particle.dof / 2. / numpy.pi**2
+                * numpy.dot(nodes.weights, y**2 * particle.conformal_energy(y) * integral))
 
+    @staticmethod
     def denominator(particle):
         """
         ### Denominator
@@ -131,9 +147,17 @@ if not environment.get('SIMPSONS_NONEQ_PARTICLES'):
         return 0.
 
 
+class Simpsons(object):
+
+    """ ## Momentum integrals by the Simpson's rule on the grid of the particle """
 
-else:
+    @staticmethod
+    def quadrature(particle):
+        """ Momenta and weights of the momentum integrals, distribution function on the momenta """
+        temp = particle.grid.TEMPLATE
+        return temp, simps(numpy.eye(len(temp)), temp), particle.distribution(temp)
 
+    @staticmethod
     def density(particle):
         temp = particle.grid.TEMPLATE
         return simps((
@@ -141,7 +165,7 @@ else:
             * particle.dof / 2. / numpy.pi**2 / particle.params.a**3), temp
         )
 
-
+    @staticmethod
     def energy_density(particle):
         """ ### Energy density
 
@@ -156,7 +180,7 @@ else:
             * particle.dof / 2. / numpy.pi**2 / particle.params.a**4), temp
         )
 
-
+    @staticmethod
     def pressure(particle):
         """ ### Pressure
 
@@ -176,7 +200,7 @@ else:
             * particle.dof / 6. / numpy.pi**2 / particle.params.a**4), temp
         )
 
-
+    @staticmethod
     def entropy(particle):
         """ ## Entropy
 
@@ -195,7 +219,7 @@ else:
 
         return simps(integrand, temp)
 
-
+    @staticmethod
     def numerator(particle):
         temp = particle.grid.TEMPLATE
         return simps((
@@ -204,7 +228,7 @@ else:
             * particle.collision_integral / particle.params.x), temp
         )
 
-
+    @staticmethod
     def denominator(particle):
         """
         ### Denominator
@@ -214,3 +238,96 @@ else:
         \end{equation}
         """
         return 0.
+
+
+def methods(particle):
+    """ Integration methods of the `SIMPSONS_NONEQ_PARTICLES` setting of the run of the particle """
+    return Simpsons if particle.params.config.SIMPSONS_NONEQ_PARTICLES else Interpolated
+
+
+def quadrature(particle):
+    """ Momenta and weights of the momentum integrals, distribution function on the momenta """
+    return methods(particle).quadrature(particle)
+
+
+def density(particle):
+    return methods(particle).density(particle)
+
+
+def energy_density(particle):
+    return methods(particle).energy_density(particle)
+
+
+def pressure(particle):
+    return methods(particle).pressure(particle)
+
+
+def entropy(particle):
+    return methods(particle).entropy(particle)
+
+
+def thermodynamics(particle):
+    """ Density, energy density, pressure and entropy """
+    integrals = methods(particle)
+    if hasattr(integrals, 'thermodynamics'):
+        return integrals.thermodynamics(particle)
+    return (integrals.density(particle), integrals.energy_density(particle),
+            integrals.pressure(particle), integrals.entropy(particle))
+
+
+def numerator(particle):
+    return methods(particle).numerator(particle)
+
+
+def denominator(particle):
+    return methods(particle).denominator(particle)
+
+
+def free_streaming_moments(particle):
+    """ ## Free streaming
+
+        Without collisions the comoving distribution function $f(y)$ does not change, only the\
+        conformal mass term $M a$ of the energy does. Comoving number and entropy densities and,\
+        for a massless species, the comoving energy density are computed once
+
+        \begin{equation}
+            n a^3 = \frac{g}{2 \pi^2} \int dy \, y^2 f(y), \qquad
+            \rho a^4 = \frac{g}{2 \pi^2} \int dy \, y^3 f(y)
+        \end{equation}
+
+        and the energy density and pressure of a massive species are single dot products with\
+        the cached weights $y^2 f(y)$.
+    """
+    y, weights, f = quadrature(particle)
+    w = weights * y**2 * particle.dof / 2. / numpy.pi**2
+
+    return {
+        'y': y,
+        'wf': w * f,
+        'density': numpy.dot(w, f),
+        'energy_density': numpy.dot(w, f * y),
+        'entropy': - numpy.dot(w, entropy_density(f, particle.eta))
+    }
+
+
+def free_streaming_thermodynamics(particle):
+    """ Density, energy density, pressure and entropy of a free-streaming species from its\
+        `free_streaming_moments` """
+    moments = particle.free_streaming_moments
+    a = particle.params.a
+
+    if particle.mass == 0:
+        energy_density = moments['energy_density']
+        pressure = energy_density / 3.
+    else:
+        y, wf = moments['y'], moments['wf']
+        E = particle.conformal_energy(y)
+        energy_density = numpy.dot(wf, E)
+        pressure = numpy.dot(wf, y**2 / E) / 3.
+
+    return (
+        moments['density'] / a**3,
+        energy_density / a**4,
+        pressure / a**4,
+        moments['entropy'] / a**3
+    )
@@ -9,13 +9,12 @@ from __future__ import division
 
 import numpy
 import os
-import environment
-from common import GRID, UNITS, kinematics, statistics as STATISTICS
+from common import GRID, UNITS, kinematics, utils, statistics as STATISTICS
 from common.integrators import (
-    adams_bashforth_correction, adams_moulton_solver, implicit_euler, backward_differentiation, heun_method,
+    adams_bashforth_correction, adams_moulton_solver, exponential_solver, extrapolation, implicit_euler, backward_differentiation, heun_method,
     MAX_ADAMS_BASHFORTH_ORDER, MAX_ADAMS_MOULTON_ORDER, MAX_BACKWARD_DIFF_ORDER
 )
-from common.utils import Dynamic2DArray, DynamicRecArray
+from common.utils import Dynamic2DArray, DynamicRecArray, Retention
 from scipy.integrate import simps
 from scipy.interpolate import interp1d
 from collections import Counter
@@ -58,6 +57,11 @@ class AbstractParticle:
         'thermal_dyn': True
     }
 
+    # Species takes part in no interaction: its comoving distribution function stays constant
+    free_streaming = False
+    # Comoving moments of the distribution function of the free-streaming species
+    free_streaming_moments = None
+
     def __init__(self, **kwargs):
 
         settings = dict(self._defaults)
@@ -72,21 +76,40 @@ class AbstractParticle:
         self.decayed= False
 
         self.collision_integrals = []
-        self.data = {
-            'distribution': Dynamic2DArray(self.grid.TEMPLATE),
-            'collision_integral': Dynamic2DArray(self.grid.TEMPLATE),
-            'params': DynamicRecArray([
-                ['a', '', 1],
-                ['t', 's', UNITS.s],
-                ['T', 'MeV', UNITS.MeV],
-                ['density', 'MeV^3', UNITS.MeV**3],
-                ['energy_density', 'MeV^4', UNITS.MeV**4]
-            ])
-        }
+        self.data = self.histories()
 
         if self.params:
             self.set_params(self.params)
 
+    # Columns of the history of the particle parameters
+    params_columns = [
+        ['a', '', 1],
+        ['t', 's', UNITS.s],
+        ['T', 'MeV', UNITS.MeV],
+        ['density', 'MeV^3', UNITS.MeV**3],
+        ['energy_density', 'MeV^4', UNITS.MeV**4]
+    ]
+
+    def histories(self, config=None):
+        """ Histories of the distribution function, collision integral and parameters under the\
+            retention policy of the run configuration (complete histories by default) """
+        retention = None
+        dtype = float
+        if config is not None:
+            if config.HISTORY_WINDOW:
+                # The multistep solvers and their error estimates read up to this many last rows
+                retention = Retention(max(config.HISTORY_WINDOW, MAX_ADAMS_MOULTON_ORDER + 1),
+                                      every=config.HISTORY_ARCHIVE_EVERY,
+                                      dlnT=config.HISTORY_ARCHIVE_DLNT)
+            if config.HISTORY_FLOAT32:
+                dtype = numpy.float32
+
+        return {
+            'distribution': Dynamic2DArray(self.grid.TEMPLATE, retention=retention, dtype=dtype),
+            'collision_integral': Dynamic2DArray(self.grid.TEMPLATE, retention=retention),
+            'params': DynamicRecArray(self.params_columns, retention=retention)
+        }
+
     def __str__(self):
         """ String-like representation of particle species it's regime and parameters """
         return "{} ({}, {})\nn = {:e} MeV^3, rho = {:e} MeV^4\n".format(
@@ -105,10 +128,23 @@ class AbstractParticle:
 
     def populate_methods(self):
         regime = self.regime
-        self.density = regime.density(self)
-        self.energy_density = regime.energy_density(self)
-        self.pressure = regime.pressure(self)
-        self.entropy = regime.entropy(self)
+        if self.free_streaming and regime is REGIMES.NONEQ:
+            if self.free_streaming_moments is None:
+                self.free_streaming_moments = regime.free_streaming_moments(self)
+            self.density, self.energy_density, self.pressure, self.entropy = \
+                regime.free_streaming_thermodynamics(self)
+            self.numerator = lambda: 0.
+            self.denominator = lambda: 0.
+            return
+
+        self.free_streaming_moments = None
+        if hasattr(regime, 'thermodynamics'):
+            self.density, self.energy_density, self.pressure, self.entropy = regime.thermodynamics(self)
+        else:
+            self.density = regime.density(self)
+            self.energy_density = regime.energy_density(self)
+            self.pressure = regime.pressure(self)
+            self.entropy = regime.entropy(self)
         self.numerator = lambda: regime.numerator(self)
         self.denominator = lambda: regime.denominator(self)
 
@@ -126,7 +162,7 @@ class AbstractParticle:
         `REGIMES.INTERMEDIATE`. When $T$ drops down even further to the value $ M / \gamma $,\
         particle species can be treated as `REGIMES.DUST` with a Boltzmann distribution function.
         """
-        regime_factor = environment.get('REGIME_SWITCHING_FACTOR')
+        regime_factor = self.params.config.REGIME_SWITCHING_FACTOR
 
         if not self.in_equilibrium:
             return REGIMES.NONEQ
@@ -187,6 +223,45 @@ class DistributionParticle(AbstractParticle):
         particle `decoupling_temperature`
     """
 
+    # Number of the distribution updates and the source term of the collision integral at the
+    # last step, used by the second order exponential time differencing
+    collision_source = None
+
+    # Loss coefficient $B$ of the collision integral $A + B f$ at the last evaluation
+    collision_loss = None
+
+    # Views into the contiguous `DistributionState` buffers of the `Universe` (if any)
+    state_views = None
+
+    def state_field(name):
+        """ Attribute that is stored in the state buffer view once the particle is bound to it:\
+            assigned arrays are copied into the view """
+        def getter(self):
+            try:
+                return self.__dict__[name]
+            except KeyError:
+                raise AttributeError(name)
+
+        def setter(self, value):
+            if self.state_views and name in self.state_views:
+                view = self.state_views[name]
+                if value is not view:
+                    view[...] = value
+            else:
+                self.__dict__[name] = value
+
+        return property(getter, setter)
+
+    _distribution = state_field('_distribution')
+    collision_integral = state_field('collision_integral')
+    del state_field
+
+    def bind_state(self, views):
+        """ Keep the distribution function and the collision integral in the given views """
+        self.state_views = views
+        for name, view in views.items():
+            self.__dict__[name] = view
+
     def set_params(self, params):
         """ Set internal parameters using arguments or default values """
         self.params = params
@@ -199,8 +274,9 @@ class DistributionParticle(AbstractParticle):
         if hasattr(self, 'fast_decay'):
             self.num_creation = 0
 
+        self.data = self.histories(params.config)
         self.init_distribution()
-        self.data['distribution'].append(self._distribution)
+        self.data['distribution'].append(self._distribution, T=params.T)
         self.populate_methods()
         self.update()
 
@@ -212,8 +288,9 @@ class DistributionParticle(AbstractParticle):
         """ Particle collision integral is not effective in the equilibrium as well """
         self.collision_integral = numpy.zeros(self.grid.MOMENTUM_SAMPLES, dtype=numpy.float_)
 
-    def update(self, force_print=False):
-        """ Update the particle parameters according to the new state of the system """
+    def update(self, force_print=False, record=True):
+        """ Update the particle parameters according to the new state of the system. Without\
+            `record` the state is not saved to the history """
         oldregime = self.regime
         self.oldeq = self.in_equilibrium
 
@@ -234,23 +311,24 @@ class DistributionParticle(AbstractParticle):
 
         self.populate_methods()
 
-        self.data['params'].append({
-            'a': self.params.a,
-            't': self.params.t,
-            'T': self.params.T,
-            'density': self.density,
-            'energy_density': self.energy_density
-        })
+        if record:
+            self.data['params'].append({
+                'a': self.params.a,
+                't': self.params.t,
+                'T': self.params.T,
+                'density': self.density,
+                'energy_density': self.energy_density
+            }, T=self.params.T)
 
         if self.regime != oldregime:
-            print("\n" + "\t"*2 + "{} changed regime at T = {:.2f} MeV from {} to {}\n"
-                  .format(self.name, self.T / UNITS.MeV, oldregime.name, self.regime.name)
-                  + "\t"*2 + "-"*72)
+            utils.log("\n" + "\t"*2 + "{} changed regime at T = {:.2f} MeV from {} to {}\n"
+                      .format(self.name, self.T / UNITS.MeV, oldregime.name, self.regime.name)
+                      + "\t"*2 + "-"*72)
 
         if self.in_equilibrium != self.oldeq:
-            print("\n" + "\t"*2 + "{} decoupled at T_dec = {:.2f} MeV \n"
-                  .format(self.name, self.decoupling_temperature / UNITS.MeV)
-                  + "\t"*2 + "-"*50)
+            utils.log("\n" + "\t"*2 + "{} decoupled at T_dec = {:.2f} MeV \n"
+                      .format(self.name, self.decoupling_temperature / UNITS.MeV)
+                      + "\t"*2 + "-"*50)
 
     def update_distribution(self):
         """ Apply collision integral to modify the distribution function """
@@ -277,14 +355,64 @@ class DistributionParticle(AbstractParticle):
         # assert all(self._distribution >= 0), self._distribution
         self._distribution = numpy.maximum(self._distribution, 0)
 
+        self.record_distribution()
+
+    def record_distribution(self):
+        """ Save the updated distribution function and the collision integral to the history """
         # Clear collision integrands for the next computation step
         self.collision_integrals = []
-        self.data['collision_integral'].append(self.collision_integral)
-        self.data['distribution'].append(self._distribution)
+        self.data['collision_integral'].append(self.collision_integral, T=self.params.T)
+        self.data['distribution'].append(self._distribution, T=self.params.T)
+
+    def distribution_error(self):
+        """ Relative local error estimate of the last distribution function update: deviation of\
+            the collision integral from its extrapolation from the previous steps """
+        history = self.data['collision_integral']
+        steps = self.params.steps
+        if self.in_equilibrium or hasattr(self, 'fast_decay') or len(history) < 3 or len(steps) < 2:
+            return 0.
+
+        # The last collision integral is one step (of the previous size) after the preceding ones
+        order = min(MAX_ADAMS_MOULTON_ORDER, len(history) - 1, len(steps))
+        fs = list(history[-order-1:-1])
+        deviation = numpy.abs(history[-1] - extrapolation(fs, steps[-1], hs=steps[:-1]))
+
+        scale = numpy.max(self._distribution)
+        if not scale > 0:
+            return 0.
+        return numpy.max(deviation) * self.params.h / scale
 
     def integrate_collisions(self):
         return self.calculate_collision_integral(self.grid.TEMPLATE)
 
+    # Dynamical attributes that have to be preserved to continue the evolution from a checkpoint
+    state_attributes = ('_distribution', 'collision_integral', 'old_distribution', 'aT', 'T',
+                        'oldeq', 't_decoupling', 'decoupling_temperature', 'decayed', 'num_creation',
+                        'collision_source')
+
+    def snapshot(self):
+        """ Dynamical state of the particle species: distribution function, histories of the\
+            distribution and collision integral used by the multistep solvers """
+        return {
+            'name': self.name,
+            'state': {key: getattr(self, key) for key in self.state_attributes
+                      if hasattr(self, key) and not (self.state_views and key in self.state_views)},
+            'data': self.data
+        }
+
+    def restore(self, snapshot):
+        """ Restore the dynamical state of the particle species saved by `snapshot` """
+        if snapshot['name'] != self.name:
+            raise ValueError("Snapshot of {} can't be restored into {}"
+                             .format(snapshot['name'], self.name))
+
+        for key, value in snapshot['state'].items():
+            setattr(self, key, value)
+        self.data = snapshot['data']
+        self.free_streaming_moments = None
+
+        self.populate_methods()
+
     def calculate_collision_integral(self, ps):
         """ ### Particle collisions integration """
 
@@ -298,45 +426,86 @@ class DistributionParticle(AbstractParticle):
             return kinematics.Icoll_fast_decay(self, ps)
 
         else:
-            Fs = []
-            ABs = []
-            Bs = []
+            results = [integral.integrate(ps, stepsize=self.params.h) for integral in self.collision_integrals]
+            return self.reduce_collision_integrals(ps, results)
+
+    def reduce_collision_integrals(self, ps, results):
+        """ Collision integral of the particle from the `results` of the individual\
+            `collision_integrals` """
+        ABs = []
+        Bs = []
+        losses = []
+
+        for integral, result in zip(self.collision_integrals, results):
+            if integral.kind in [CollisionIntegralKind.Full, CollisionIntegralKind.Full_vacuum_decay]:
+                C, B = result
+                ABs.append(C)
+                Bs.append(B)
+                losses.append(B)
+            elif integral.kind in [CollisionIntegralKind.F_f_vacuum_decay, CollisionIntegralKind.F_decay]:
+                Bs.append(result)
+                ABs.append(result)
+                losses.append(self.loss_coefficient(result))
+            else:
+                ABs.append(result)
+
+        AB = sum(ABs)
+        B = sum(Bs)
+        loss = sum(losses)
+
+        if self.params.config.STIFF_SOLVER:
+            # The external solver integrates the rates and uses the loss terms for its Jacobian
+            self.collision_loss = loss
+            return AB
+
+        solver = self.params.config.DISTRIBUTION_SOLVER
+        if solver in ('etd1', 'etd2'):
+            return self.exponential_collision_integral(ps, AB, loss, second_order=solver == 'etd2')
+
+        # Adams-Moulton method
+        fs = list(self.data['collision_integral'][-MAX_ADAMS_MOULTON_ORDER:])
+
+        I_coll = adams_moulton_solver(y=self.distribution(ps), fs=fs,
+                                      A=AB, B=B, h=self.params.h, hs=self.params.steps)
 
-            for integral in self.collision_integrals:
-                if integral.kind in [CollisionIntegralKind.Full, CollisionIntegralKind.Full_vacuum_decay]:
-                    C,B = integral.integrate(ps, stepsize=self.params.h)
-                    ABs.append(C)
-                    Bs.append(B)
-                elif integral.kind in [CollisionIntegralKind.F_f_vacuum_decay, CollisionIntegralKind.F_decay]:
-                    G = integral.integrate(ps, stepsize=self.params.h)
-                    Bs.append(G)
-                    ABs.append(G)
-                else:
-                    ABs.append(integral.integrate(ps, stepsize=self.params.h))
+        # # Backward differentiation method
+        # ys = list(self.data['distribution'][-MAX_BACKWARD_DIFF_ORDER:])
+        # I_coll = backward_differentiation(ys=ys, AB=AB, B=B, h=self.params.h)
 
-            AB = sum(ABs)
-            B = sum(Bs)
+        # # Heun method
+        # I_coll =  heun_method(Is=self.data['collision_integral'], AB=AB)
 
-            # Adams-Moulton method
-            fs = list(self.data['collision_integral'][-MAX_ADAMS_MOULTON_ORDER:])
+        # # Implicit Euler method
+        # I_coll = implicit_euler(AB=AB, B=B, h=self.params.h)
 
-            I_coll = adams_moulton_solver(y=self.distribution(ps), fs=fs,
-                                            A=AB, B=B, h=self.params.h)
+        # # Euler method
+        # I_coll = AB
 
-            # # Backward differentiation method
-            # ys = list(self.data['distribution'][-MAX_BACKWARD_DIFF_ORDER:])
-            # I_coll = backward_differentiation(ys=ys, AB=AB, B=B, h=self.params.h)
+        return I_coll
 
-            # # Heun method
-            # I_coll =  heun_method(Is=self.data['collision_integral'], AB=AB)
+    def loss_coefficient(self, rate):
+        """ Loss coefficient $B$ of the decay integral `rate` $= B f$: the decay integrals are\
+            already multiplied by the distribution function on the grid """
+        f = self._distribution
+        return numpy.divide(rate, f, out=numpy.zeros(len(f)), where=f > 0)
 
-            # # Implicit Euler method
-            # I_coll = implicit_euler(AB=AB, B=B, h=self.params.h)
+    def exponential_collision_integral(self, ps, AB, B, second_order=False):
+        """ Collision integral from the exponential time differencing of $f' = A + B f$, where\
+            `AB` is the total collision integral and `B` is the loss coefficient """
+        y = self.distribution(ps)
+        source = AB - B * y
 
-            # # Euler method
-            # I_coll = AB
+        # The source term of the previous step is only usable if no step has been skipped since
+        steps = self.data['collision_integral'].count
+        previous = None
+        if second_order and self.collision_source is not None:
+            source_steps, previous_source = self.collision_source
+            if source_steps + 1 == steps and len(previous_source) == len(source):
+                previous = previous_source
+        self.collision_source = (steps, source)
 
-            return I_coll
+        return exponential_solver(y=y, A=source, B=B, h=self.params.h, A_previous=previous,
+                                  h_previous=self.params.steps[-1] if self.params.steps else None)
 
     def distribution(self, p):
         """
@@ -0,0 +1,128 @@
+"""
+# Tabulated equilibrium thermodynamics
+
+Thermodynamical quantities of an equilibrium species with the mass $M$ at the temperature $T$ and\
+the terms of the temperature equation depend on $T$ only through the powers of $T$ and\
+dimensionless functions of $z = M / T$ and the statistics $f(\epsilon) = 1 / (e^\epsilon + \eta)$:
+
+\begin{align}
+    n &= \frac{g T^3}{2 \pi^2} \int_0^\infty dx \, x^2 f(\epsilon) &
+    \rho &= \frac{g T^4}{2 \pi^2} \int_0^\infty dx \, x^2 \epsilon f(\epsilon) &
+    P &= \frac{g T^4}{6 \pi^2} \int_0^\infty dx \, \frac{x^4}{\epsilon} f(\epsilon)
+\end{align}
+
+\begin{equation}
+    I(k) = \frac{g (aT)^{k+1}}{2 \pi^2} \int_0^\infty dx \, x^k \frac{e^\epsilon}{(e^\epsilon + \eta)^2}
+\end{equation}
+
+with $\epsilon = \sqrt{x^2 + z^2}$. Each function $F(z)$ is tabulated once per statistics on\
+`Z_MIN` $\le z \le$ `Z_MAX` as a cubic spline of $\ln \left(e^z F(z)\right)$ in $\ln z$: the\
+Boltzmann suppression is factored out, so the spline stays smooth from the relativistic to the\
+non-relativistic limit. Tables are built on the first use: the nodes are doubled until the spline\
+reproduces the exact values between the nodes within the `EQUILIBRIUM_TABLE_TOLERANCE`. Values of\
+$z$ outside of the table are integrated directly.
+"""
+import threading
+import numpy
+from scipy import integrate, interpolate
+
+
+# Range of $z = M / T$ covered by the tables
+Z_MIN = 1e-4
+Z_MAX = 1e4
+# Number of the spline nodes of the first approximation and the limit of the refinement
+INITIAL_NODES = 33
+MAX_NODES = 2**14 + 1
+
+
+def kernel(name, t, z, eta):
+    """ Integrand of the function `name` over $t = \\epsilon - z$ multiplied by $e^{z + t}$ """
+    epsilon = t + z
+    x = numpy.sqrt(t * (t + 2. * z))
+    occupation = 1. / (1. + eta * numpy.exp(-epsilon))
+
+    if name == 'density':
+        return x * epsilon * occupation
+    if name == 'energy_density':
+        return x * epsilon**2 * occupation
+    if name == 'pressure':
+        return x**3 * occupation
+    if name == 'I2':
+        return x * epsilon * occupation**2
+    if name == 'I4':
+        return x**3 * epsilon * occupation**2
+    raise KeyError("Unknown equilibrium function {}".format(name))
+
+
+def scaled_integral(name, z, eta):
+    """ $e^z F(z)$ of the function `name` computed by the adaptive quadrature """
+    return integrate.quad(lambda t: numpy.exp(-t) * kernel(name, t, z, eta), 0., numpy.inf,
+                          epsabs=0., epsrel=1e-12, limit=200)[0]
+
+
+class EquilibriumTable(object):
+
+    """ ## Spline of $\\ln \\left(e^z F(z)\\right)$ on the uniform grid of $\\ln z$ """
+
+    def __init__(self, name, eta, tolerance):
+        self.name = name
+        self.eta = eta
+
+        u = numpy.linspace(numpy.log(Z_MIN), numpy.log(Z_MAX), INITIAL_NODES)
+        values = self.exact(u)
+        self.error = numpy.inf
+        while self.error > tolerance and len(u) < MAX_NODES:
+            spline = interpolate.CubicSpline(u, values)
+            midpoints = (u[1:] + u[:-1]) / 2.
+            exact = self.exact(midpoints)
+            self.error = numpy.max(numpy.abs(numpy.expm1(spline(midpoints) - exact)))
+
+            # The error is estimated for the coarse spline, the refined one is kept in any case
+            u, values = self.interleave(u, midpoints), self.interleave(values, exact)
+
+        spline = interpolate.CubicSpline(u, values)
+        self.start = u[0]
+        self.step = u[1] - u[0]
+        self.coefficients = spline.c.T.tolist()
+
+    def exact(self, u):
+        return numpy.array([numpy.log(scaled_integral(self.name, z, self.eta))
+                            for z in numpy.exp(u)])
+
+    @staticmethod
+    def interleave(nodes, midpoints):
+        result = numpy.empty(len(nodes) + len(midpoints))
+        result[::2] = nodes
+        result[1::2] = midpoints
+        return result
+
+    def __len__(self):
+        return len(self.coefficients) + 1
+
+    def __call__(self, z):
+        """ $F(z)$ for `Z_MIN` $\\le z \\le$ `Z_MAX` """
+        position = (numpy.log(z) - self.start) / self.step
+        index = min(max(int(position), 0), len(self.coefficients) - 1)
+        d = (position - index) * self.step
+        c3, c2, c1, c0 = self.coefficients[index]
+        return numpy.exp(((c3 * d + c2) * d + c1) * d + c0 - z)
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def table(name, eta, tolerance):
+    """ Table of the function `name` for the statistics `eta`, built on the first request """
+    key = (name, eta, tolerance)
+    with _tables_lock:
+        if key not in _tables:
+            _tables[key] = EquilibriumTable(name, eta, tolerance)
+        return _tables[key]
+
+
+def lookup(name, z, eta, tolerance):
+    """ Value of the function `name` at $z = M / T$ for the statistics `eta` """
+    if Z_MIN <= z <= Z_MAX:
+        return table(name, eta, tolerance)(z)
+    return numpy.exp(-z) * scaled_integral(name, z, eta)
@@ -0,0 +1,156 @@
+"""
+# Distribution function interpolation
+
+Batched counterpart of the `distribution_interpolation` routine of the collision integral module.
+
+Momenta of the quadrature nodes do not change during the simulation, so positions of the nodes on\
+the particle grid (bracketing grid points) and the interpolation weights are computed once per grid\
+and reused for all thermodynamical integrals.
+"""
+from __future__ import division
+
+import weakref
+import threading
+import numpy
+from collections import OrderedDict
+
+from common.integrators import gauss_legendre
+
+
+class Nodes(object):
+
+    """ ## Fixed momenta on the particle momentum grid
+        Indices of the bracketing grid points of the `points` on the grid `template` """
+
+    # Number of distinct conformal masses with cached node energies
+    CACHE_SIZE = 8
+
+    def __init__(self, template, points):
+        self.points = points
+
+        last = len(template) - 1
+
+        index = numpy.searchsorted(template, self.points, side='right')
+        self.i_lo = numpy.clip(index - 1, 0, last)
+        self.i_hi = numpy.clip(index, 0, last)
+        # Nodes that coincide with the grid points do not need interpolation
+        exact = template[self.i_lo] == self.points
+        self.i_hi[exact] = self.i_lo[exact]
+        self.outside = self.points > template[last]
+
+        self.p_lo = template[self.i_lo]
+        self.p_hi = template[self.i_hi]
+
+        # Energies of the nodes for the latest conformal masses of the species sharing the grid.
+        # Conformal masses of the massive species change every step, so only a few are kept
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+    def energies(self, mass):
+        """ Conformal energies of the nodes, the relative positions of the nodes between the\
+            bracketing grid points in terms of energy and the energies of the upper grid points.\
+            The last `CACHE_SIZE` masses are cached; the cache is shared by the species and the runs\
+            in different threads """
+        with self.cache_lock:
+            energies = self.cache.pop(mass, None)
+            if energies is not None:
+                self.cache[mass] = energies
+                return energies
+
+        E = numpy.sqrt(self.points**2 + mass**2)
+        E_lo = numpy.sqrt(self.p_lo**2 + mass**2)
+        E_hi = numpy.sqrt(self.p_hi**2 + mass**2)
+
+        span = E_hi - E_lo
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            fraction = numpy.where(span > 0, (E - E_lo) / span, 0.)
+        energies = (E, fraction, E_hi)
+
+        with self.cache_lock:
+            self.cache[mass] = energies
+            while len(self.cache) > self.CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return energies
+
+
+class GridNodes(Nodes):
+
+    """ ## Quadrature nodes on the particle momentum grid
+        Gauss-Legendre nodes over `grid.BOUNDS` along with the quadrature weights """
+
+    def __init__(self, grid):
+        a, b = grid.BOUNDS
+        super(GridNodes, self).__init__(grid.TEMPLATE, (b - a) / 2. * gauss_legendre.points + (b + a) / 2.)
+        self.weights = (b - a) / 2. * gauss_legendre.weights
+
+
+_nodes = weakref.WeakKeyDictionary()
+
+
+def grid_nodes(grid):
+    """ Cached quadrature nodes for the `grid` """
+    nodes = _nodes.get(grid)
+    if nodes is None or len(nodes.points) != len(gauss_legendre.points):
+        nodes = GridNodes(grid)
+        _nodes[grid] = nodes
+    return nodes
+
+
+def exponential_interpolation(nodes, distribution, mass, eta, aT):
+    """ ## Exponential interpolation on all quadrature nodes at once
+
+        Linear interpolation of $\ln (1/f - \eta)$ in energy gives exact values for the\
+        equilibrium distribution functions. Above the grid the distribution is extrapolated\
+        by the Boltzmann tail $f(E) = f_{max} e^{(E_{max} - E) / aT}$.
+    """
+    E, fraction, E_hi = nodes.energies(mass)
+
+    f_lo = distribution[nodes.i_lo]
+    f_hi = distribution[nodes.i_hi]
+
+    with numpy.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        g_lo = numpy.log(1. / f_lo - eta)
+        g_hi = numpy.log(1. / f_hi - eta)
+        f = 1. / (numpy.exp(fraction * g_hi + (1. - fraction) * g_lo) + eta)
+
+    f[~numpy.isfinite(g_lo) | ~numpy.isfinite(g_hi) | ~numpy.isfinite(f)] = 0.
+
+    if nodes.outside.any():
+        f[nodes.outside] = (distribution[-1]
+                            * numpy.exp((E_hi[nodes.outside] - E[nodes.outside]) / aT))
+
+    return f
+
+
+def exponential_interpolation_derivatives(nodes, distribution, mass, eta, aT):
+    """ Derivatives of the `exponential_interpolation` on the nodes in the values of the\
+        distribution function at the lower and the upper bracketing grid points:
+
+        \begin{equation}
+            \frac{\partial f}{\partial f_{lo}} = (1 - x) \frac{f (1 - \eta f)}{f_{lo} (1 - \eta f_{lo})},\
+            \qquad \frac{\partial f}{\partial f_{hi}} = x \frac{f (1 - \eta f)}{f_{hi} (1 - \eta f_{hi})}
+        \end{equation}
+
+        where $x$ is the relative position of the node between the grid points in energy. Above\
+        the grid only the last grid point contributes.
+    """
+    _, fraction, _ = nodes.energies(mass)
+    f = exponential_interpolation(nodes, distribution, mass, eta, aT)
+
+    f_lo = distribution[nodes.i_lo]
+    f_hi = distribution[nodes.i_hi]
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        slope = f * (1. - eta * f)
+        d_lo = (1. - fraction) * slope / (f_lo * (1. - eta * f_lo))
+        d_hi = fraction * slope / (f_hi * (1. - eta * f_hi))
+
+    for d in (d_lo, d_hi):
+        d[~numpy.isfinite(d) | (f == 0.)] = 0.
+
+    if nodes.outside.any():
+        d_hi[nodes.outside] = 0.
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            d_lo[nodes.outside] = numpy.nan_to_num(f[nodes.outside] / distribution[-1])
+
+    return d_lo, d_hi
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+# Distribution functions state
+
+Distribution functions and collision integrals of all particle species of the `Universe` are\
+kept in two contiguous buffers. Species with different grids are laid out one after another\
+(ragged rows of the species $\times$ momentum array): the row of a species is the slice\
+`offsets[i]:offsets[i+1]` of the buffer. Particles hold views into their rows, so per-species code\
+keeps working on `particle._distribution` while updates, clipping and finiteness checks of all\
+species take a single NumPy call and the whole state is available as a flat vector.
+"""
+import numpy
+
+
+class DistributionState(object):
+
+    """ ## Contiguous buffers of the distribution functions and collision integrals """
+
+    def __init__(self, particles, distribution=None, collision_integral=None):
+        """ :param distribution, collision_integral: Preallocated buffers of the `size` (e.g. rows\
+            of the ensemble arrays) """
+        self.particles = list(particles)
+        self.offsets = numpy.cumsum([0] + self.sizes(self.particles))
+
+        self.distribution = numpy.zeros(self.offsets[-1]) if distribution is None else distribution
+        self.collision_integral = (numpy.zeros(self.offsets[-1]) if collision_integral is None
+                                   else collision_integral)
+
+        for index, particle in enumerate(self.particles):
+            rows = self.row(index)
+            self.distribution[rows] = particle._distribution
+            self.collision_integral[rows] = particle.collision_integral
+            particle.bind_state({
+                '_distribution': self.distribution[rows],
+                'collision_integral': self.collision_integral[rows]
+            })
+
+    @staticmethod
+    def sizes(particles):
+        return [particle.grid.MOMENTUM_SAMPLES for particle in particles]
+
+    @property
+    def size(self):
+        return self.offsets[-1]
+
+    def __len__(self):
+        return len(self.particles)
+
+    def row(self, index):
+        return slice(self.offsets[index], self.offsets[index + 1])
+
+    def mask(self, particles):
+        """ Boolean mask of the buffer entries of the given `particles` """
+        mask = numpy.zeros(self.offsets[-1], dtype=bool)
+        for index, particle in enumerate(self.particles):
+            if any(particle is other for other in particles):
+                mask[self.row(index)] = True
+        return mask
+
+    def rows(self, vector=None):
+        """ Views of the rows of the `vector` (the distribution functions by default) """
+        if vector is None:
+            vector = self.distribution
+        return [vector[self.row(index)] for index in range(len(self))]
+
+    def prepare_update(self):
+        """ Update the fast-decaying species and return the species whose collision integrals are\
+            applied to the buffer """
+        regular = []
+        for particle in self.particles:
+            if particle.in_equilibrium:
+                continue
+            if hasattr(particle, 'fast_decay'):
+                particle.update_distribution()
+            else:
+                particle.old_distribution = particle._distribution.copy()
+                regular.append(particle)
+        return regular
+
+    def update_mask(self, regular):
+        """ Mask of the entries of the `regular` species changed by the collision integrals.\
+            Free-streaming species keep their comoving distribution functions, so the moments\
+            cached for their thermodynamics stay valid """
+        return self.mask([particle for particle in regular if not particle.free_streaming])
+
+    def update_distributions(self, h):
+        """ Apply the collision integrals of the non-equilibrium species over the step `h` """
+        regular = self.prepare_update()
+        apply_collision_integrals(self.distribution, self.collision_integral, self.update_mask(regular), h)
+
+        for particle in regular:
+            particle.record_distribution()
+
+    def snapshot(self):
+        """ Both buffers as they are: pickling them does not need any per-species copies """
+        return {'distribution': self.distribution, 'collision_integral': self.collision_integral}
+
+    def restore(self, snapshot):
+        self.distribution[:] = snapshot['distribution']
+        self.collision_integral[:] = snapshot['collision_integral']
+
+
+def apply_collision_integrals(distribution, collision_integral, mask, h):
+    """ Make the step `h` for the `mask`ed entries of the buffers (of any shape, `h` is broadcast\
+        over their leading axes) """
+    collision_integral[mask & numpy.isnan(collision_integral)] = 0.
+    assert numpy.all(numpy.isfinite(collision_integral[mask]))
+
+    numpy.add(distribution, collision_integral * h, out=distribution, where=mask)
+    numpy.maximum(distribution, 0., out=distribution, where=mask)
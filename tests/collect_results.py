@@ -1,8 +1,61 @@
+"""
+## Results collector
+
+Finds the last `Observables:` line of the KAWANO output in every subfolder of a test output\
+folder (optionally filtered by a regular expression and the modification time).
+
+    python tests/collect_results.py --test tests/heavy_sterile_dirac_neutrino/output
+"""
+
 import os
 import re
 import time
 import argparse
 
+
+def observables(datafile):
+    """ The last `Observables:` line of the `datafile` or `None` """
+    data = None
+    try:
+        with open(datafile) as f:
+            for line in f:
+                if 'Observables:' in line:
+                    data = line.rstrip('\n')
+    except IOError:
+        pass
+    return data
+
+
+def collect(test, regexp=r'.+', filename='kawano_output.dat', modified=None):
+    """ List of `(observables, folder)` pairs of all subfolders of `test` that match `regexp`.\
+        If `modified` is given, only the files modified during the last `modified` seconds are\
+        considered """
+    regex = re.compile(regexp)
+
+    if modified:
+        # Time in seconds since epoch for time, in which logfile can be unmodified.
+        modified_since = time.time() - float(modified)
+
+    results = []
+
+    for dirpath, dirnames, files in os.walk(test):
+        for folder in sorted(dirnames):
+            if not regex.search(folder):
+                continue
+
+            datafile = os.path.join(dirpath, folder, filename)
+            if not os.path.exists(datafile):
+                continue
+            if modified and os.stat(datafile).st_mtime < modified_since:
+                continue
+
+            data = observables(datafile)
+            if data:
+                results.append((data, os.path.join(dirpath, folder)))
+
+    return results
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Automatic test results collector')
     parser.add_argument('--test', required=True)
@@ -11,33 +64,8 @@ if __name__ == '__main__':
     parser.add_argument('--file', default='kawano_output.dat')
     args = parser.parse_args()
 
-    regex = re.compile(args.regexp)
-
-    if args.modified:
-        # Time in seconds since epoch for time, in which logfile can be unmodified.
-        modified_since = time.time() - float(args.modified)
-
-    observables = []
-
-    for dirpath, dirnames, files in os.walk(args.test):
-        for folder in dirnames:
-            if regex.search(folder):
-                datafile = os.path.join(dirpath, folder, args.file)
-                data = None
-                try:
-                    with open(datafile) as f:
-                        if args.modified:
-                            modified = os.stat(datafile).st_mtime
-                            if modified < modified_since:
-                                continue
-
-                        for line in reversed(f.readlines()):
-                            if 'Observables:' in line:
-                                data = line.rstrip('\n')
-
-                    if data:
-                        observables.append("{}\t{}".format(data, os.path.join(dirpath, folder)))
-                except Exception, e:
-                    print(e)
-
-    print("\n".join(observables))
+    print("\n".join(
+        "{}\t{}".format(data, folder)
+        for data, folder in collect(args.test, regexp=args.regexp, filename=args.file,
+                                    modified=args.modified)
+    ))
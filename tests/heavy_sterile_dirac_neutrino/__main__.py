@@ -14,6 +14,7 @@ http://arxiv.org/pdf/hep-ph/0002223v2.pdf
 """
 
 import os
+import sys
 
 import argparse
 from collections import defaultdict
@@ -22,13 +23,25 @@ from particles import Particle
 from library.SM import particles as SMP, interactions as SMI
 from library.NuMSM import particles as NuP, interactions as NuI
 from evolution import Universe
-from common import UNITS, Params
+from common import UNITS, Params, kinematics
+from background_cache import BackgroundCache, temperature_ladder
 
 
 parser = argparse.ArgumentParser(description='Run simulation for given mass and mixing angle')
 parser.add_argument('--mass', default='33.9')
 parser.add_argument('--tau', default='0.3')
 parser.add_argument('--comment', default='')
+parser.add_argument('--folder', default=None,
+                    help='Output folder (default: `output/<tau>` next to the script)')
+parser.add_argument('--resume', action='store_true',
+                    help='Continue from the last checkpoint in the output folder')
+parser.add_argument('--background', default=None,
+                    help='Folder of the cached Standard Model background to start from')
+parser.add_argument('--build-background', action='store_true',
+                    help='Only compute the Standard Model background into `--background`')
+parser.add_argument('--injection', default=None,
+                    help='Temperature in MeV from which the sterile neutrino is evolved'
+                         ' (default: decoupling temperature of the sterile neutrino)')
 args = parser.parse_args()
 
 mass = float(args.mass) * UNITS.MeV
@@ -39,15 +52,20 @@ T_dec = 50 * UNITS.MeV
 print('theta=', theta, ' Tdec=', T_dec / UNITS.MeV)
 
 
-folder = os.path.join(os.path.split(__file__)[0], "output", args.tau)
+folder = args.folder or os.path.join(os.path.split(__file__)[0], "output", args.tau)
 
 T_initial = T_dec
+# Sterile neutrinos are injected at the last background snapshot above their decoupling
+T_injection = (float(args.injection) * UNITS.MeV if args.injection
+               else min(T_initial, kinematics.decoupling_temperature(mass, theta)))
 T_washout = 0.1 * UNITS.MeV
 T_final = 0.0008 * UNITS.MeV
 params = Params(T=T_initial,
-                dy=0.003125 * 4)
+                dy=0.003125 * 4,
+                relativistic_decoupling=kinematics.relativistic_decoupling(mass, theta))
 
-universe = Universe(params=params, folder=folder)
+universe = Universe(params=params, folder=None if args.build_background else folder,
+                    resume=args.resume)
 
 photon = Particle(**SMP.photon)
 electron = Particle(**SMP.leptons.electron)
@@ -62,8 +80,6 @@ neutrino_mu = Particle(**SMP.leptons.neutrino_mu, grid=active_grid)
 neutrino_tau = Particle(**SMP.leptons.neutrino_tau, grid=active_grid)
 sterile = Particle(**NuP.dirac_sterile_neutrino(mass), grid=sterile_grid)
 
-sterile.decoupling_temperature = T_initial
-
 universe.add_particles([
     photon,
     electron,
@@ -71,26 +87,42 @@ universe.add_particles([
     neutrino_e,
     neutrino_mu,
     neutrino_tau,
-    sterile,
 ])
 
+universe.interactions += (
+    SMI.neutrino_interactions(
+        leptons=[electron],
+        neutrinos=[neutrino_e, neutrino_mu, neutrino_tau]
+    )
+)
+
+universe.init_kawano(electron=electron, neutrino=neutrino_e)
+
+# Standard Model background is shared by all points of a scan: it is computed once down to the
+# end of the first stage and the points start from the nearest snapshot above `T_injection`
+if args.build_background:
+    BackgroundCache(args.background).build(universe, temperature_ladder(T_initial, 5 * UNITS.MeV, 8))
+    sys.exit(0)
+
+warm_start = None
+if args.background and not args.resume:
+    warm_start = BackgroundCache(args.background).warm_start(universe, T_injection)
+
+sterile.decoupling_temperature = universe.params.T
+universe.add_particles([sterile])
+
 thetas = defaultdict(float, {
     'tau': theta,
 })
 
 universe.interactions += (
-    SMI.neutrino_interactions(
-        leptons=[electron],
-        neutrinos=[neutrino_e, neutrino_mu, neutrino_tau]
-    ) + NuI.sterile_leptons_interactions(
+    NuI.sterile_leptons_interactions(
         thetas=thetas, sterile=sterile,
         neutrinos=[neutrino_e, neutrino_mu, neutrino_tau],
         leptons=[electron, muon]
     )
 )
 
-universe.init_kawano(electron=electron, neutrino=neutrino_e)
-
 
 def step_monitor(universe):
     # explanation of what is inside the file
@@ -119,7 +151,10 @@ def step_monitor(universe):
 
 universe.step_monitor = step_monitor
 
-universe.evolve(5 * UNITS.MeV, export=False)
+if args.resume:
+    universe.resume()
+
+universe.evolve(5 * UNITS.MeV, export=False, init_time=warm_start is None)
 universe.params.dy = 0.003125
 universe.params.infer()
 
@@ -0,0 +1,151 @@
+"""
+## Linearised collision integrals
+
+Builds the linear expansion of the neutrino collision integrals of the\
+[[Standard Model BBN|standard_model_bbn]] setup below the neutrino decoupling\
+(`LINEARIZED_COLLISIONS` setting), perturbs the neutrino distribution functions by half of the\
+`LINEARIZED_DEVIATION_TOLERANCE` and compares the expansion with the tabulated integration of the\
+perturbed state on the same lattice. Reports the time taken to build the expansion and to apply\
+it against the time of the tabulated integration. Both parts $C$ and $B$ of every registered\
+integral are compared.
+
+Then evolves the same setup down to `T_FINAL` with the linearized integrals and with the default\
+adaptive integration, and reports the time of both runs, the number of rebuilds of the expansions\
+and the difference of the resulting neutrino distribution functions. The conformal mass of the\
+electrons drifts fastest around 1 MeV, where the expansions are rebuilt most often.
+
+    python -m tests.linearized_collisions
+
+The order of the lattice is the `TABULATED_KERNEL_ORDER` of the run configuration.
+"""
+
+import time
+import numpy
+
+import environment
+from particles import Particle
+from evolution import Universe
+from library.SM import particles as SMP, interactions as SMI
+from common import UNITS, Params, LinearSpacedGrid
+
+
+T_FINAL = 1. * UNITS.MeV
+# Minimal speedup of the evolution with the linearized integrals
+SPEEDUP = 3.
+
+
+def setup(**settings):
+    config = environment.Configuration(**settings)
+    params = Params(T=3. * UNITS.MeV,
+                    dy=0.003125,
+                    config=config)
+
+    photon = Particle(**SMP.photon)
+    electron = Particle(**SMP.leptons.electron)
+
+    linear_grid = LinearSpacedGrid(MOMENTUM_SAMPLES=51, MAX_MOMENTUM=50*UNITS.MeV)
+    neutrino_e = Particle(**SMP.leptons.neutrino_e, grid=linear_grid)
+    neutrino_mu = Particle(**SMP.leptons.neutrino_mu, grid=linear_grid)
+    neutrino_mu.dof = 4
+
+    neutrino_e.decoupling_temperature = 5. * UNITS.MeV
+    neutrino_mu.decoupling_temperature = 5. * UNITS.MeV
+
+    universe = Universe(params=params)
+    universe.add_particles([photon, electron, neutrino_e, neutrino_mu])
+    universe.interactions += SMI.neutrino_interactions(leptons=[electron],
+                                                       neutrinos=[neutrino_e, neutrino_mu])
+
+    params.init_time(universe.total_energy_density())
+    params.update(universe.total_energy_density(), universe.total_entropy())
+    universe.update_particles()
+    universe.init_interactions()
+
+    neutrinos = [neutrino_e, neutrino_mu]
+    assert all(particle.collision_integrals for particle in neutrinos), \
+        "Neutrinos are not decoupled at the initial temperature"
+    return universe, neutrinos
+
+
+universe, neutrinos = setup()
+params = universe.params
+
+
+def collision_integrals(linearized):
+    params.config = params.config.replace(LINEARIZED_COLLISIONS=linearized,
+                                          TABULATED_COLLISION_KERNELS=not linearized)
+
+    results = {}
+    for particle in neutrinos:
+        for integral in particle.collision_integrals:
+            integral.creaction = None
+        start = time.time()
+        integrals = [integral.integrate(particle.grid.TEMPLATE) for integral in particle.collision_integrals]
+        results[particle.name] = (numpy.array(integrals), time.time() - start)
+    return results
+
+
+built = collision_integrals(linearized=True)
+
+deviation = params.config.LINEARIZED_DEVIATION_TOLERANCE / 2.
+for particle in neutrinos:
+    particle._distribution *= 1. + deviation * numpy.sin(particle.grid.TEMPLATE / UNITS.MeV)
+
+linearized = collision_integrals(linearized=True)
+exact = collision_integrals(linearized=False)
+
+print("Lattice order: {}, deviation: {:.1e}"
+      .format(params.config.TABULATED_KERNEL_ORDER, deviation))
+for name in exact:
+    I_exact, t_exact = exact[name]
+    I_linearized, t_linearized = linearized[name]
+    I_reference, t_built = built[name]
+
+    scale = numpy.abs(I_exact).max()
+    assert scale > 0, "{} collision integrals vanish".format(name)
+    difference = numpy.abs(I_linearized - I_exact).max() / scale
+    change = numpy.abs(I_exact - I_reference).max() / scale
+
+    print("{:20} max relative difference: {:.2e} (perturbation: {:.2e})\tbuild: {:.2f} s\t"
+          "apply: {:.4f} s\tdirect: {:.2f} s"
+          .format(name, difference, change, t_built, t_linearized, t_exact))
+
+    # The expansion error is of the second order in the deviation
+    assert difference < 1e-2 * change, "Linearized integrals differ from the direct ones"
+    assert t_linearized < t_exact, "Linearized integrals are slower than the direct ones"
+
+
+def evolve(linearized):
+    universe, neutrinos = setup(LINEARIZED_COLLISIONS=linearized)
+    integrals = [integral for particle in neutrinos for integral in particle.collision_integrals]
+
+    # Expansions used at the previous step and the number of the new ones
+    state = {'expansions': [None] * len(integrals), 'built': 0, 'steps': 0}
+
+    def monitor(universe):
+        current = [integral.linearization for integral in integrals]
+        state['built'] += sum(expansion is not None and expansion is not previous
+                              for expansion, previous in zip(current, state['expansions']))
+        state['expansions'] = current
+        state['steps'] += 1
+
+    universe.step_monitor = monitor
+    start = time.time()
+    universe.evolve(T_FINAL, export=False)
+    # The first step builds every expansion
+    return neutrinos, time.time() - start, len(integrals), state['built'] - len(integrals), state['steps']
+
+
+linearized_neutrinos, t_linearized, count, rebuilds, steps = evolve(linearized=True)
+direct_neutrinos, t_direct, _, _, _ = evolve(linearized=False)
+
+difference = max(numpy.abs(f._distribution - g._distribution).max() / numpy.abs(g._distribution).max()
+                 for f, g in zip(linearized_neutrinos, direct_neutrinos))
+print("Evolution to {:.1f} MeV in {} steps: linearized {:.2f} s ({} rebuilds of {} expansions), "
+      "direct {:.2f} s, speedup: {:.1f}, max relative difference of the distribution functions: {:.2e}"
+      .format(T_FINAL / UNITS.MeV, steps, t_linearized, rebuilds, count,
+              t_direct, t_direct / t_linearized, difference))
+
+assert t_linearized * SPEEDUP < t_direct, "Linearized evolution is not faster than the direct one"
+assert difference < params.config.LINEARIZED_DEVIATION_TOLERANCE, \
+    "Linearized evolution departs from the direct one"
@@ -0,0 +1,188 @@
+"""
+## Parameter scan
+
+Runs a test script for every point of a parameter grid on the local machine. Points are\
+independent simulations, each one runs in a separate Python process, `--workers` of them at a\
+time. The available cores are split between the workers through `OMP_NUM_THREADS` and\
+`COLLISION_THREADS` (the collision pool of a point never gets more threads than its share).
+
+The script must accept the scanned parameters, `--folder` (output folder of the point) and\
+`--resume` (continue from the last checkpoint) command line arguments:
+
+    PYTHONPATH=. python tests/scan.py tests/heavy_sterile_dirac_neutrino \\
+        --grid mass=33.9,50,100 --grid tau=0.1,0.3,1 --workers 8
+
+With `--background FOLDER` the script is first run once with `--build-background` to compute the\
+Standard Model background shared by all points (see `background_cache.py`), then every point\
+gets `--background FOLDER` to start from it (and `--injection T` in MeV if given: the points\
+start from the last snapshot of the background above it).
+
+Points that already have the KAWANO (or reaction network) observables are skipped, so an interrupted scan is continued\
+by running the same command again. Failed points are restarted from their checkpoints up to\
+`--retries` times. Observables of all points are collected into `observables.txt` in the scan\
+output folder.
+"""
+
+import os
+import sys
+import argparse
+import itertools
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import environment
+from evolution import Universe
+from background_cache import BackgroundCache
+from tests.collect_results import observables
+
+
+def parse_grid(items):
+    """ Parameter grid from the `name=value1,value2,...` items """
+    grid = OrderedDict()
+    for item in items:
+        name, values = item.split('=', 1)
+        grid[name] = values.split(',')
+    return grid
+
+
+def points(grid):
+    """ All combinations of the parameter values """
+    return [OrderedDict(zip(grid.keys(), values)) for values in itertools.product(*grid.values())]
+
+
+def point_folder(output, point):
+    return os.path.join(output, "-".join("{}_{}".format(name, value) for name, value in point.items()))
+
+
+def point_observables(folder):
+    """ Observables of the KAWANO run of the point or of the built-in reaction network """
+    for filename in ['kawano_output.dat', 'network_output.dat']:
+        data = observables(os.path.join(folder, filename))
+        if data:
+            return data
+
+
+def script_environment(threads):
+    """ Environment of a point limited to its `threads` share of the cores """
+    env = dict(os.environ, OMP_NUM_THREADS=str(threads),
+               COLLISION_THREADS=str(max(1, min(environment.get('COLLISION_THREADS'), threads))))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    return env
+
+
+def build_background(script, background, point, threads):
+    """ Compute the Standard Model background of the scan unless it is already cached """
+    if BackgroundCache(background).temperatures():
+        return True
+
+    command = [sys.executable, script, '--background', background, '--build-background']
+    for name, value in point.items():
+        command += ['--' + name, value]
+
+    os.makedirs(background, exist_ok=True)
+    with open(os.path.join(background, 'build.log'), 'a') as log:
+        log.write("# {}\n".format(" ".join(command)))
+        log.flush()
+        return subprocess.call(command, stdout=log, stderr=subprocess.STDOUT,
+                               env=script_environment(threads)) == 0
+
+
+def run_point(script, folder, point, threads, retries, background=None, injection=None):
+    """ Run the `script` for the parameter `point` until it succeeds or runs out of `retries`.\
+        Returns `True` on success """
+    os.makedirs(folder, exist_ok=True)
+
+    env = script_environment(threads)
+
+    for attempt in range(retries + 1):
+        command = [sys.executable, script, '--folder', folder]
+        for name, value in point.items():
+            command += ['--' + name, value]
+        if background:
+            command += ['--background', background]
+            if injection:
+                command += ['--injection', injection]
+        if os.path.exists(os.path.join(folder, Universe.checkpoint_name)):
+            command.append('--resume')
+
+        # The log is kept next to the folder: a fresh run clears the output folder
+        with open(folder + '.log', 'a') as log:
+            log.write("# {}\n".format(" ".join(command)))
+            log.flush()
+            code = subprocess.call(command, stdout=log, stderr=subprocess.STDOUT, env=env)
+
+        if code == 0 and point_observables(folder):
+            return True
+
+    return False
+
+
+def scan(script, grid, output, workers=1, threads=None, retries=1, background=None, injection=None):
+    """ Run the `script` for all points of the `grid` that are not finished yet, starting them\
+        from the cached Standard Model `background` folder (at the `injection` temperature) if\
+        given. Returns the list of `(point, folder, observables)` of all points """
+    if os.path.isdir(script):
+        script = os.path.join(script, '__main__.py')
+
+    if threads is None:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+
+    everything = [(point, point_folder(output, point)) for point in points(grid)]
+    pending = [(point, folder) for point, folder in everything if not point_observables(folder)]
+
+    print("{} points, {} done, {} workers with {} threads each"
+          .format(len(everything), len(everything) - len(pending), workers, threads))
+
+    if background and pending:
+        if not build_background(script, background, pending[0][0], threads * workers):
+            raise RuntimeError("Standard Model background was not computed, see {}"
+                               .format(os.path.join(background, 'build.log')))
+
+    with ThreadPoolExecutor(workers) as pool:
+        futures = {
+            pool.submit(run_point, script, folder, point, threads, retries, background, injection): folder
+            for point, folder in pending
+        }
+        for future, folder in futures.items():
+            print("{}\t{}".format("done" if future.result() else "FAILED", folder))
+
+    return [(point, folder, point_observables(folder)) for point, folder in everything]
+
+
+def write_table(results, path):
+    """ Table of the observables of the finished points """
+    with open(path, 'w') as f:
+        for point, folder, data in results:
+            if data:
+                values = data.split('Observables:', 1)[1].split()
+                f.write("\t".join(list(point.values()) + values + [folder]) + "\n")
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a test script over a grid of parameters')
+    parser.add_argument('script', help='Test script or folder with the `__main__.py`')
+    parser.add_argument('--grid', action='append', required=True,
+                        help='Scanned parameter and its values: `name=value1,value2,...`')
+    parser.add_argument('--output', default=None,
+                        help='Output folder of the scan (default: `scan` next to the script)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of simultaneous points')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='OpenMP and collision pool threads per point (default: cores divided between workers)')
+    parser.add_argument('--retries', type=int, default=1, help='Restarts of a failed point')
+    parser.add_argument('--background', default=None,
+                        help='Folder of the Standard Model background shared by the points')
+    parser.add_argument('--injection', default=None,
+                        help='Temperature in MeV at which the points leave the background'
+                             ' (default: chosen by the script)')
+    args = parser.parse_args()
+
+    folder = args.script if os.path.isdir(args.script) else os.path.dirname(args.script)
+    output = args.output or os.path.join(folder, 'scan')
+
+    results = scan(args.script, parse_grid(args.grid), output,
+                   workers=args.workers, threads=args.threads, retries=args.retries,
+                   background=args.background, injection=args.injection)
+    print(write_table(results, os.path.join(output, 'observables.txt')))
@@ -1,7 +1,11 @@
-from common import Params
+import numpy
+from collections import defaultdict
+from common import Params, UNITS, LinearSpacedGrid
 from evolution import Universe
 from particles import Particle
+from interactions.four_particle.cpp.integral import CollisionIntegralKind
 from library.SM import (particles as SMP, interactions as SMI)
+from library.NuMSM import (particles as NuP, interactions as NuI)
 
 
 eps = 1e-5
@@ -29,6 +33,72 @@ def non_equilibium_setup():
     return [params, universe], {}
 
 
+def collisions_universe(T=2 * UNITS.MeV, config=None):
+    """ Neutrinos below their decoupling temperature with distorted distribution functions\
+        on a small grid, so that the collision integrals do not vanish """
+    params = Params(T=T, dy=0.025)
+    if config is not None:
+        params.config = config
+    grid = LinearSpacedGrid(MOMENTUM_SAMPLES=11, MAX_MOMENTUM=20 * UNITS.MeV)
+
+    photon = Particle(**SMP.photon)
+    electron = Particle(**SMP.leptons.electron)
+    neutrino_e = Particle(grid=grid, **SMP.leptons.neutrino_e)
+    neutrino_mu = Particle(grid=grid, **SMP.leptons.neutrino_mu)
+
+    universe = Universe(params=params)
+    universe.add_particles([photon, electron, neutrino_e, neutrino_mu])
+    universe.interactions += SMI.neutrino_interactions(leptons=[electron],
+                                                       neutrinos=[neutrino_e, neutrino_mu])
+
+    params.update(universe.total_energy_density(), universe.total_entropy())
+    for neutrino in [neutrino_e, neutrino_mu]:
+        neutrino._distribution *= 1 + 0.1 * numpy.sin(grid.TEMPLATE / UNITS.MeV)
+
+    universe.update_particles()
+    universe.init_interactions()
+
+    return universe
+
+
+def decay_universe(config=None, theta=3e-2):
+    """ Heavy sterile neutrino whose vacuum decays into the electron neutrinos are its only\
+        collision integrals. The decay is much faster than the expansion, so it is stiff """
+    args, _ = setup()
+    params = args[0]
+    if config is not None:
+        params.config = config
+
+    photon = Particle(**SMP.photon)
+    neutrino_e = Particle(**SMP.leptons.neutrino_e)
+    sterile = Particle(**NuP.dirac_sterile_neutrino(mass=200 * UNITS.MeV))
+
+    interactions = NuI.sterile_leptons_interactions(
+        thetas=defaultdict(float, {'electron': theta}), sterile=sterile,
+        neutrinos=[neutrino_e],
+        leptons=[],
+        kind=CollisionIntegralKind.F_f_vacuum_decay
+    )
+    for interaction in interactions:
+        interaction.integrals = [integral for integral in interaction.integrals
+                                 if sum(reactant.side for reactant in integral.reaction) in [2]]
+
+    universe = Universe(params=params)
+    universe.add_particles([photon, neutrino_e, sterile])
+    universe.interactions += interactions
+
+    params.update(universe.total_energy_density(), universe.total_entropy())
+    universe.update_particles()
+    universe.init_interactions()
+
+    return universe, sterile
+
+
+def collisions_setup():
+    universe = collisions_universe()
+    return [universe.params, universe], {}
+
+
 def with_setup_args(setup, teardown=None):
     """Decorator to add setup and/or teardown methods to a test function::
 
@@ -0,0 +1,48 @@
+import shutil
+import tempfile
+from common import Params, UNITS
+from evolution import Universe
+from particles import Particle
+from library.SM import particles as SMP
+from background_cache import BackgroundCache
+
+
+def standard_model():
+    universe = Universe(params=Params(T=5 * UNITS.MeV, dy=0.05))
+    universe.add_particles([Particle(**SMP.photon), Particle(**SMP.leptons.electron),
+                            Particle(**SMP.leptons.neutrino_e)])
+    return universe
+
+
+def warm_start_test():
+    """ Run started from the cached background continues it exactly """
+    folder = tempfile.mkdtemp()
+    cache = BackgroundCache(folder)
+    cache.build(standard_model(), [4 * UNITS.MeV, 2 * UNITS.MeV, 1 * UNITS.MeV])
+    assert len(cache.temperatures()) == 3
+
+    reference = standard_model()
+    for T in [4., 2., 0.5]:
+        reference.evolve(T * UNITS.MeV, export=False, init_time=(T == 4.))
+
+    universe = standard_model()
+    T = cache.warm_start(universe, 1.5 * UNITS.MeV)
+    assert abs(T / UNITS.MeV - 2.) < 0.1, "Nearest snapshot above 1.5 MeV is at 2 MeV"
+    universe.evolve(0.5 * UNITS.MeV, export=False, init_time=False)
+
+    assert universe.step == reference.step
+    assert universe.params.aT == reference.params.aT
+    assert universe.params.t == reference.params.t
+    assert len(universe.data) == len(reference.data)
+
+    extended = standard_model()
+    extended.params.relativistic_decoupling = True
+    cache.warm_start(extended, 1.5 * UNITS.MeV)
+    assert extended.params.relativistic_decoupling, "Flag of the run is replaced by the background"
+    extended.add_particles([Particle(**SMP.leptons.neutrino_mu)])
+    extended.evolve(0.5 * UNITS.MeV, export=False, init_time=False)
+    assert extended.params.N_eff > reference.params.N_eff + 0.9
+
+    assert cache.warm_start(standard_model(), 10 * UNITS.MeV) is None
+
+    shutil.rmtree(folder)
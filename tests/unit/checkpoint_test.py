@@ -0,0 +1,39 @@
+import numpy
+import shutil
+import tempfile
+from common import Params
+from evolution import Universe
+from particles import Particle
+from library.SM import particles as SMP
+
+from . import setup, with_setup_args
+
+
+@with_setup_args(setup)
+def checkpoint_resume_test(params):
+    folder = tempfile.mkdtemp()
+
+    universe = Universe(params=params, folder=folder)
+    neutrino_e = Particle(**SMP.leptons.neutrino_e)
+    universe.add_particles([Particle(**SMP.photon), neutrino_e])
+    universe.params.update(universe.total_energy_density(), universe.total_entropy())
+
+    neutrino_e._distribution *= 1.1
+    neutrino_e.data['distribution'].append(neutrino_e._distribution)
+    universe.save_params()
+    universe.step = 42
+    universe.stage = 2
+    universe.checkpoint()
+
+    resumed = Universe(params=Params(T=params.T, dy=params.dy), folder=folder, resume=True)
+    resumed_neutrino_e = Particle(**SMP.leptons.neutrino_e)
+    resumed.add_particles([Particle(**SMP.photon), resumed_neutrino_e])
+
+    assert resumed.resume(), "Checkpoint was not found"
+    assert resumed.step == 42 and resumed.resume_stage == 2
+    assert resumed.params.aT == universe.params.aT
+    assert len(resumed.data) == len(universe.data)
+    assert numpy.allclose(resumed_neutrino_e._distribution, neutrino_e._distribution)
+    assert len(resumed_neutrino_e.data['distribution']) == len(neutrino_e.data['distribution'])
+
+    shutil.rmtree(folder)
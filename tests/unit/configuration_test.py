@@ -0,0 +1,82 @@
+import os
+import pickle
+import environment
+from common import Params, UNITS
+from particles import Particle, REGIMES, NonEqParticle
+from library.SM import particles as SMP
+
+
+def parse_test():
+    """ Boolean settings given as strings in the process environment """
+    for value in ['', '0', 'False', 'false', 'no']:
+        assert environment.parse('LOGARITHMIC_TIMESTEP', value) is False, value
+    for value in ['1', 'True', 'yes']:
+        assert environment.parse('LOGARITHMIC_TIMESTEP', value) is True, value
+    assert environment.parse('MOMENTUM_SAMPLES', '51') == 51
+    assert environment.parse('HNL_ENERGY', '1.5') == '1.5'
+
+
+def process_environment_test():
+    os.environ['REGIME_SWITCHING_FACTOR'] = '10'
+    try:
+        config = environment.Configuration()
+    finally:
+        del os.environ['REGIME_SWITCHING_FACTOR']
+
+    assert config.REGIME_SWITCHING_FACTOR == 10.
+    assert environment.Configuration().REGIME_SWITCHING_FACTOR == \
+        environment.defaults['REGIME_SWITCHING_FACTOR']
+
+
+def immutability_test():
+    config = environment.Configuration(MOMENTUM_SAMPLES=51)
+
+    try:
+        config.MOMENTUM_SAMPLES = 101
+        assert False, "Configuration was changed in place"
+    except AttributeError:
+        pass
+
+    try:
+        environment.Configuration(MOMENTUM_SAMPLE=101)
+        assert False, "Unknown setting was accepted"
+    except KeyError:
+        pass
+
+    changed = config.replace(MOMENTUM_SAMPLES=101)
+    assert config.MOMENTUM_SAMPLES == 51 and changed.MOMENTUM_SAMPLES == 101
+
+    restored = pickle.loads(pickle.dumps(changed))
+    assert restored.MOMENTUM_SAMPLES == 101
+    assert restored.LOGARITHMIC_TIMESTEP == changed.LOGARITHMIC_TIMESTEP
+
+
+def independent_universes_test():
+    """ Particles of two runs in one process follow the settings of their own runs """
+    T = SMP.leptons.electron['mass'] * 20
+    default = Params(T=T, dy=0.025)
+    switched = Params(T=T, dy=0.025,
+                      config=environment.Configuration(REGIME_SWITCHING_FACTOR=10))
+
+    electron = Particle(params=default, **SMP.leptons.electron)
+    electron_switched = Particle(params=switched, **SMP.leptons.electron)
+
+    assert electron.regime == REGIMES.INTERMEDIATE
+    assert electron_switched.regime == REGIMES.RADIATION
+
+    linear = Params(T=T, dx=1e-2 * UNITS.MeV,
+                    config=environment.Configuration(LOGARITHMIC_TIMESTEP=False))
+    assert linear.h == linear.dx and default.h == default.dy
+
+
+def non_equilibrium_integrals_test():
+    """ Momentum integrals of the non-equilibrium species follow the settings of their own runs """
+    T = SMP.leptons.neutrino_e['decoupling_temperature'] / 2
+    simpsons = Particle(params=Params(T=T, dy=0.025), **SMP.leptons.neutrino_e)
+    interpolated = Particle(params=Params(T=T, dy=0.025, config=environment.Configuration(
+        SIMPSONS_NONEQ_PARTICLES=False)), **SMP.leptons.neutrino_e)
+
+    assert simpsons.regime == interpolated.regime == REGIMES.NONEQ
+    assert NonEqParticle.methods(simpsons) is NonEqParticle.Simpsons
+    assert NonEqParticle.methods(interpolated) is NonEqParticle.Interpolated
+    assert abs(interpolated.density / simpsons.density - 1) < 1e-3
@@ -0,0 +1,100 @@
+import numpy
+import pickle
+import environment
+from . import collisions_universe
+from common import Params, UNITS
+from ensemble import EnsembleUniverse
+from evolution import Universe
+from particles import Particle
+from library.SM import particles as SMP
+
+
+def universe(T, config=None):
+    params = Params(T=T * UNITS.MeV, dy=0.05)
+    if config is not None:
+        params.config = config
+    universe = Universe(params=params)
+    universe.add_particles([Particle(**SMP.photon), Particle(**SMP.leptons.electron),
+                            Particle(**SMP.leptons.neutrino_e)])
+    return universe
+
+
+def assert_identical(ensemble, standalone):
+    """ Members of the ensemble are bit for bit the same as the standalone universes """
+    assert numpy.array_equal(ensemble.values('aT'), [member.params.aT for member in standalone])
+    for member, reference in zip(ensemble.universes, standalone):
+        assert member.step == reference.step
+        assert len(member.data) == len(reference.data)
+        assert numpy.array_equal(member.data['aT'], reference.data['aT'])
+        for particle, other in zip(member.particles, reference.particles):
+            assert numpy.array_equal(particle._distribution, other._distribution)
+
+
+def lockstep_test():
+    """ Members of the ensemble evolve exactly as standalone universes """
+    temperatures = [10., 8., 12.]
+
+    standalone = [universe(T) for T in temperatures]
+    for member in standalone:
+        member.evolve(0.05 * UNITS.MeV, export=False)
+
+    ensemble = EnsembleUniverse([universe(T) for T in temperatures])
+    ensemble.evolve(0.05 * UNITS.MeV, export=False)
+
+    assert_identical(ensemble, standalone)
+
+
+def fast_forward_test():
+    """ Members fast-forward through the equilibrium windows the same as standalone universes """
+    temperatures = [10., 8., 12.]
+    config = environment.Configuration(EQUILIBRIUM_FAST_FORWARD=True)
+
+    standalone = [universe(T, config) for T in temperatures]
+    for member in standalone:
+        member.evolve(0.05 * UNITS.MeV, export=False)
+    regular = universe(temperatures[0])
+    regular.evolve(0.05 * UNITS.MeV, export=False)
+    assert standalone[0].step < regular.step, "No equilibrium window is fast-forwarded"
+
+    ensemble = EnsembleUniverse([universe(T, config) for T in temperatures])
+    ensemble.evolve(0.05 * UNITS.MeV, export=False)
+
+    assert_identical(ensemble, standalone)
+
+
+def resume_test():
+    """ Members restored from the snapshots of standalone universes resume their stage """
+    temperatures = [10., 8.]
+
+    standalone = [universe(T) for T in temperatures]
+    snapshots = []
+    for member in standalone:
+        member.evolve(2 * UNITS.MeV, export=False)
+        snapshots.append(pickle.loads(pickle.dumps(member.snapshot())))
+        member.evolve(0.05 * UNITS.MeV, export=False)
+
+    members = [universe(T) for T in temperatures]
+    for member, snapshot in zip(members, snapshots):
+        member.restore(snapshot)
+
+    ensemble = EnsembleUniverse(members)
+    ensemble.evolve(2 * UNITS.MeV, export=False)
+    ensemble.evolve(0.05 * UNITS.MeV, export=False)
+
+    assert_identical(ensemble, standalone)
+
+
+def scheduled_collisions_test():
+    """ Members with interactions evolve as standalone universes when the collision integrals of\
+        all members share the queue of the scheduler """
+    temperatures = [2., 1.8]
+    config = environment.Configuration(COLLISION_THREADS=4, COLLISION_CHUNK_SIZE=3)
+
+    standalone = [collisions_universe(T * UNITS.MeV) for T in temperatures]
+    for member in standalone:
+        member.evolve(1.5 * UNITS.MeV, export=False)
+
+    ensemble = EnsembleUniverse([collisions_universe(T * UNITS.MeV, config) for T in temperatures])
+    ensemble.evolve(1.5 * UNITS.MeV, export=False)
+
+    assert_identical(ensemble, standalone)
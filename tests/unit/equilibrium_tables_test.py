@@ -0,0 +1,37 @@
+import numpy
+import environment
+from common import Params
+from particles import Particle, IntermediateParticle, equilibrium_tables
+from library.SM import particles as SMP
+
+
+def relativistic_limit_test():
+    """ Tables reproduce the massless Fermi-Dirac and Bose-Einstein integrals """
+    tolerance = environment.defaults['EQUILIBRIUM_TABLE_TOLERANCE']
+    zeta_3 = 1.2020569031595942
+
+    for eta, density, energy_density in [(1., 3. / 2. * zeta_3, 7. * numpy.pi**4 / 120.),
+                                         (-1., 2. * zeta_3, numpy.pi**4 / 15.)]:
+        z = equilibrium_tables.Z_MIN
+        assert abs(equilibrium_tables.lookup('density', z, eta, tolerance) / density - 1) < 1e-6
+        assert abs(equilibrium_tables.lookup('energy_density', z, eta, tolerance)
+                   / energy_density - 1) < 1e-6
+        assert abs(equilibrium_tables.lookup('pressure', z, eta, tolerance)
+                   / energy_density - 1) < 1e-6
+
+
+def intermediate_regime_test():
+    """ Tabulated thermodynamics of the intermediate regime agree with the quadratures """
+    values = []
+    for tabulated in [False, True]:
+        config = environment.Configuration(TABULATED_EQUILIBRIUM_THERMODYNAMICS=tabulated)
+        params = Params(T=SMP.leptons.electron['mass'], dy=0.025, config=config)
+        electron = Particle(params=params, **SMP.leptons.electron)
+        electron.update()
+
+        values.append(numpy.array(list(IntermediateParticle.thermodynamics(electron))
+                                  + [IntermediateParticle.Int(electron, 2),
+                                     IntermediateParticle.Int(electron, 4)]))
+
+    integrated, tabulated = values
+    assert numpy.allclose(tabulated, integrated, rtol=1e-4, atol=0)
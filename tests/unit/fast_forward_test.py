@@ -0,0 +1,57 @@
+import numpy
+import environment
+from common import Params, UNITS
+from evolution import Universe
+from particles import Particle
+from library.SM import particles as SMP
+
+
+def evolve(fast_forward, particles):
+    config = environment.Configuration(EQUILIBRIUM_FAST_FORWARD=fast_forward)
+    universe = Universe(params=Params(T=20 * UNITS.MeV, dy=0.025, config=config))
+    universe.add_particles([Particle(**particle) for particle in particles])
+    universe.evolve(0.05 * UNITS.MeV, export=False)
+    return universe
+
+
+def equilibrium_window_test():
+    """ Photon heating by the electron-positron annihilation in a few large steps. $aT$ at\
+        $T = 0.05$ MeV from the entropy conservation is $1.3985$ MeV """
+    universe = evolve(True, [SMP.photon, SMP.leptons.electron])
+
+    assert abs(universe.params.aT / UNITS.MeV - 1.3985) < 1e-3
+    assert universe.step < 50
+
+
+def free_streaming_window_test():
+    """ Decoupled neutrinos without interactions stream freely and do not stop the fast-forward """
+    universe = evolve(True, [SMP.photon, SMP.leptons.electron, SMP.leptons.neutrino_e])
+    neutrino, = [particle for particle in universe.particles
+                 if particle.name == SMP.leptons.neutrino_e['name']]
+
+    assert neutrino.free_streaming
+    assert abs(universe.params.aT / UNITS.MeV - 1.3985) < 1e-3
+    assert universe.step < 60
+
+    radiation = 7. / 8. * neutrino.dof * numpy.pi**2 / 30. * neutrino.aT**4
+    assert abs(neutrino.free_streaming_moments['energy_density'] - radiation) / radiation < 1e-3
+
+
+def free_streaming_collisions_test():
+    """ Collision integrals are not applied to the free-streaming species, so the moments cached\
+        for their thermodynamics stay valid """
+    config = environment.Configuration(EQUILIBRIUM_FAST_FORWARD=False)
+    universe = Universe(params=Params(T=2 * UNITS.MeV, dy=0.025, config=config))
+    universe.add_particles([Particle(**SMP.photon), Particle(**SMP.leptons.neutrino_e)])
+    neutrino, = [particle for particle in universe.particles
+                 if particle.name == SMP.leptons.neutrino_e['name']]
+
+    universe.params.update(universe.total_energy_density(), universe.total_entropy())
+    universe.update_particles()
+    assert neutrino.free_streaming
+
+    distribution = neutrino._distribution.copy()
+    neutrino.collision_integral = distribution
+    universe.update_distributions()
+
+    assert numpy.array_equal(neutrino._distribution, distribution)
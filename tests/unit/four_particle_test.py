@@ -0,0 +1,194 @@
+import numpy
+import environment
+from . import collisions_setup, collisions_universe, with_setup_args
+from common import UNITS
+from interactions.four_particle import tables, linearized
+from interactions.four_particle.cpp.integral import (
+    integration, integration_split, integration_split_fixed, CollisionIntegralKind
+)
+
+
+def kernel_arguments(integral):
+    """ Dimensionless momenta, integration bounds and C++ reaction of the `integral` """
+    params = integral.particle.params
+    bounds = (
+        integral.grids[0].MIN_MOMENTUM / params.aT,
+        integral.grids[0].MAX_MOMENTUM / params.aT,
+        integral.grids[1].MIN_MOMENTUM / params.aT,
+        integral.grids[1].MAX_MOMENTUM / params.aT,
+        integral.reaction[3].specie.grid.MAX_MOMENTUM / params.aT
+    )
+    integral.integrate(integral.particle.grid.TEMPLATE)
+    return integral.particle.grid.TEMPLATE / params.aT, bounds, integral.creaction, integral.cMs
+
+
+@with_setup_args(collisions_setup)
+def split_integration_test(params, universe):
+    """ $F_1$ and $F_f$ parts integrated in one pass are the same as the separate integrals """
+    neutrino_e, = [particle for particle in universe.particles if particle.name == 'Electron neutrino']
+    assert neutrino_e.collision_integrals, "No collision integrals below the decoupling"
+
+    stepsize = 1e-3
+    for integral in neutrino_e.collision_integrals:
+        ps, bounds, creaction, cMs = kernel_arguments(integral)
+
+        A, B = integration_split(ps, *bounds, creaction, cMs, stepsize)
+        F_1 = integration(ps, *bounds, creaction, cMs, stepsize, CollisionIntegralKind.F_1)
+        F_f = integration(ps, *bounds, creaction, cMs, stepsize, CollisionIntegralKind.F_f)
+
+        assert numpy.any(F_1 != 0) and numpy.any(F_f != 0)
+        assert numpy.allclose(A, F_1, rtol=1e-2, atol=1e-2 * numpy.abs(F_1).max())
+        assert numpy.allclose(B, F_f, rtol=1e-2, atol=1e-2 * numpy.abs(F_f).max())
+
+
+@with_setup_args(collisions_setup)
+def gauss_legendre_order_test(params, universe):
+    """ Fixed-order engine uses the order of the run configuration """
+    neutrino_e, = [particle for particle in universe.particles if particle.name == 'Electron neutrino']
+    params.config = params.config.replace(FOUR_PARTICLE_QUADRATURE='gauss_legendre', FOUR_PARTICLE_GAUSS_ORDER=20)
+    nodes, weights = numpy.polynomial.legendre.leggauss(20)
+    kinds = [CollisionIntegralKind.F_1, CollisionIntegralKind.F_f]
+
+    for integral in neutrino_e.collision_integrals:
+        ps, bounds, creaction, cMs = kernel_arguments(integral)
+        direct = integration_split_fixed(ps, *bounds, creaction, cMs, nodes, weights)
+        for value, reference in zip(integral.integrate_kernels(ps, bounds, None, kinds), direct):
+            assert numpy.array_equal(value, reference)
+
+
+@with_setup_args(collisions_setup)
+def tabulated_kernels_test(params, universe):
+    """ Collision integrals from the tabulated kernels are the same as the direct integration\
+        on the same Gauss-Legendre lattice and close to the adaptive integration """
+    neutrino_e, = [particle for particle in universe.particles if particle.name == 'Electron neutrino']
+    grid = neutrino_e.grid.TEMPLATE
+    adaptive = [numpy.array(integral.integrate(grid)) for integral in neutrino_e.collision_integrals]
+
+    params.config = params.config.replace(TABULATED_COLLISION_KERNELS=True)
+    nodes, weights = numpy.polynomial.legendre.leggauss(params.config.TABULATED_KERNEL_ORDER)
+    kinds = [CollisionIntegralKind.F_1, CollisionIntegralKind.F_f]
+
+    for integral, reference in zip(neutrino_e.collision_integrals, adaptive):
+        ps, bounds, creaction, cMs = kernel_arguments(integral)
+
+        direct = integration_split_fixed(ps, *bounds, creaction, cMs, nodes, weights)
+        for tabulated, value in zip(tables.integrate(integral, ps, kinds), direct):
+            assert numpy.allclose(tabulated, value, rtol=1e-6, atol=1e-9 * numpy.abs(value).max())
+
+        result = numpy.array(integral.integrate(grid))
+        assert numpy.allclose(result, reference, rtol=1e-2, atol=1e-2 * numpy.abs(reference).max())
+
+
+@with_setup_args(collisions_setup)
+def tabulated_jacobians_test(params, universe):
+    """ Jacobians from the kernel table are the derivatives of the tabulated integrals """
+    neutrino_e, = [particle for particle in universe.particles if particle.name == 'Electron neutrino']
+    kinds = [CollisionIntegralKind.F_1, CollisionIntegralKind.F_f]
+
+    for integral in neutrino_e.collision_integrals:
+        ps, _, _, _ = kernel_arguments(integral)
+        table = tables.KernelTable(integral, tables.grid_momenta(integral, ps, params.aT))
+        species = linearized.unique_species(integral)
+        jacobians = table.jacobians(integral.reaction, kinds, params.aT, species)
+        values = table.integrate(integral.reaction, kinds, params.aT)
+
+        for specie, jacobian in zip(species, jacobians):
+            assert numpy.any(jacobian != 0)
+            for j in range(0, len(specie._distribution), 3):
+                # Central differences are exact for the polynomial kernels up to the roundoff
+                f = specie._distribution[j]
+                step = f * 1e-4
+                specie._distribution[j] = f + step
+                forward = table.integrate(integral.reaction, kinds, params.aT)
+                specie._distribution[j] = f - step
+                backward = table.integrate(integral.reaction, kinds, params.aT)
+                specie._distribution[j] = f
+
+                for k, (value, value0) in enumerate(zip(forward, backward)):
+                    derivative = (value - value0) / (2 * step)
+                    roundoff = 1e-13 * numpy.abs(values[k]).max() / step
+                    assert numpy.allclose(jacobian[k, :, j], derivative, rtol=1e-6, atol=roundoff)
+
+
+@with_setup_args(collisions_setup)
+def finite_difference_jacobians_test(params, universe):
+    """ Finite differences of the linear expansion without a kernel table agree with the tabulated\
+        Jacobians down to the smallest values of the distribution functions """
+    neutrino_e, = [particle for particle in universe.particles if particle.name == 'Electron neutrino']
+    integral = neutrino_e.collision_integrals[0]
+    ps, bounds, _, _ = kernel_arguments(integral)
+    kinds = [CollisionIntegralKind.F_1, CollisionIntegralKind.F_f]
+
+    tabulated = linearized.Linearization(integral, ps, bounds, kinds)
+    params.config = params.config.replace(COLLISION_KERNEL_CACHE_MB=0)
+    differences = linearized.Linearization(integral, ps, bounds, kinds)
+    assert tabulated.table is not None and differences.table is None
+
+    for specie, table, difference in zip(tabulated.species, tabulated.jacobians, differences.jacobians):
+        assert specie._distribution.min() < 1e-8 * specie._distribution.max()
+        scale = numpy.abs(table).max(axis=(0, 1))
+        assert numpy.all(numpy.abs(difference - table).max(axis=(0, 1)) < 1e-3 * scale)
+
+
+@with_setup_args(collisions_setup)
+def linearization_test(params, universe):
+    """ Linear expansion reproduces the reference integrals, follows small deviations of the\
+        distribution functions and of the conformal masses and is invalidated by large ones """
+    neutrino_e, = [particle for particle in universe.particles if particle.name == 'Electron neutrino']
+    integral = next(integral for integral in neutrino_e.collision_integrals
+                    if any(item.specie.name == 'Electron' for item in integral.reaction))
+    ps, bounds, _, _ = kernel_arguments(integral)
+    kinds = [CollisionIntegralKind.F_1, CollisionIntegralKind.F_f]
+
+    def direct():
+        return linearized.evaluate(integral, ps, bounds, kinds,
+                                   [specie._distribution for specie in linearization.species])
+
+    linearization = linearized.Linearization(integral, ps, bounds, kinds)
+    assert linearization.valid(integral, ps, bounds)
+    references = direct()
+    for value, reference in zip(linearization(integral), references):
+        assert numpy.allclose(value, reference, rtol=1e-9, atol=1e-12 * numpy.abs(reference).max())
+
+    tolerance = params.config.LINEARIZED_DEVIATION_TOLERANCE
+    neutrino_e._distribution *= 1 + tolerance / 2. * numpy.cos(neutrino_e.grid.TEMPLATE / UNITS.MeV)
+    assert linearization.valid(integral, ps, bounds)
+
+    exact = direct()
+    for value, reference, expected in zip(linearization(integral), references, exact):
+        change = numpy.abs(expected - reference).max()
+        assert change > 0
+        assert numpy.abs(value - expected).max() < 1e-2 * change
+
+    # Conformal mass of the electrons grows with the scale factor
+    params.a *= 1.02
+    assert linearization.valid(integral, ps, bounds)
+
+    for value, reference, expected in zip(linearization(integral), exact, direct()):
+        change = numpy.abs(expected - reference).max()
+        assert change > 0
+        assert numpy.abs(value - expected).max() < 5e-2 * change
+
+    neutrino_e._distribution *= 1 + 2 * tolerance
+    assert not linearization.valid(integral, ps, bounds)
+
+
+def tabulated_kernels_reuse_test():
+    """ Tables survive the drift of the conformal mass of the electrons over several steps """
+    config = environment.Configuration(TABULATED_COLLISION_KERNELS=True)
+    universe = collisions_universe(config=config)
+    params = universe.params
+    params.set_step(0.003125)
+
+    neutrino_e, = [particle for particle in universe.particles if particle.name == 'Electron neutrino']
+    universe.make_step()
+    built = [tables.get_table(integral, neutrino_e.grid.TEMPLATE) for integral in neutrino_e.collision_integrals]
+    a = params.a
+
+    for _ in range(5):
+        universe.make_step()
+
+    # Conformal masses grow by more than a percent
+    assert params.a / a - 1 > 1e-2
+    for integral, table in zip(neutrino_e.collision_integrals, built):
+        assert tables.get_table(integral, neutrino_e.grid.TEMPLATE) is table
@@ -0,0 +1,55 @@
+import numpy
+import environment
+from common import Params, UNITS, utils
+from evolution import Universe
+from particles import Particle
+from library.SM import particles as SMP
+
+
+def retention_test():
+    """ Bounded history keeps the initial rows, the archived rows and the last window in order """
+    history = utils.Dynamic2DArray([0.], retention=utils.Retention(4, head=2, every=10))
+    for i in range(100):
+        history.append([i])
+
+    assert history.count == 100
+    assert list(history[:, 0]) == [0, 1, 10, 20, 30, 40, 50, 60, 70, 80, 90, 96, 97, 98, 99]
+    assert history.nbytes < 30 * 8 + 30
+
+
+def temperature_archive_test():
+    """ Rows are archived each time the temperature drops by the factor $e^{dlnT}$ """
+    history = utils.DynamicRecArray([['T', 'MeV', UNITS.MeV]],
+                                    retention=utils.Retention(3, head=1, dlnT=0.99 * numpy.log(2.)))
+    for T in numpy.geomspace(64., 1., 61):
+        history.append({'T': T}, T=T)
+
+    # Rows that left the window are dropped in batches, a few extra rows are kept in between
+    assert numpy.allclose(history['T'][:6], [64., 32., 16., 8., 4., 2.])
+    assert numpy.allclose(history['T'][-3:], numpy.geomspace(64., 1., 61)[-3:])
+    assert len(history) < 6 + 2 * 3
+
+
+def evolve(**settings):
+    config = environment.Configuration(**settings)
+    universe = Universe(params=Params(T=10 * UNITS.MeV, dy=0.025, config=config))
+    universe.add_particles([Particle(**SMP.photon), Particle(**SMP.leptons.electron),
+                            Particle(**SMP.leptons.neutrino_e)])
+    universe.evolve(1 * UNITS.MeV, export=False)
+    return universe
+
+
+def bounded_evolution_test():
+    """ Evolution with the bounded histories is the same as with the complete ones """
+    complete = evolve()
+    bounded = evolve(HISTORY_WINDOW=8, HISTORY_ARCHIVE_EVERY=20, HISTORY_FLOAT32=True)
+
+    assert bounded.params.aT == complete.params.aT
+    for particle, reference in zip(bounded.particles, complete.particles):
+        assert numpy.array_equal(particle._distribution, reference._distribution)
+        for name, history in particle.data.items():
+            # Initial rows, archived rows and at most twice the window
+            assert history.count == reference.data[name].count
+            assert len(history) <= 2 + history.count // 20 + 1 + 2 * 8
+
+    assert bounded.memory_report()['Total'] < complete.memory_report()['Total'] / 2
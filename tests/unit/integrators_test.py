@@ -118,6 +118,61 @@ def heun_test():
 #         "Heun method should be more accurate"
 
 
+def variable_step_adams_test():
+    """ Variable step multistep coefficients reduce to the tabulated ones on a uniform grid and\
+        keep the order of the method when the step changes """
+    for order in range(1, integrators.MAX_ADAMS_BASHFORTH_ORDER + 1):
+        bs, divider = integrators.ADAMS_BASHFORTH_COEFFICIENTS[order]
+        assert numpy.allclose(integrators.multistep_coefficients(numpy.arange(1. - order, 1.)),
+                              numpy.array(bs) / divider)
+
+    def solve(variable):
+        t, y, h = 0., 0., 0.01
+        fs, hs = [], []
+        while t < 3:
+            fs.append(numpy.cos(t))
+            y += integrators.adams_bashforth_correction(fs[-4:], h, hs=hs if variable else None)
+            t += h
+            hs.append(h)
+            h = 0.015 if len(hs) % 2 else 0.01
+        return abs(y - numpy.sin(t))
+
+    assert solve(variable=True) < 1e-5
+    assert solve(variable=True) < solve(variable=False) / 100, \
+        "Coefficients should be rescaled with the step size"
+
+    assert numpy.isclose(integrators.extrapolation([1., 4., 9.], 1.), 16.)
+    assert numpy.isclose(integrators.extrapolation([1., 9., 16.], 1., hs=[2., 1.]), 25.)
+
+
+def exponential_solver_test():
+    """ Exponential time differencing is exact for a constant source and stays accurate for a stiff\
+        decay with the step far beyond the stability limit of the explicit methods """
+    A, B, h = 3., -1e3, 0.05
+
+    y = 1.
+    for _ in range(10):
+        y += h * integrators.exponential_solver(y, A, B, h)
+    assert numpy.isclose(y, -A / B + (1. + A / B) * numpy.exp(B * h * 10))
+
+    def solve(second_order):
+        t, y, A_previous = 0., 0., None
+        while t < 2.:
+            A = numpy.sin(t)
+            y += h * integrators.exponential_solver(y, A, B, h, A_previous=A_previous)
+            if second_order:
+                A_previous = A
+            t += h
+        # Slowly varying quasi-stationary solution
+        return abs(y - (-numpy.sin(t) / B + numpy.cos(t) / B**2))
+
+    assert solve(second_order=True) < solve(second_order=False) / 5
+    assert solve(second_order=True) < 1e-5
+
+    phi_1, phi_2 = integrators.phi_functions(numpy.array([-1e-5, 1e-5, -2.]))
+    assert numpy.allclose(phi_1, [1. - 5e-6, 1. + 5e-6, (1. - numpy.exp(-2.)) / 2.])
+    assert numpy.allclose(phi_2, [.5, .5, (numpy.exp(-2.) + 1.) / 4.])
+
 
 def gaussian_test():
     func = lambda z: special.jn(3, z)
@@ -4,7 +4,8 @@ from nose.tools import eq_
 from common import UNITS
 from particles import Particle
 from library.SM import particles as SMP
-from interactions.four_particle.cpp.integral import binary_find
+from particles.interpolation import grid_nodes, exponential_interpolation
+from interactions.four_particle.cpp.integral import binary_find, distribution_interpolation
 
 
 from . import setup, with_setup_args
@@ -44,6 +45,54 @@ def distribution_interpolation_accuracy_test(params):
                           .format(detailed_grid[x >= eps] / UNITS.MeV))
 
 
+@with_setup_args(setup)
+def batched_interpolation_test(params):
+
+    neutrino = Particle(params=params, **SMP.leptons.neutrino_e)
+    neutrino.update()
+
+    nodes = grid_nodes(neutrino.grid)
+    distribution = neutrino._distribution * (1 + 0.1 * numpy.sin(neutrino.grid.TEMPLATE / UNITS.MeV))
+
+    batched = exponential_interpolation(nodes, distribution, 0., 1, neutrino.aT)
+    pointwise = [distribution_interpolation(neutrino.grid.TEMPLATE, distribution, p, 0., 1, neutrino.aT)
+                 for p in nodes.points]
+
+    assert numpy.allclose(batched, pointwise, rtol=1e-12, atol=0)
+
+
+@with_setup_args(setup)
+def shared_nodes_test(params):
+    """ Species of different masses on one grid get the energies of their own mass """
+    neutrino = Particle(params=params, **SMP.leptons.neutrino_e)
+    neutrino.update()
+
+    nodes = grid_nodes(neutrino.grid)
+    masses = [0., 0.5 * UNITS.MeV, 2 * UNITS.MeV]
+    first = [[array.copy() for array in nodes.energies(mass)] for mass in masses]
+
+    for mass, expected in zip(masses[::-1], first[::-1]):
+        for array, reference in zip(nodes.energies(mass), expected):
+            assert numpy.array_equal(array, reference)
+        E, _, _ = nodes.energies(mass)
+        assert numpy.allclose(E, numpy.sqrt(nodes.points**2 + mass**2))
+
+
+@with_setup_args(setup)
+def bounded_nodes_cache_test(params):
+    """ Node energies of the drifting conformal masses do not accumulate """
+    neutrino = Particle(params=params, **SMP.leptons.neutrino_e)
+    neutrino.update()
+
+    nodes = grid_nodes(neutrino.grid)
+    for step in range(10 * nodes.CACHE_SIZE):
+        nodes.energies(UNITS.MeV * 1.003**step)
+        nodes.energies(0.)
+
+    assert len(nodes.cache) <= nodes.CACHE_SIZE
+    assert 0. in nodes.cache
+
+
 def binary_search_test():
 
     # Test a basic case
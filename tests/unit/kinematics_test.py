@@ -0,0 +1,44 @@
+from collections import defaultdict
+from common import Params, UNITS, utils, kinematics
+from evolution import Universe
+from particles import Particle
+from library.SM import particles as SMP
+from library.NuMSM import particles as NuP, interactions as NuI
+
+
+def relativistic_decoupling_test():
+    """ Scatterings of a sterile neutrino that decouples while relativistic are neglected below\
+        1/15 of the initial temperature """
+    mass = 33.9 * UNITS.MeV
+    theta = 1e-3
+    assert kinematics.relativistic_decoupling(mass, theta)
+    assert not kinematics.relativistic_decoupling(mass, 1.)
+
+    params = Params(T=100 * UNITS.MeV, dy=0.025,
+                    relativistic_decoupling=kinematics.relativistic_decoupling(mass, theta))
+
+    electron = Particle(**SMP.leptons.electron)
+    neutrino_e = Particle(**SMP.leptons.neutrino_e)
+    sterile = Particle(**NuP.dirac_sterile_neutrino(mass))
+
+    universe = Universe(params=params)
+    universe.add_particles([Particle(**SMP.photon), electron, neutrino_e, sterile])
+    universe.interactions += NuI.sterile_leptons_interactions(
+        thetas=defaultdict(float, {'electron': theta}), sterile=sterile,
+        neutrinos=[neutrino_e], leptons=[electron]
+    )
+    params.update(universe.total_energy_density(), universe.total_entropy())
+    universe.update_particles()
+
+    scatterings = [integral for interaction in universe.interactions for integral in interaction.integrals
+                   if utils.reaction_type(integral).SCATTERING
+                   and any(item.specie is sterile for item in integral.reaction)]
+    assert scatterings
+
+    # Between 1 MeV and 1/15 of the initial temperature
+    params.set_state(x=params.x * 20, aT=params.aT, t=params.t)
+    ps = sterile.grid.TEMPLATE
+    assert all(kinematics.Neglect4pInteraction(integral, ps) for integral in scatterings)
+
+    params.relativistic_decoupling = False
+    assert not any(kinematics.Neglect4pInteraction(integral, ps) for integral in scatterings)
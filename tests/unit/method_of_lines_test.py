@@ -0,0 +1,109 @@
+import numpy
+import environment
+from . import collisions_setup, decay_universe, with_setup_args
+from common import Params, UNITS
+from common.integrators.method_of_lines import MethodOfLines
+from evolution import Universe
+from particles import Particle
+from library.SM import particles as SMP
+
+
+def evolve(stiff_solver):
+    config = environment.Configuration(STIFF_SOLVER=stiff_solver)
+    universe = Universe(params=Params(T=10 * UNITS.MeV, dy=0.05, config=config))
+    universe.add_particles([Particle(**SMP.photon), Particle(**SMP.leptons.electron),
+                            Particle(**SMP.leptons.neutrino_e)])
+    universe.evolve(0.05 * UNITS.MeV, export=False)
+    return universe
+
+
+def electron_annihilation_test():
+    """ Photon heating by the electron-positron annihilation $aT \\to (11/4)^{1/3}$ """
+    fixed = evolve('')
+    stiff = evolve('BDF')
+
+    heating = (11. / 4.)**(1. / 3.)
+    assert abs(stiff.params.aT / UNITS.MeV - heating) < 5e-3
+    assert abs(stiff.params.aT - fixed.params.aT) / fixed.params.aT < 1e-2
+    assert stiff.step < fixed.step, "Stiff solver should take larger steps"
+
+
+def trial_evaluation_test():
+    """ Species decouple only at the points accepted by the solver, not at the trial ones """
+    config = environment.Configuration(STIFF_SOLVER='BDF')
+    universe = Universe(params=Params(T=5.5 * UNITS.MeV, dy=0.05, config=config))
+    neutrino_e = Particle(**SMP.leptons.neutrino_e)
+    universe.add_particles([Particle(**SMP.photon), Particle(**SMP.leptons.electron), neutrino_e])
+    universe.params.init_time(universe.total_energy_density())
+    universe.params.update(universe.total_energy_density(), universe.total_entropy())
+    universe.update_particles()
+
+    method = MethodOfLines(universe)
+    method.start()
+    attributes = ('aT', 'T', 'oldeq', 't_decoupling', 'energy_density')
+    state = {key: getattr(neutrino_e, key) for key in attributes}
+    distribution = universe.state.distribution.copy()
+
+    # Temperature of the trial point is below the neutrino decoupling
+    coordinate = method.coordinate() + numpy.log(2.)
+    method.derivatives(coordinate, method.pack())
+
+    assert neutrino_e.in_equilibrium, "Species decoupled at a trial point"
+    assert all(getattr(neutrino_e, key) == value for key, value in state.items())
+    assert numpy.array_equal(universe.state.distribution, distribution)
+
+    method.derivatives(coordinate, method.pack(), record=True)
+    assert not neutrino_e.in_equilibrium
+    assert method.evolving() != method.particles, "Solver is not restarted after the decoupling"
+
+
+@with_setup_args(collisions_setup)
+def stiff_collisions_test(params, universe):
+    """ Scatterings relax the distorted neutrino distributions with the stiff solver and the\
+        diagonal Jacobian made of the loss terms """
+    neutrinos = [particle for particle in universe.particles if particle.collision_integrals]
+    assert neutrinos, "No collision integrals below the decoupling"
+
+    def distortion():
+        return max(numpy.abs(neutrino._distribution * (numpy.exp(neutrino.grid.TEMPLATE / neutrino.aT) + 1.)
+                             - 1.).max()
+                   for neutrino in neutrinos)
+
+    distorted = distortion()
+    params.config = params.config.replace(STIFF_SOLVER='BDF', STIFF_JACOBIAN='diagonal')
+    universe.evolve(1.5 * UNITS.MeV, export=False)
+
+    method = universe.method_of_lines
+    assert method.solver.njev > 0, "Diagonal Jacobian is not used"
+    diagonal = method.jacobian(method.coordinate(), method.pack()).diagonal()
+    assert numpy.count_nonzero(diagonal < 0) > len(diagonal) / 2, "Loss terms are not negative"
+
+    assert all(numpy.all(numpy.isfinite(neutrino._distribution)) for neutrino in neutrinos)
+    assert distortion() < 0.8 * distorted, "Scatterings do not relax the distributions"
+
+
+def decay_jacobian_test():
+    """ Diagonal Jacobian of a decaying species is the derivative of the right-hand side of the\
+        system with respect to its distribution function """
+    universe, sterile = decay_universe(environment.Configuration(STIFF_SOLVER='BDF'))
+    method = MethodOfLines(universe)
+    method.start()
+
+    coordinate, vector = method.coordinate(), method.pack()
+    diagonal = method.jacobian(coordinate, vector).diagonal()
+    index = next(i for i, particle in enumerate(method.particles) if particle is sterile)
+    offset = 2 + sum(particle.grid.MOMENTUM_SAMPLES for particle in method.particles[:index])
+    loss = diagonal[offset:offset + sterile.grid.MOMENTUM_SAMPLES]
+    assert numpy.all(loss < 0)
+
+    # Every evaluation of the right-hand side computes all the collision integrals
+    samples = numpy.linspace(0, sterile.grid.MOMENTUM_SAMPLES - 1, 5).astype(int)
+    rates = method.derivatives(coordinate, vector)
+    derivative = numpy.zeros(len(samples))
+    for j, point in enumerate(offset + samples):
+        perturbed = vector.copy()
+        step = vector[point] * 1e-4
+        perturbed[point] += step
+        derivative[j] = (method.derivatives(coordinate, perturbed)[point] - rates[point]) / step
+
+    assert numpy.allclose(loss[samples], derivative, rtol=1e-3, atol=0), "Diagonal differs from the finite differences"
@@ -2,19 +2,29 @@ import numpy
 from collections import defaultdict
 import environment
 import os
-from . import non_equilibium_setup, with_setup_args, setup
+from . import non_equilibium_setup, collisions_setup, decay_universe, with_setup_args, setup
 from common import CONST, UNITS
 from evolution import Universe
 from particles import Particle
 from library.SM import particles as SMP
 from library.NuMSM import particles as NuP, interactions as NuI
-from interactions.four_particle.cpp.integral import CollisionIntegralKind
+from interactions import scheduler
+from interactions.four_particle.cpp.integral import (
+    CollisionIntegralKind, grid_t, particle_t, reaction_t, get_num_threads
+)
+
+
+def species(universe, *names):
+    """ Particles of the `Universe` looked up by their names: `Universe.add_particles` reorders them """
+    particles = {particle.name: particle for particle in universe.particles}
+    return [particles[name] for name in names]
+
 
 @with_setup_args(non_equilibium_setup)
 def four_particle_free_non_equilibrium_test(params, universe):
     params.update(universe.total_energy_density(), universe.total_entropy())
     eps = 1e-14
-    photon, neutrino_e, neutrino_mu = universe.particles
+    photon, neutrino_e, neutrino_mu = species(universe, 'Photon', 'Electron neutrino', 'Muon neutrino')
 
     photon_distribution = photon._distribution
     neutrino_e_distribution = neutrino_e._distribution
@@ -41,7 +51,7 @@ def four_particle_free_non_equilibrium_test(params, universe):
 @with_setup_args(non_equilibium_setup)
 def unit_non_equilibrium_test(params, universe):
     params.update(universe.total_energy_density(), universe.total_entropy())
-    photon, neutrino_e, neutrino_mu = universe.particles
+    photon, neutrino_e, neutrino_mu = species(universe, 'Photon', 'Electron neutrino', 'Muon neutrino')
 
     universe.update_particles()
     universe.init_interactions()
@@ -105,6 +115,21 @@ def four_particle_decay_test(params):
     assert any(numpy.abs(val) - 1 < 1e-2 for val in ratio), "Four-particle decay test failed"
 
 
+def exponential_decay_test():
+    """ Exponential integrator decays the sterile neutrinos exactly over a step much longer than\
+        their lifetime: the exponent is the bare loss coefficient of the decay integrals """
+    universe, sterile = decay_universe(environment.Configuration(DISTRIBUTION_SOLVER='etd1'))
+    h = universe.params.h
+
+    ps = sterile.grid.TEMPLATE
+    f = sterile._distribution.copy()
+    loss = sum(integral.integrate(ps) for integral in sterile.collision_integrals) / f
+    assert numpy.all(loss * h < -1), "Decay is not stiff"
+
+    collision_integral = sterile.calculate_collision_integral(ps)
+    assert numpy.allclose(f + h * collision_integral, f * numpy.exp(loss * h), rtol=1e-6, atol=0)
+
+
 @with_setup_args(setup)
 def three_particle_free_non_equilibrium_test(params):
     eps = 1e-14
@@ -207,4 +232,106 @@ def three_particle_decay_test(params):
 
     ratio = decay_rate / theo_value
 
-    assert any(numpy.abs(val) - 1 < 1e-2 for val in ratio), "Three-particle decay test failed"
\ No newline at end of file
+    assert any(numpy.abs(val) - 1 < 1e-2 for val in ratio), "Three-particle decay test failed"
+
+@with_setup_args(collisions_setup)
+def scheduled_collisions_test(params, universe):
+    neutrino_e, = [particle for particle in universe.particles if particle.name == 'Electron neutrino']
+    assert neutrino_e.collision_integrals, "No collision integrals below the decoupling"
+
+    universe.calculate_collisions()
+    # Collision integrals are views into the state buffer that is overwritten by the next call
+    serial = neutrino_e.collision_integral.copy()
+    assert numpy.any(serial != 0), "Serial collision integrals vanish"
+
+    params.config = params.config.replace(COLLISION_THREADS=4, COLLISION_CHUNK_SIZE=3)
+    universe.calculate_collisions()
+
+    assert numpy.allclose(serial, neutrino_e.collision_integral), \
+        "Scheduled collision integrals differ from the serial ones"
+
+    # Runs with other chunk sizes share the pools, which are restarted after the shutdown
+    other = scheduler.get_scheduler(params.config.replace(COLLISION_CHUNK_SIZE=5))
+    assert other.chunks is scheduler.get_scheduler(params.config).chunks
+
+    # Workers of both pools do not start nested OpenMP threads
+    for pool in (other.integrals, other.chunks):
+        assert all(threads == 1 for threads in pool.map(lambda _: get_num_threads(), range(8)))
+
+    scheduler.shutdown()
+    params.config = params.config.replace(COLLISION_CHUNK_SIZE=5)
+    universe.calculate_collisions()
+    assert numpy.allclose(serial, neutrino_e.collision_integral)
+
+
+@with_setup_args(non_equilibium_setup)
+def distribution_state_test(params, universe):
+    params.update(universe.total_energy_density(), universe.total_entropy())
+    photon, neutrino_e, neutrino_mu = species(universe, 'Photon', 'Electron neutrino', 'Muon neutrino')
+
+    for index, particle in enumerate(universe.particles):
+        assert numpy.shares_memory(particle._distribution, universe.state.distribution)
+        assert numpy.array_equal(particle._distribution,
+                                 universe.state.distribution[universe.state.row(index)])
+
+    universe.update_particles()
+    universe.init_interactions()
+    universe.calculate_collisions()
+    neutrino_e.collision_integral = -neutrino_e._distribution / params.h * 2.
+
+    photon_distribution = photon._distribution.copy()
+    universe.update_distributions()
+
+    assert numpy.array_equal(photon._distribution, photon_distribution), \
+        "Equilibrium particle distribution changed"
+    assert numpy.all(neutrino_e._distribution == 0), "Distribution function is not clipped"
+    assert numpy.shares_memory(neutrino_e._distribution, universe.state.distribution), \
+        "Particle distribution is detached from the state buffer"
+
+
+@with_setup_args(non_equilibium_setup)
+def reaction_views_test(params, universe):
+    """ Reactions of the C++ integrals read the distribution functions of the reactants in place """
+    params.update(universe.total_energy_density(), universe.total_entropy())
+    photon, neutrino_e, neutrino_mu = species(universe, 'Photon', 'Electron neutrino', 'Muon neutrino')
+
+    universe.update_particles()
+    universe.init_interactions()
+    integral = universe.interactions[0].integrals[0]
+    integral.integrate(neutrino_e.grid.TEMPLATE)
+
+    creaction = integral.creaction
+    for item, reactant in zip(integral.reaction, creaction):
+        assert numpy.shares_memory(reactant.specie.grid.distribution, item.specie._distribution)
+
+    neutrino_e._distribution *= 1.1
+    cached = integral.integrate(neutrino_e.grid.TEMPLATE)
+    assert integral.creaction is creaction, "Reaction is rebuilt for an in-place update"
+
+    integral.creaction = None
+    rebuilt = integral.integrate(neutrino_e.grid.TEMPLATE)
+    assert numpy.array_equal(numpy.array(cached), numpy.array(rebuilt))
+
+
+@with_setup_args(collisions_setup)
+def reaction_views_mass_test(params, universe):
+    """ Reactions are rebuilt around the same grids when the conformal masses change with the scale\
+        factor at the same temperature $aT$ """
+    integral = next(integral for interaction in universe.interactions for integral in interaction.integrals
+                    if any(item.specie.mass > 0 for item in integral.reaction))
+    creaction = integral.reaction_views(grid_t, particle_t, reaction_t)
+    grids = integral.creaction_grids
+    assert integral.reaction_views(grid_t, particle_t, reaction_t) is creaction
+
+    params.set_state(x=params.x * 2, aT=params.aT, t=params.t)
+    rebuilt = integral.reaction_views(grid_t, particle_t, reaction_t)
+    assert rebuilt is not creaction, "Reaction is not rebuilt for a new scale factor"
+    assert integral.creaction_grids is grids, "Grids are rebuilt at the same temperature"
+    for item, old, new in zip(integral.reaction, creaction, rebuilt):
+        assert new.specie.m == item.specie.conformal_mass / params.aT
+        if item.specie.mass > 0:
+            assert new.specie.m == 2 * old.specie.m
+
+    params.set_state(x=params.x, aT=params.aT * 1.1, t=params.t)
+    integral.reaction_views(grid_t, particle_t, reaction_t)
+    assert integral.creaction_grids is not grids, "Grids are not rebuilt for a new temperature"
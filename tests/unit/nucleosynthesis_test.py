@@ -0,0 +1,78 @@
+import numpy
+import os
+import shutil
+import tempfile
+from scipy.special import expit
+import environment
+from common import UNITS, CONST, utils
+import kawano
+import nucleosynthesis
+
+
+def standard_background():
+    """ Radiation-dominated universe with the high-temperature weak rates (Bernstein et al.) """
+    data = utils.DynamicRecArray(kawano.heading)
+    m_e = 0.511 * UNITS.MeV
+
+    t = None
+    T_prev = None
+    for T in numpy.logspace(1, -3, 1000) * UNITS.MeV:
+        electrons = expit(3. * (1. - m_e / T))
+        dof = 2. + 5.25 * (4. / 11.)**(4. / 3.) + (3.5 + 5.25 * (1. - (4. / 11.)**(4. / 3.))) * electrons
+        H = numpy.sqrt(8. * numpy.pi**3 / 90. * dof) * T**2 / CONST.M_p
+        t = 1. / (2. * H) if t is None else t + (T_prev - T) / (H * T)
+        T_prev = T
+
+        x = kawano.q / T
+        rate = 255. * (12. + 6. * x + x**2) / x**5
+        row = [t, UNITS.MeV**2 / T, T, 0., 0., H, rate, rate * numpy.exp(-x), 1., 0., 0., 0.]
+        data.append(dict(zip(data.columns, row)))
+
+    return data
+
+
+def standard_bbn_test():
+    abundances = nucleosynthesis.solve(standard_background())
+
+    A = numpy.array([1, 1, 2, 3, 3, 4, 7, 7])
+    assert numpy.allclose(A.dot(abundances.Y), 1.), "Baryon number is not conserved"
+
+    # Reference values of this background: the high-temperature weak rates keep converting the\
+    # neutrons well below the freeze-out, so that Yp is lower than in the standard BBN
+    observables = abundances.observables()
+    assert abs(observables['Yp'] / 0.1924 - 1) < 0.02
+    assert abs(observables['D/H'] / 2.379e-5 - 1) < 0.03
+    assert abs(observables['Li7/H'] / 3.520e-10 - 1) < 0.05
+
+
+def short_background_test():
+    data = standard_background()
+    for rows in range(2):
+        background = utils.DynamicRecArray(kawano.heading)
+        background.extend(data.data[:rows])
+        try:
+            nucleosynthesis.solve(background)
+        except ValueError:
+            continue
+        assert False, "Background of {} rows is accepted".format(rows)
+
+
+def kawano_run_test():
+    """ `kawano.run` solves the background table written by the `Universe` with the reaction\
+        network instead of starting the external program """
+    folder = tempfile.mkdtemp()
+    data = standard_background()
+    with open(os.path.join(folder, 's4.dat'), 'w') as f:
+        f.write("\t".join([column[0] for column in kawano.heading]) + "\n")
+        for i in range(len(data)):
+            f.write(data.row_repr(i) + "\n")
+
+    output = kawano.run(folder, config=environment.Configuration(NUCLEOSYNTHESIS='network'))
+    assert os.path.exists(os.path.join(folder, 'network_output.dat'))
+
+    names, values = output.strip().splitlines()[-2:]
+    observables = dict(zip(names.lstrip('# ').split('\t'), map(float, values.split()[1:])))
+    for name, value in nucleosynthesis.solve(data).observables().items():
+        assert numpy.isclose(observables[name], value, rtol=1e-4)
+
+    shutil.rmtree(folder)
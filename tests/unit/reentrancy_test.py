@@ -0,0 +1,41 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+from common import Params, UNITS
+from evolution import Universe
+from particles import Particle
+from library.SM import particles as SMP
+
+
+def concurrent_runs_test():
+    """ Runs in different threads keep their own logs and do not touch `stdout` """
+    folder = tempfile.mkdtemp()
+    stdout = sys.stdout
+
+    universes = []
+    for name in ['first', 'second']:
+        universe = Universe(params=Params(T=5 * UNITS.MeV, dy=0.025),
+                            folder=os.path.join(folder, name))
+        universe.add_particles([Particle(**SMP.photon), Particle(**SMP.leptons.neutrino_e)])
+        universes.append(universe)
+
+    T_finals = [4 * UNITS.MeV, 3 * UNITS.MeV]
+    threads = [threading.Thread(target=universe.evolve, args=(T_final, ))
+               for universe, T_final in zip(universes, T_finals)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sys.stdout is stdout
+    for universe, other, T_final in zip(universes, universes[::-1], T_finals):
+        assert universe.params.T <= T_final
+        with open(universe.logfile) as f:
+            log = f.read()
+        assert log.count("Initial states") == 1
+        assert universe.logfile in log and other.logfile not in log
+
+    shutil.rmtree(folder)
+
@@ -154,3 +154,45 @@ def smooth_decoupling_test(params):
     assert neutrino.pressure - pressure < eps
     assert neutrino.numerator() - numerator < eps
     assert neutrino.denominator() - denominator < eps
+
+
+@with_setup_args(setup)
+def free_streaming_regime_test(params):
+
+    sterile = Particle(params=params, name='Sterile', mass=10 * UNITS.MeV,
+                       decoupling_temperature=2 * params.T)
+    assert sterile.regime == REGIMES.NONEQ
+
+    sterile.free_streaming = True
+    sterile.update()
+    assert sterile.free_streaming_moments is not None
+    assert sterile.numerator() == 0
+
+    params.set_state(x=2 * params.x, aT=params.aT, t=params.t)
+    sterile.update()
+
+    regime = REGIMES.NONEQ
+    assert numpy.allclose(
+        (sterile.density, sterile.energy_density, sterile.pressure, sterile.entropy),
+        (regime.density(sterile), regime.energy_density(sterile), regime.pressure(sterile),
+         regime.entropy(sterile))
+    ), "Free streaming must not change the thermodynamics of the species"
+
+
+def step_bounds_test():
+    """ Bounds of the adaptive step size follow the nominal step size, not the adaptive steps """
+    params = Params(T=5. * UNITS.MeV, dy=0.025)
+    assert numpy.allclose([params.h_min, params.h_max], [0.0025, 0.25])
+
+    params.dy = 0.003125
+    params.infer()
+    assert numpy.allclose([params.h_min, params.h_max], [0.0003125, 0.03125])
+
+    params.set_step(0.01, nominal=False)
+    assert numpy.allclose([params.h_min, params.h_max], [0.0003125, 0.03125])
+    params.set_step(0.05)
+    assert numpy.allclose([params.h_min, params.h_max], [0.005, 0.5])
+
+    params = Params(T=5. * UNITS.MeV, dy=0.025, h_min=1e-3)
+    params.set_step(0.05)
+    assert numpy.allclose([params.h_min, params.h_max], [1e-3, 0.5])
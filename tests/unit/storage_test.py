@@ -0,0 +1,41 @@
+import os
+import numpy
+import shutil
+import tempfile
+from common import UNITS, utils, storage
+
+
+def append_only_store_test():
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "evolution.bin")
+
+    data = utils.DynamicRecArray([['T', 'MeV', UNITS.MeV], ['a', None, 1]])
+    store = storage.RecArrayStore(path)
+
+    for i in range(5):
+        data.append({'T': i * UNITS.MeV, 'a': i})
+    store.flush(data)
+    size = os.path.getsize(path)
+
+    for i in range(5, 8):
+        data.append({'T': i * UNITS.MeV, 'a': i})
+    store.flush(data)
+
+    assert os.path.getsize(path) == size * 8 // 5, "Only the new rows must be appended"
+    assert numpy.all(storage.load(path)['a'] == data['a'])
+
+    data.truncate()
+    data.append({'T': 0., 'a': -1.})
+    store.flush(data)
+
+    assert numpy.all(storage.load(path)['a'] == data['a']), "Modified rows must be rewritten"
+
+    data['a'][2] = 42.
+    store.flush(data)
+    assert numpy.all(storage.load(path)['a'] == data['a']), "Rows changed in place must be rewritten"
+
+    table = numpy.loadtxt(storage.to_txt(path))
+    assert numpy.allclose(table[:, 0], data['T'] / UNITS.MeV)
+    assert numpy.allclose(table[:, 1], data['a'])
+
+    shutil.rmtree(folder)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+## Weak rates benchmark
+
+Compares the batched `kawano.baryonic_rates` with the former evaluation of the six rates one by\
+one through the scalar integrands (each quadrature node interpolates the electron and neutrino\
+distribution functions separately for every reaction).
+
+    PYTHONPATH=. python tests/weak_rates
+"""
+
+import time
+import numpy
+
+import kawano
+from particles import Particle
+from library.SM import particles as SMP
+from common import UNITS, CONST, Params
+from common.integrators import integrate_1D
+
+
+def reference_rates(a, particles):
+    """ Rates computed reaction by reaction with the scalar integrands """
+    electron, neutrino = particles.electron, particles.neutrino
+    q, m_e = kawano.q, kawano.m_e
+
+    def integrand(sign_q, sign_y, statistics):
+        @numpy.vectorize
+        def rate(y):
+            E_e = sign_q * q * a + sign_y * y
+            if E_e < m_e * a:
+                return 0.
+            y_e = numpy.sqrt(E_e**2 - (m_e * a)**2)
+            f_e, f_nu = electron.distribution(y_e), neutrino.distribution(y)
+            return y**2 * y_e * E_e * statistics(f_e, f_nu)
+        return rate
+
+    grid = neutrino.grid
+    channels = [
+        (integrand(1, 1, lambda f_e, f_nu: (1. - f_e) * f_nu), (grid.MIN_MOMENTUM, grid.MAX_MOMENTUM)),
+        (integrand(1, 1, lambda f_e, f_nu: f_e * (1. - f_nu)), (grid.MIN_MOMENTUM, grid.MAX_MOMENTUM)),
+        (integrand(1, -1, lambda f_e, f_nu: (1. - f_e) * (1. - f_nu)), (grid.MIN_MOMENTUM, (q - m_e) * a)),
+        (integrand(1, -1, lambda f_e, f_nu: f_e * f_nu), (grid.MIN_MOMENTUM, (q - m_e) * a)),
+        (integrand(-1, 1, lambda f_e, f_nu: f_e * (1. - f_nu)), ((q + m_e) * a, grid.MAX_MOMENTUM)),
+        (integrand(-1, 1, lambda f_e, f_nu: (1. - f_e) * f_nu), ((q + m_e) * a, grid.MAX_MOMENTUM)),
+    ]
+
+    return numpy.array([
+        CONST.rate_normalization / a**5 * integrate_1D(rate, bounds=bounds)[0]
+        if bounds[0] < bounds[1] else 0.
+        for rate, bounds in channels
+    ])
+
+
+def timeit(function, *args, repeat=10):
+    start = time.time()
+    for _ in range(repeat):
+        result = function(*args)
+    return result, (time.time() - start) / repeat
+
+
+for T in [5., 1., 0.3, 0.05]:
+    params = Params(T=T * UNITS.MeV, dy=0.003125)
+    electron = Particle(**SMP.leptons.electron)
+    neutrino = Particle(**SMP.leptons.neutrino_e)
+    for particle in [electron, neutrino]:
+        particle.set_params(params)
+    kawano_particles = kawano.init_kawano(electron=electron, neutrino=neutrino)
+
+    reference, reference_time = timeit(reference_rates, params.a, kawano_particles, repeat=1)
+    batched, batched_time = timeit(kawano.baryonic_rates, params.a, kawano_particles)
+
+    scale = numpy.maximum(numpy.abs(reference), numpy.finfo(float).tiny)
+    print("T = {:5.2f} MeV\tmax relative difference: {:.1e}\treference: {:8.2f} ms\tbatched: {:6.2f} ms"
+          .format(T, numpy.max(numpy.abs(batched - reference) / scale),
+                  reference_time * 1e3, batched_time * 1e3))